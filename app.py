@@ -4,9 +4,11 @@ import os
 import uvicorn
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from src.api.dependencies import get_async_vector_store, get_vector_store
 from src.api.responses import error_response
 from src.api.routes import chat_router, documents_router, vector_store_router
 from src.config import get_settings
@@ -44,9 +46,18 @@ async def lifespan(app: FastAPI):
     # 开发阶段：应用启动时自动创建缺失的数据表
     init_db()
     _init_langsmith_from_settings()
+    # 预热向量库：嵌入式/进程内后端在此加载索引，避免首个请求承担加载耗时
+    if settings.vector_store_warm_load:
+        await run_in_threadpool(get_vector_store().warm_load)
+        await get_async_vector_store().awarm_load()
     yield
     # 应用关闭时执行
     logging.info("Application shutdown...")
+    # 向量库写缓冲落盘（仅在向量库已被创建时）
+    if get_async_vector_store.cache_info().currsize:
+        await get_async_vector_store().aclose()
+    if get_vector_store.cache_info().currsize:
+        get_vector_store().close()
 
 
 def create_app() -> FastAPI:
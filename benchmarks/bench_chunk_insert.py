@@ -0,0 +1,89 @@
+"""DocumentChunk 写入基准：ORM 逐行 add 与批量 INSERT ... VALUES 对比
+
+需要可连接的 Postgres（使用 .env 中的 DATABASE_URL），每轮写入都在事务内完成后回滚，不留数据。
+
+用法：
+    python -m benchmarks.bench_chunk_insert --chunks 10000 --repeat 3
+"""
+
+import argparse
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from sqlmodel import Session
+
+from src.config import get_settings
+from src.db.models import Document
+from src.db.session import get_engine, init_db
+from src.services.document_service import DocumentService
+
+
+def _make_rows(document_id: int, count: int, chunk_chars: int) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    content = "x" * chunk_chars
+    return [
+        {
+            "chunk_uid": uuid4().hex,
+            "document_id": document_id,
+            "chunk_index": idx,
+            "content": content,
+            "is_deleted": False,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for idx in range(count)
+    ]
+
+
+def _run_once(threshold: int, chunks: int, chunk_chars: int) -> float:
+    """写入一次并返回耗时（秒），写入后回滚"""
+    settings = get_settings()
+    settings.chunk_bulk_insert_threshold = threshold
+
+    with Session(get_engine()) as session:
+        service = DocumentService(
+            db=session,
+            chunker=None,
+            embedder=None,
+            vector_store=None,
+            settings=settings,
+        )
+        doc = Document(name="bench", source_type="text", source="bench")
+        session.add(doc)
+        session.flush()
+        rows = _make_rows(doc.id, chunks, chunk_chars)
+
+        start = time.perf_counter()
+        service._insert_chunk_rows(rows)
+        session.flush()
+        elapsed = time.perf_counter() - start
+
+        session.rollback()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="DocumentChunk 写入基准")
+    parser.add_argument("--chunks", type=int, default=10000, help="每轮写入的分块数")
+    parser.add_argument("--chunk-chars", type=int, default=1000, help="每个分块的字符数")
+    parser.add_argument("--repeat", type=int, default=3, help="每种方式重复次数")
+    args = parser.parse_args()
+
+    init_db()
+
+    modes = {
+        "orm": args.chunks + 1,  # 阈值大于分块数，强制走 ORM
+        "bulk": 0,  # 阈值为 0，强制走批量 INSERT
+    }
+    for mode, threshold in modes.items():
+        timings = [_run_once(threshold, args.chunks, args.chunk_chars) for _ in range(args.repeat)]
+        best = min(timings)
+        print(
+            f"{mode:>4} | chunks={args.chunks} | best={best:.3f}s | "
+            f"rows/sec={args.chunks / best:,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""numpy 向量后端量化基准：召回率与内存占用对比
+
+在临时目录中分别构建 float32 与 int8 量化的集合，以 float32 精确检索结果为基准，
+报告不同 rerank_factor 下的 recall@k、单次查询耗时与向量数据占用。
+
+默认使用随机向量（带簇结构，接近真实嵌入的分布）；--from 指定已有的 numpy 后端集合目录时，
+使用其中的真实向量，并从中抽样作为查询。
+
+用法：
+    python -m benchmarks.bench_vector_quantization --rows 200000 --dim 768 --queries 200
+    python -m benchmarks.bench_vector_quantization --from ./data/vectordb/documents --queries 200
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.embedding.backends.numpy_backend import NumpyCollection
+
+
+def _synthetic_vectors(rows: int, dim: int, seed: int) -> np.ndarray:
+    """生成带簇结构的随机向量：簇中心 + 噪声"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, rows // 500), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), rows)
+    return centers[labels] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+
+
+def _load_vectors(directory: Path) -> np.ndarray:
+    """读取已有集合的有效向量（按记录日志中最后一次写入的行）"""
+    meta = json.loads((directory / NumpyCollection.META_FILE).read_text(encoding="utf-8"))
+    vectors = np.memmap(directory / NumpyCollection.VECTORS_FILE, dtype=np.float32, mode="r").reshape(-1, meta["dim"])
+    alive: dict[int, bool] = {}
+    with (directory / NumpyCollection.RECORDS_FILE).open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                op = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            alive[op["row"]] = op["op"] == "put"
+    rows = sorted(row for row, is_alive in alive.items() if is_alive)
+    return np.asarray(vectors[rows])
+
+
+def _build(directory: Path, vectors: np.ndarray, quantization: str, rerank_factor: int) -> NumpyCollection:
+    collection = NumpyCollection(
+        "bench", directory, quantization=quantization, rerank_factor=rerank_factor
+    )
+    batch = 10_000
+    for start in range(0, len(vectors), batch):
+        end = min(start + batch, len(vectors))
+        collection.add(ids=[str(i) for i in range(start, end)], embeddings=vectors[start:end])
+    return collection
+
+
+def _run_queries(collection: NumpyCollection, queries: np.ndarray, top_k: int) -> tuple[list[list[str]], float]:
+    started = time.perf_counter()
+    results = [collection.query(query_embeddings=[q], n_results=top_k)["ids"][0] for q in queries]
+    return results, (time.perf_counter() - started) / len(queries) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="numpy 向量后端量化召回率/内存基准")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rerank-factors", default="1,2,4,8")
+    parser.add_argument("--from", dest="source", default=None, help="已有 numpy 后端集合目录")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = _load_vectors(Path(args.source)) if args.source else _synthetic_vectors(args.rows, args.dim, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape).astype(np.float32)
+    print(f"[bench] rows={len(vectors)} | dim={vectors.shape[1]} | queries={len(queries)} | top_k={args.top_k}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = _build(Path(tmp) / "float32", vectors, "none", 1)
+        truth, float_ms = _run_queries(baseline, queries, args.top_k)
+        float_bytes = baseline.memory_usage()["float_bytes"]
+        baseline.close()
+        print(f"[bench] float32 | recall@{args.top_k}=1.0000 | {float_ms:.2f} ms/query | resident={float_bytes / 2**20:,.1f} MiB")
+
+        quantized = _build(Path(tmp) / "int8", vectors, "int8", 1)
+        code_bytes = quantized.memory_usage()["code_bytes"]
+        for factor in (int(f) for f in args.rerank_factors.split(",")):
+            quantized.rerank_factor = factor
+            results, ms = _run_queries(quantized, queries, args.top_k)
+            recall = np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)])
+            print(
+                f"[bench] int8 rerank_factor={factor} | recall@{args.top_k}={recall:.4f} | {ms:.2f} ms/query | "
+                f"resident={code_bytes / 2**20:,.1f} MiB ({float_bytes / max(code_bytes, 1):.1f}x smaller)"
+            )
+        quantized.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -21,9 +21,12 @@ def create_agent_graph(llm: BaseLLM, tool_registry: ToolRegistry):
 
     graph = StateGraph(AgentState)
 
-    # 注册节点
+    async def action(state: AgentState) -> dict:
+        return await tool_node(state, tool_registry)
+
+    # 注册节点（图通过 ainvoke 执行：同步的 LLM 节点由 LangGraph 放到线程池中执行，工具节点为原生异步）
     graph.add_node("agent", lambda state: llm_node(state, llm, tool_registry))
-    graph.add_node("action", lambda state: tool_node(state, tool_registry))
+    graph.add_node("action", action)
 
     # 定义边
     graph.set_entry_point("agent")
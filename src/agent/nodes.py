@@ -49,9 +49,10 @@ def llm_node(state: AgentState, llm: BaseLLM, tool_registry: ToolRegistry, tempe
     return {"messages": [ai_message]}
 
 
-def tool_node(state: AgentState, tool_registry: ToolRegistry) -> dict:
+async def tool_node(state: AgentState, tool_registry: ToolRegistry) -> dict:
     """
-    工具执行节点：根据上一条消息中的工具调用，执行对应工具并返回 ToolMessage。
+    工具执行节点：根据上一条消息中的工具调用，异步执行对应工具并返回 ToolMessage。
+    检索等 I/O 等待期间不占用线程，并发只受向量库客户端自身的请求上限限制。
     """
     last_message = state["messages"][-1]
     tool_calls = getattr(last_message, "tool_calls", []) or []
@@ -85,7 +86,7 @@ def tool_node(state: AgentState, tool_registry: ToolRegistry) -> dict:
         try:
             # 记录参数详情以便调试
             logger.debug(f"工具调用参数详情: name={name}, args类型={type(args)}, args内容={args}")
-            output = tool_registry.invoke_tool(name, **args)
+            output = await tool_registry.ainvoke_tool(name, **args)
         except TypeError as e:
             # 参数类型错误，可能是缺少必需参数
             error_msg = str(e)
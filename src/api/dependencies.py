@@ -4,7 +4,11 @@ from sqlalchemy.orm import Session
 
 from ..config import Settings, get_settings
 from ..db import get_session
-from ..embedding.embedder import TextEmbedder
+from ..embedding.embedder import CollectionEmbedders, TextEmbedder
+from ..embedding.backends import create_vector_client
+from ..embedding.async_vector_store import AsyncVectorStore
+from ..embedding.collection_stats import CollectionStatsCache
+from ..embedding.search_cache import SearchResultCache
 from ..embedding.vector_store import VectorStore
 from ..embedding.chunker import DocumentChunker
 from ..llm.base import BaseLLM
@@ -14,6 +18,11 @@ from ..services.runtime_service import AgentRuntimeService
 from ..services.conversation_service import ConversationService
 from ..services.chat_service import ChatApplicationService
 from ..services.document_service import DocumentService
+from ..services.boilerplate_index import BoilerplateIndex
+from ..services.collection_alias_service import CollectionAliasRegistry
+from ..services.keyword_search_service import KeywordSearchService
+from ..services.partition_service import PartitionRouter
+from ..services.reindex_service import ReindexManager
 from ..tools.base import ToolRegistry
 from ..tools.search import VectorSearchTool
 
@@ -41,20 +50,107 @@ def get_llm() -> BaseLLM:
 
 
 @lru_cache()
-def get_embedder() -> TextEmbedder:
-    """依赖注入：获取文本嵌入器实例（进程级单例）"""
+def get_collection_alias_registry() -> CollectionAliasRegistry:
+    """依赖注入：获取向量集合别名注册表（进程级单例）"""
     settings: Settings = get_settings()
-    return TextEmbedder(
+    return CollectionAliasRegistry(cache_ttl=settings.vector_alias_cache_ttl)
+
+
+@lru_cache()
+def get_collection_embedders() -> CollectionEmbedders:
+    """依赖注入：获取按集合选择模型的嵌入器（进程级单例）
+
+    每次向量化前按别名表（带 TTL 缓存）确认集合当前所用的模型：任一 worker 完成重建索引并切换别名后，
+    所有 worker 最多在 vector_alias_cache_ttl 秒后改用新模型，保证查询向量与集合一致。
+    """
+    settings: Settings = get_settings()
+    return CollectionEmbedders(
         model_name=settings.embedding_model,
         model_dir=settings.embedding_model_dir,
+        model_resolver=get_collection_alias_registry().get_model,
     )
 
 
+@lru_cache()
+def get_embedder() -> TextEmbedder:
+    """依赖注入：获取默认集合的文本嵌入器实例（进程级单例）"""
+    return get_collection_embedders().get(VectorStore.DEFAULT_COLLECTION_NAME)
+
+
 @lru_cache()
 def get_vector_store() -> VectorStore:
     """依赖注入：获取向量存储实例（进程级单例）"""
     settings: Settings = get_settings()
-    return VectorStore(host=settings.chroma_host, port=settings.chroma_port)
+    client = create_vector_client(
+        settings.vector_store_type,
+        host=settings.chroma_host,
+        port=settings.chroma_port,
+        chroma_mode=settings.chroma_mode,
+        path=settings.vector_db_path,
+        numpy_quantization=settings.numpy_quantization,
+        numpy_rerank_factor=settings.numpy_rerank_factor,
+        hnsw_m=settings.hnsw_m,
+        hnsw_ef_construction=settings.hnsw_ef_construction,
+        hnsw_ef_search=settings.hnsw_ef_search,
+        hnsw_save_every=settings.hnsw_save_every,
+        hnsw_rebuild_deleted_ratio=settings.hnsw_rebuild_deleted_ratio,
+        shards=settings.vector_shards,
+        shard_timeout=settings.vector_shard_timeout,
+        shard_virtual_nodes=settings.vector_shard_virtual_nodes,
+    )
+    alias_registry = get_collection_alias_registry()
+    collection_stats = CollectionStatsCache(
+        client,
+        reconcile_interval=settings.collection_stats_reconcile_interval,
+        stale_interval=settings.collection_stats_stale_interval,
+        # 未被别名指向的集合由当前配置的向量模型写入
+        model_resolver=lambda name: alias_registry.get_collection_model(name) or settings.embedding_model,
+    )
+    collection_stats.start()
+    return VectorStore(
+        client=client,
+        write_batch_size=settings.vector_write_batch_size,
+        write_concurrency=settings.vector_write_concurrency,
+        write_max_retries=settings.vector_write_max_retries,
+        write_buffer_size=settings.vector_write_buffer_size,
+        write_buffer_max_delay=settings.vector_write_buffer_max_delay,
+        write_buffer_max_attempts=settings.vector_write_buffer_max_attempts,
+        alias_resolver=alias_registry.resolve,
+        search_cache=(
+            SearchResultCache(max_entries=settings.search_cache_size, ttl=settings.search_cache_ttl)
+            if settings.search_cache_size > 0 else None
+        ),
+        collection_stats=collection_stats,
+    )
+
+
+@lru_cache()
+def get_async_vector_store() -> AsyncVectorStore:
+    """依赖注入：获取异步向量存储实例（进程级单例，与 get_vector_store 共享缓存与写缓冲）"""
+    settings: Settings = get_settings()
+    native = settings.vector_store_type == "chromadb" and settings.chroma_mode == "http"
+    return AsyncVectorStore(
+        get_vector_store(),
+        host=settings.chroma_host if native else None,
+        port=settings.chroma_port,
+        max_concurrency=settings.vector_async_max_concurrency,
+    )
+
+
+@lru_cache()
+def get_reindex_manager() -> ReindexManager:
+    """依赖注入：获取重建向量索引任务管理器（进程级单例）"""
+    return ReindexManager(
+        vector_store=get_vector_store(),
+        alias_registry=get_collection_alias_registry(),
+        settings=get_settings(),
+    )
+
+
+@lru_cache()
+def get_boilerplate_index() -> BoilerplateIndex:
+    """依赖注入：获取样板分块近似重复索引（进程级单例）"""
+    return BoilerplateIndex(max_distance=get_settings().boilerplate_max_distance)
 
 
 @lru_cache()
@@ -63,11 +159,22 @@ def get_document_chunker() -> DocumentChunker:
     return DocumentChunker()
 
 
+@lru_cache()
+def get_partition_router() -> PartitionRouter:
+    """依赖注入：获取向量集合分区路由（进程级单例）"""
+    return PartitionRouter(get_settings())
+
+
 def get_document_service(
         db: Session = Depends(get_session),
         embedder: TextEmbedder = Depends(get_embedder),
         vector_store: VectorStore = Depends(get_vector_store),
         chunker: DocumentChunker = Depends(get_document_chunker),
+        settings: Settings = Depends(get_settings),
+        reindex_manager: ReindexManager = Depends(get_reindex_manager),
+        boilerplate_index: BoilerplateIndex = Depends(get_boilerplate_index),
+        partition_router: PartitionRouter = Depends(get_partition_router),
+        collection_embedders: CollectionEmbedders = Depends(get_collection_embedders),
 ) -> DocumentService:
     """依赖注入：获取文档服务"""
     return DocumentService(
@@ -75,16 +182,38 @@ def get_document_service(
         chunker=chunker,
         embedder=embedder,
         vector_store=vector_store,
+        settings=settings,
+        reindex_manager=reindex_manager,
+        boilerplate_index=boilerplate_index,
+        partition_router=partition_router,
+        collection_embedders=collection_embedders,
     )
 
 
+@lru_cache()
+def get_keyword_search_service() -> KeywordSearchService:
+    """依赖注入：获取分块关键词检索服务"""
+    return KeywordSearchService(settings=get_settings())
+
+
 def get_tool_registry(
         vector_store: VectorStore = Depends(get_vector_store),
         embedder: TextEmbedder = Depends(get_embedder),
+        keyword_search: KeywordSearchService = Depends(get_keyword_search_service),
+        async_vector_store: AsyncVectorStore = Depends(get_async_vector_store),
+        partition_router: PartitionRouter = Depends(get_partition_router),
+        collection_embedders: CollectionEmbedders = Depends(get_collection_embedders),
 ) -> ToolRegistry:
     """依赖注入：获取工具注册表"""
     registry = ToolRegistry()
-    vector_search_tool = VectorSearchTool(vector_store, embedder)
+    vector_search_tool = VectorSearchTool(
+        vector_store,
+        embedder,
+        keyword_search=keyword_search,
+        async_vector_store=async_vector_store,
+        partition_router=partition_router,
+        collection_embedders=collection_embedders,
+    )
     registry.register(vector_search_tool)
     return registry
 
@@ -10,6 +10,9 @@ class DocumentUploadRequest(BaseModel):
     content: str = Field(..., description="文档内容或URL")
     source_type: str = Field(..., description="文件类型：url/text/file")
     name: str = Field(..., description="文档名称")
+    kb_id: str | None = Field(default=None, description="所属知识库 ID（开启分区路由时决定向量写入的集合）", max_length=64)
+    project_id: str | None = Field(default=None, description="所属项目 ID", max_length=64)
+    user_id: int | None = Field(default=None, description="所属用户 ID")
 
 
 class DocumentResponse(BaseModel):
@@ -17,6 +20,69 @@ class DocumentResponse(BaseModel):
     document_uid: str
     name: str
     chunks_count: int
+    deduplicated: bool = Field(default=False, description="是否命中已有的相同内容文档")
+    boilerplate_chunks: int = Field(default=0, description="识别为跨文档样板内容的分块数")
+    skipped_chunks: int = Field(default=0, description="因样板策略为 skip 而未写入的分块数")
+    profile: dict[str, Any] | None = Field(default=None, description="分阶段资源报告，仅在开启诊断时返回")
+
+
+class DocumentBatchUploadRequest(BaseModel):
+    """批量上传文档请求"""
+    documents: list[DocumentUploadRequest] = Field(..., description="待上传的文档列表", min_length=1)
+
+
+class DocumentBatchItemResult(BaseModel):
+    """批量上传中单个文档的结果"""
+    index: int = Field(..., description="文档在请求中的位置")
+    name: str = Field(..., description="文档名称")
+    success: bool = Field(..., description="是否处理成功")
+    document_uid: str | None = Field(default=None, description="文档 UID，失败时为空")
+    chunks_count: int = Field(default=0, description="分块数量")
+    deduplicated: bool = Field(default=False, description="是否命中已有的相同内容文档")
+    boilerplate_chunks: int = Field(default=0, description="识别为跨文档样板内容的分块数")
+    skipped_chunks: int = Field(default=0, description="因样板策略为 skip 而未写入的分块数")
+    error: str | None = Field(default=None, description="失败原因")
+
+
+class DocumentBatchUploadResponse(BaseModel):
+    """批量上传文档响应"""
+    success_count: int = Field(..., description="成功处理的数量")
+    failed_count: int = Field(..., description="处理失败的数量")
+    items: list[DocumentBatchItemResult] = Field(default_factory=list, description="逐个文档的处理结果")
+
+
+class NdjsonChunkRecord(BaseModel):
+    """NDJSON 导入中的单个分块"""
+    content: str = Field(..., description="分块文本", min_length=1)
+    embedding: list[float] | None = Field(default=None, description="已有向量，缺省时由服务端向量化")
+    extra: dict[str, Any] | None = Field(default=None, description="分块附加元信息，如页码、标题等")
+
+
+class NdjsonDocumentRecord(BaseModel):
+    """NDJSON 导入的单行记录：一个文档及其分块"""
+    name: str = Field(..., description="文档名称")
+    source_type: str = Field(default="api", description="来源类型")
+    source: str | None = Field(default=None, description="原始来源，便于追溯")
+    embedding_model: str | None = Field(
+        default=None,
+        description="生成 embedding 所用的模型；未指定或与文档所在集合当前的模型不一致时忽略已有向量并重新向量化",
+    )
+    chunks: list[NdjsonChunkRecord] = Field(..., description="分块列表", min_length=1)
+    kb_id: str | None = Field(default=None, description="所属知识库 ID", max_length=64)
+    project_id: str | None = Field(default=None, description="所属项目 ID", max_length=64)
+    user_id: int | None = Field(default=None, description="所属用户 ID")
+
+
+class DocumentImportResponse(BaseModel):
+    """NDJSON 导入结果"""
+    documents: int = Field(..., description="新建的文档数")
+    deduplicated: int = Field(..., description="命中已有相同内容而跳过的文档数")
+    chunks: int = Field(..., description="写入的分块数")
+    embedded: int = Field(..., description="由服务端向量化的分块数")
+    boilerplate_chunks: int = Field(default=0, description="识别为跨文档样板内容的分块数")
+    skipped_chunks: int = Field(default=0, description="因样板策略为 skip 而未写入的分块数")
+    failed: int = Field(..., description="校验或写入失败的记录数")
+    errors: list[str] = Field(default_factory=list, description="失败原因（最多保留前若干条）")
 
 
 class DocumentInfo(BaseModel):
@@ -107,6 +173,7 @@ class DocumentListResponse(BaseModel):
 class VectorQueryRequest(BaseModel):
     where: dict[str, Any] = Field({}, description="Metadata filter for the query. Empty dict for no filter.")
     limit: int = Field(10, description="Maximum number of documents to return", ge=1, le=100)
+    collection_name: str | None = Field(default=None, description="集合名称，默认使用 'documents'")
 
 
 class VectorQueryItem(BaseModel):
@@ -166,12 +233,53 @@ class VectorSearchRequest(BaseModel):
     collection_name: str | None = Field(default=None, description="集合名称，默认使用 'documents'")
 
 
+class VectorBatchSearchQuery(BaseModel):
+    """批量检索中的单个查询：query_embedding 与 query（文本，服务端向量化）二选一"""
+    query_embedding: list[float] | None = Field(default=None, description="查询向量", min_length=1)
+    query: str | None = Field(default=None, description="查询文本", min_length=1)
+    top_k: int = Field(5, description="返回最相似的前 K 个结果", ge=1, le=100)
+    where: dict[str, Any] | None = Field(default=None, description="元数据过滤条件")
+
+
+class VectorBatchSearchRequest(BaseModel):
+    """批量向量检索请求"""
+    queries: list[VectorBatchSearchQuery] = Field(..., description="查询列表", min_length=1, max_length=256)
+    collection_name: str | None = Field(default=None, description="集合名称，默认使用 'documents'")
+
+
 class VectorCollectionInfo(BaseModel):
     """向量集合信息"""
     name: str = Field(..., description="集合名称")
     count: int = Field(..., description="向量数量")
+    dimension: int | None = Field(default=None, description="向量维度")
+    embedding_model: str | None = Field(default=None, description="写入该集合所用的向量模型")
+    last_write_at: datetime | None = Field(default=None, description="本进程最近一次写入时间")
+    reconciled_at: datetime | None = Field(default=None, description="最近一次与向量库对账的时间")
+    stale: bool = Field(default=False, description="计数是否等待对账（upsert、删除后变化量未知）")
 
 
 class VectorCollectionListResponse(BaseModel):
     """向量集合列表响应"""
     collections: list[VectorCollectionInfo] = Field(..., description="集合列表")
+
+
+class ReindexStartRequest(BaseModel):
+    """重建向量索引请求"""
+    embedding_model: str = Field(..., description="新的向量模型名称")
+    embedding_model_dir: str | None = Field(default=None, description="向量模型本地目录（可选）")
+    alias: str = Field(default="documents", description="要重建的逻辑集合名（别名）")
+
+
+class ReindexJobInfo(BaseModel):
+    """重建向量索引任务状态"""
+    job_id: str
+    alias: str
+    source_collection: str = Field(..., description="迁移前别名指向的集合")
+    target_collection: str = Field(..., description="新的版本化集合")
+    embedding_model: str
+    status: str = Field(..., description="pending / running / completed / failed")
+    total_chunks: int
+    processed_chunks: int
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    error: str | None = None
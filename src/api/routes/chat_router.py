@@ -30,7 +30,7 @@ async def chat_completion(
     调用 Agent 进行聊天。
     此端点现在通过依赖注入获取应用服务，并调用它来处理业务逻辑。
     """
-    response_data = app_service.handle_chat_request(req=req)
+    response_data = await app_service.handle_chat_request(req=req)
     return success_response(data=response_data)
 
 
@@ -1,35 +1,161 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 
 from ..dependencies import get_document_service
 from ..models import (
     DocumentUploadRequest, DocumentResponse, BatchDeleteRequest, BatchDeleteResponse,
+    DocumentBatchUploadRequest, DocumentBatchItemResult, DocumentBatchUploadResponse,
+    DocumentImportResponse,
 )
 from ..responses import success_response
-from ...services.document_service import DocumentService
+from ...config import get_settings
+from ...services.document_import_service import NdjsonDocumentImporter
+from ...services.document_service import DocumentService, DocumentUploadItem
+from ...services.partition_service import DocumentPartition
 
 router = APIRouter()
 
 
 @router.post("/documents",
              summary="创建文档",
-             description="创建文档，自动分块、向量化并存入向量库")
+             description="创建文档，自动分块、向量化并存入向量库；内容重复时直接复用已有文档")
 def create_document(
         doc_in: DocumentUploadRequest,
+        profile: bool = Query(False, description="是否返回分阶段资源报告（耗时、CPU、内存），会明显变慢"),
         service: DocumentService = Depends(get_document_service),
 ):
-    doc, chunks_count = service.create_document_with_chunks(
+    result = service.create_document_with_chunks(
         name=doc_in.name,
         source_type=doc_in.source_type,
         source_content=doc_in.content,
+        profile=profile,
+        partition=DocumentPartition(kb_id=doc_in.kb_id, project_id=doc_in.project_id, user_id=doc_in.user_id),
     )
     response = DocumentResponse(
-        document_uid=doc.document_uid,
-        name=doc.name,
-        chunks_count=chunks_count,
+        document_uid=result.document.document_uid,
+        name=result.document.name,
+        chunks_count=result.chunks_count,
+        deduplicated=result.deduplicated,
+        boilerplate_chunks=result.boilerplate_chunks,
+        skipped_chunks=result.skipped_chunks,
+        profile=result.profile,
     )
     return success_response(data=response)
 
 
+@router.post("/documents/batch",
+             summary="批量创建文档",
+             description="批量创建文档：并行解析分块，跨文档合并向量化，并批量写入数据库与向量库")
+def create_documents_batch(
+        request: DocumentBatchUploadRequest,
+        service: DocumentService = Depends(get_document_service),
+):
+    """批量创建文档，逐个返回处理结果"""
+    outcomes = service.create_documents_batch([
+        DocumentUploadItem(
+            name=doc.name,
+            source_type=doc.source_type,
+            content=doc.content,
+            partition=DocumentPartition(kb_id=doc.kb_id, project_id=doc.project_id, user_id=doc.user_id),
+        )
+        for doc in request.documents
+    ])
+    items = [
+        DocumentBatchItemResult(
+            index=o.index,
+            name=o.name,
+            success=o.result is not None,
+            document_uid=o.result.document.document_uid if o.result else None,
+            chunks_count=o.result.chunks_count if o.result else 0,
+            deduplicated=o.result.deduplicated if o.result else False,
+            boilerplate_chunks=o.result.boilerplate_chunks if o.result else 0,
+            skipped_chunks=o.result.skipped_chunks if o.result else 0,
+            error=o.error,
+        )
+        for o in outcomes
+    ]
+    success_count = sum(1 for item in items if item.success)
+    response = DocumentBatchUploadResponse(
+        success_count=success_count,
+        failed_count=len(items) - success_count,
+        items=items,
+    )
+    return success_response(
+        data=response,
+        message=f"批量上传完成：成功 {success_count} 个，失败 {len(items) - success_count} 个"
+    )
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[bytes]:
+    """按行切分流式请求体，不把整个请求体读入内存（跨数据块的行先收集片段，遇到换行时一次拼接）"""
+    parts: list[bytes] = []
+    async for data in request.stream():
+        start = 0
+        while (end := data.find(b"\n", start)) >= 0:
+            parts.append(data[start:end])
+            yield b"".join(parts)
+            parts = []
+            start = end + 1
+        if start < len(data):
+            parts.append(data[start:])
+    if parts:
+        yield b"".join(parts)
+
+
+# 每次交给线程池处理的行数：校验、向量化与写入都是阻塞调用，按组执行以减少线程切换
+_IMPORT_FEED_LINES = 256
+
+
+def _feed_lines(importer: NdjsonDocumentImporter, lines: list[tuple[int, bytes]]):
+    """校验并缓冲一组行，缓冲区满时写入（阻塞调用，在线程池中执行）"""
+    for line_no, line in lines:
+        if importer.feed(line_no, line):
+            importer.flush()
+
+
+@router.post("/documents/import",
+             summary="流式导入已分块的文档",
+             description="请求体为 NDJSON（application/x-ndjson），每行一个文档及其分块，可附带已有向量；"
+                         "逐行校验，仅对缺少向量的分块向量化，按批写入数据库与向量库")
+async def import_documents(
+        request: Request,
+        service: DocumentService = Depends(get_document_service),
+):
+    """流式导入 NDJSON 文档，内存占用与请求体大小无关
+
+    读取请求体在事件循环中进行；校验（可能加载模型探测向量维度）、向量化与写入都在线程池中执行。
+    """
+    importer = NdjsonDocumentImporter(service, get_settings().ndjson_import_batch_chunks)
+    line_no = 0
+    pending: list[tuple[int, bytes]] = []
+    async for line in _iter_lines(request):
+        line_no += 1
+        pending.append((line_no, line))
+        if len(pending) >= _IMPORT_FEED_LINES:
+            await run_in_threadpool(_feed_lines, importer, pending)
+            pending = []
+    await run_in_threadpool(_feed_lines, importer, pending)
+    await run_in_threadpool(importer.flush)
+
+    stats = importer.stats
+    response = DocumentImportResponse(
+        documents=stats.documents,
+        deduplicated=stats.deduplicated,
+        chunks=stats.chunks,
+        embedded=stats.embedded,
+        boilerplate_chunks=stats.boilerplate_chunks,
+        skipped_chunks=stats.skipped_chunks,
+        failed=stats.failed,
+        errors=stats.errors,
+    )
+    return success_response(
+        data=response,
+        message=f"导入完成：新建 {stats.documents} 个，复用 {stats.deduplicated} 个，失败 {stats.failed} 条"
+    )
+
+
 @router.get("/documents/list",
             summary="获取文档列表",
             description="获取所有已创建的文档列表")
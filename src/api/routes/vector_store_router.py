@@ -1,18 +1,26 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException
 
-from ..dependencies import get_vector_store
+from ..dependencies import get_async_vector_store, get_collection_embedders, get_reindex_manager, get_vector_store
 from ..models import (
     VectorAddRequest,
     VectorUpdateRequest,
     VectorDeleteRequest,
     VectorSearchRequest,
+    VectorBatchSearchRequest,
     VectorQueryRequest,
     VectorQueryItem,
     VectorCollectionInfo,
     VectorCollectionListResponse,
+    ReindexStartRequest,
+    ReindexJobInfo,
 )
 from ..responses import success_response
-from ...embedding.vector_store import VectorStore
+from ...embedding.async_vector_store import AsyncVectorStore
+from ...embedding.embedder import CollectionEmbedders
+from ...embedding.vector_store import SearchQuery, VectorStore
+from ...services.reindex_service import ReindexManager
 
 router = APIRouter()
 
@@ -132,51 +140,107 @@ def delete_vectors(
 @router.post("/vector_store/search",
              summary="向量检索",
              description="根据查询向量检索最相似的文档")
-def search_vectors(
+async def search_vectors(
         request: VectorSearchRequest,
-        vector_store: VectorStore = Depends(get_vector_store),
+        vector_store: AsyncVectorStore = Depends(get_async_vector_store),
 ):
     """向量检索"""
     try:
-        collection_name = request.collection_name or vector_store.DEFAULT_COLLECTION_NAME
-        vector_store._ensure_collection(collection_name)
-
-        results = vector_store.search(
+        results = await vector_store.asearch(
             query_embedding=request.query_embedding,
             top_k=request.top_k,
             where=request.where,
+            collection_name=request.collection_name or vector_store.DEFAULT_COLLECTION_NAME,
         )
 
-        # 格式化返回结果
-        documents = results.get("documents", [[]])[0]
-        metadatas = results.get("metadatas", [[]])[0]
-        ids = results.get("ids", [[]])[0]
-        distances = results.get("distances", [[]])[0]
+        return success_response(data={"items": _search_items(results), **_partial_info(results)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"向量检索失败: {str(e)}")
 
-        items = []
-        for i in range(len(ids)):
-            items.append({
-                "id": ids[i],
-                "document": documents[i] if i < len(documents) else "",
-                "metadata": metadatas[i] if i < len(metadatas) else {},
-                "distance": distances[i] if i < len(distances) else None,
-            })
 
-        return success_response(data={"items": items})
+@router.post("/vector_store/search/batch",
+             summary="批量向量检索",
+             description="一次请求执行多个检索（向量或文本，各自的 top_k 与 where），where 相同的查询合并为一次向量库调用")
+async def search_vectors_batch(
+        request: VectorBatchSearchRequest,
+        vector_store: AsyncVectorStore = Depends(get_async_vector_store),
+        embedders: CollectionEmbedders = Depends(get_collection_embedders),
+):
+    """批量向量检索，文本查询使用所查集合当前的向量模型"""
+    for i, query in enumerate(request.queries):
+        if (query.query_embedding is None) == (query.query is None):
+            raise HTTPException(
+                status_code=400,
+                detail=f"queries[{i}] 必须且只能提供 query_embedding 或 query 之一"
+            )
+    collection_name = request.collection_name or vector_store.DEFAULT_COLLECTION_NAME
+    try:
+        # 文本查询合并为一次批量向量化，使用所查集合当前的模型；
+        # 获取嵌入器可能需要加载模型，与向量化一起在线程中执行
+        text_positions = [i for i, query in enumerate(request.queries) if query.query is not None]
+        text_embeddings = (
+            await asyncio.to_thread(
+                lambda texts: embedders.get(collection_name).embed_batch(texts),
+                [request.queries[i].query for i in text_positions],
+            )
+            if text_positions else []
+        )
+        embeddings = {i: vector for i, vector in zip(text_positions, text_embeddings)}
+
+        results = await vector_store.asearch_many(
+            [
+                SearchQuery(
+                    query_embedding=embeddings.get(i, query.query_embedding),
+                    top_k=query.top_k,
+                    where=query.where,
+                )
+                for i, query in enumerate(request.queries)
+            ],
+            collection_name=collection_name,
+        )
+        return success_response(data={
+            "results": [{"items": _search_items(result), **_partial_info(result)} for result in results]
+        })
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"向量检索失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"批量向量检索失败: {str(e)}")
+
+
+def _partial_info(results: dict) -> dict:
+    """分片部署下部分分片超时或失败时，结果不完整并列出未返回的分片"""
+    if results.get("partial"):
+        return {"partial": True, "failed_shards": results.get("failed_shards", [])}
+    return {"partial": False}
+
+
+def _search_items(results: dict) -> list[dict]:
+    """将单个查询的检索结果格式化为条目列表"""
+    documents = results.get("documents", [[]])[0]
+    metadatas = results.get("metadatas", [[]])[0]
+    ids = results.get("ids", [[]])[0]
+    distances = results.get("distances", [[]])[0]
+
+    items = []
+    for i in range(len(ids)):
+        items.append({
+            "id": ids[i],
+            "document": documents[i] if i < len(documents) else "",
+            "metadata": metadatas[i] if i < len(metadatas) else {},
+            "distance": distances[i] if i < len(distances) else None,
+        })
+    return items
 
 
 @router.post("/vector_store/query",
              summary="元数据查询",
              description="根据元数据过滤条件查询向量库中的文档内容")
-def query_vectors(request: VectorQueryRequest,
-                  vector_store: VectorStore = Depends(get_vector_store), ):
+async def query_vectors(request: VectorQueryRequest,
+                        vector_store: AsyncVectorStore = Depends(get_async_vector_store), ):
     """按元数据查询向量库"""
     try:
-        results = vector_store.search_by_metadata(
+        results = await vector_store.asearch_by_metadata(
             where=request.where if request.where else None,
             top_k=request.limit,
+            collection_name=request.collection_name or vector_store.DEFAULT_COLLECTION_NAME,
         )
 
         documents = results.get("documents", [[]])[0]
@@ -196,6 +260,18 @@ def query_vectors(request: VectorQueryRequest,
         raise HTTPException(status_code=500, detail=f"元数据查询失败: {str(e)}")
 
 
+@router.get("/vector_store/search_cache/stats",
+            summary="检索缓存统计",
+            description="检索结果缓存的条目数、命中率、淘汰与失效次数（未开启缓存时 enabled 为 false）")
+def get_search_cache_stats(
+        vector_store: VectorStore = Depends(get_vector_store),
+):
+    """检索缓存统计"""
+    if vector_store.search_cache is None:
+        return success_response(data={"enabled": False})
+    return success_response(data={"enabled": True, **vector_store.search_cache.stats()})
+
+
 @router.get("/vector_store/collections",
             summary="列出所有集合",
             description="获取所有向量库集合的列表")
@@ -240,3 +316,31 @@ def delete_collection(collection_name: str,
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"删除集合失败: {str(e)}")
+
+
+@router.post("/vector_store/reindex",
+             summary="重建向量索引",
+             description="后台用新模型将 Postgres 中的分块重新向量化到版本化的新集合，完成后原子切换别名（不停机）")
+def start_reindex(
+        request: ReindexStartRequest,
+        manager: ReindexManager = Depends(get_reindex_manager),
+):
+    """启动重建向量索引任务"""
+    job = manager.start(
+        embedding_model=request.embedding_model,
+        embedding_model_dir=request.embedding_model_dir,
+        alias=request.alias,
+    )
+    return success_response(
+        data=ReindexJobInfo(**job.to_dict()),
+        message=f"重建任务已启动，目标集合 '{job.target_collection}'"
+    )
+
+
+@router.get("/vector_store/reindex",
+            summary="获取重建向量索引任务状态",
+            description="获取当前或最近一次重建向量索引任务的进度")
+def get_reindex_status(manager: ReindexManager = Depends(get_reindex_manager)):
+    """获取重建任务状态"""
+    job = manager.current_job()
+    return success_response(data=ReindexJobInfo(**job.to_dict()) if job else None)
@@ -26,6 +26,7 @@ class ErrorCode(IntEnum):
     VECTOR_STORE_NOT_INITIALIZED = 10200
     VECTOR_STORE_OPERATION_FAILED = 10201
     EMBEDDING_FAILED = 10202
+    REINDEX_ALREADY_RUNNING = 10203
 
     # 配置相关 (10300-10399)
     CONFIG_MISSING = 10300
@@ -74,6 +75,7 @@ ERROR_MESSAGES: Dict[ErrorCode, str] = {
     ErrorCode.VECTOR_STORE_NOT_INITIALIZED: "向量库未初始化",
     ErrorCode.VECTOR_STORE_OPERATION_FAILED: "向量库操作失败",
     ErrorCode.EMBEDDING_FAILED: "向量化失败",
+    ErrorCode.REINDEX_ALREADY_RUNNING: "已有重建索引任务在运行",
     # 配置相关
     ErrorCode.CONFIG_MISSING: "配置项缺失",
     ErrorCode.CONFIG_INVALID: "配置项无效",
@@ -114,6 +116,7 @@ ERROR_HTTP_STATUS: Dict[ErrorCode, int] = {
     ErrorCode.VECTOR_STORE_NOT_INITIALIZED: 500,
     ErrorCode.VECTOR_STORE_OPERATION_FAILED: 500,
     ErrorCode.EMBEDDING_FAILED: 500,
+    ErrorCode.REINDEX_ALREADY_RUNNING: 409,
     ErrorCode.CONFIG_MISSING: 500,
     ErrorCode.CONFIG_INVALID: 500,
     ErrorCode.API_KEY_MISSING: 500,
@@ -113,6 +113,11 @@ class EmbeddingFailedException(SystemException):
         super().__init__(ErrorCode.EMBEDDING_FAILED, detail=detail)
 
 
+class ReindexAlreadyRunningException(BusinessException):
+    def __init__(self, detail: Optional[str] = None):
+        super().__init__(ErrorCode.REINDEX_ALREADY_RUNNING, detail=detail)
+
+
 # 配置相关异常
 class ConfigMissingException(SystemException):
     def __init__(self, detail: Optional[str] = None):
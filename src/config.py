@@ -17,20 +17,110 @@ class Settings(BaseSettings):
     qwen_api_key: str = ""
     qwen_model: str = "qwen-turbo"
 
-    # 向量数据库
+    # 向量数据库：chromadb（Chroma HTTP 服务）/ numpy（进程内 memmap 精确检索）/ hnsw（进程内 HNSW 近似检索，需安装 hnswlib）/
+    # sharded（多个向量库节点组成的分片集群，见 vector_shards），进程内后端的数据目录为 vector_db_path
     vector_store_type: str = "chromadb"
     vector_db_path: str = "./data/vectordb"
     chroma_host: str = "localhost"
     chroma_port: int = 8000
+    # Chroma 运行方式：http（连接 chroma_host:chroma_port）/ embedded（进程内 PersistentClient，数据目录为 vector_db_path）。
+    # 嵌入式模式下数据目录只能由一个进程打开，适合单 worker 的单机部署
+    chroma_mode: str = "http"
+    # 异步向量库（async 路由与工具）同时进行中的向量库请求数上限。
+    # Chroma HTTP 模式下使用异步连接池，其他后端在线程中执行同步调用
+    vector_async_max_concurrency: int = 64
+    # 应用启动时预热默认集合（打开集合并执行一次检索，提前加载索引）
+    vector_store_warm_load: bool = True
+    # numpy 后端量化：none / int8（扫描 int8 码本后用 float32 精确重排，候选数为 top_k * rerank_factor）
+    numpy_quantization: str = "none"
+    numpy_rerank_factor: int = 4
+    # HNSW 后端：图参数 M / ef_construction、检索 ef、每累计多少条写入落盘一次图索引、软删除占比超过多少时重建
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 64
+    hnsw_save_every: int = 20000
+    hnsw_rebuild_deleted_ratio: float = 0.2
+    # 分片模式的节点列表：host:port 为 Chroma HTTP 服务，numpy:<目录> / hnsw:<目录> 为进程内后端。
+    # 写入按 document_uid 一致性哈希路由到单个分片，检索并发查询所有分片后按距离合并。
+    # 端点字符串即分片在哈希环上的标识：扩容时只追加新端点，再执行 python -m src.rebalance_shards 迁移数据
+    vector_shards: list[str] = []
+    # 单个分片的检索超时（秒），超时的分片被跳过，检索结果标记为 partial
+    vector_shard_timeout: float = 2.0
+    # 每个分片在哈希环上的虚拟节点数，越大数据分布越均匀
+    vector_shard_virtual_nodes: int = 128
+    # 向量写入分批：单批大小（不超过客户端上限）、并发批次数、失败重试次数
+    vector_write_batch_size: int = 1000
+    vector_write_concurrency: int = 4
+    vector_write_max_retries: int = 3
+    # 向量写缓冲：累积到该条数或等待超过 max_delay 秒后合并写入，0 表示关闭
+    vector_write_buffer_size: int = 0
+    vector_write_buffer_max_delay: float = 0.5
+    # 写缓冲 flush 失败时放回缓冲区重试，连续失败达到该次数后放弃（记录向量 ID，可通过 rebuild_index 补写）
+    vector_write_buffer_max_attempts: int = 5
+    # 批量删除时单次 $in 条件包含的文档数
+    vector_delete_batch_size: int = 500
+    # 向量检索结果缓存：最大条目数（0 表示关闭）、过期时间（秒）。
+    # 本进程的写入会立即使缓存失效，其他进程（多 worker、离线导入）的写入最多延迟 ttl 秒可见
+    search_cache_size: int = 0
+    search_cache_ttl: float = 30.0
+    # 集合统计缓存：写入时增量更新；每 reconcile_interval 秒与向量库全量对账（覆盖其他进程的写入），
+    # upsert / 删除后计数未知的集合每 stale_interval 秒单独刷新
+    collection_stats_reconcile_interval: float = 300.0
+    collection_stats_stale_interval: float = 5.0
+    # 分区路由：按优先级列出参与路由的维度（kb / project），文档写入第一个有值维度的分区集合
+    # （如 documents_kb_<kb_id>），为空时关闭分区，所有文档写入默认集合（环境变量以 JSON 数组配置）；
+    # 检索多个分区（含不限范围时的全部分区）时最多 partition_search_concurrency 个集合并发查询
+    vector_partition_by: list[str] = []
+    partition_search_concurrency: int = 8
+    # 集合别名缓存时间（秒），别名切换后其他进程最多延迟该时间生效
+    vector_alias_cache_ttl: float = 5.0
+
+    # 重建向量索引：每批读取的分块数、批次间隔（秒，用于限速）
+    reindex_batch_size: int = 256
+    reindex_throttle_seconds: float = 0.1
+    # 重建任务心跳超时（秒）：别名上的双写记录超过该时间未刷新视为任务已中断，允许新任务接管
+    reindex_heartbeat_timeout: float = 600.0
 
     # Embedding
     embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
     embedding_model_dir: str | None = None
+    # 分块向量在 Postgres 中的存储精度：float16 / float32
+    embedding_storage_dtype: str = "float16"
 
     # 向量化参数
     chunk_size: int = 1000
     chunk_overlap: int = 200
     search_top_k: int = 5
+    # 检索模式：vector（仅向量）/ hybrid（Postgres 全文检索 + 向量检索，倒数排名融合）
+    search_mode: str = "vector"
+    # 混合检索：每路候选数（不少于 top_k）、RRF 平滑常数 k
+    hybrid_candidate_k: int = 20
+    hybrid_rrf_k: int = 60
+    # 单次向量化前向传播的最大文本数
+    embedding_batch_size: int = 64
+    # 批量上传时并行解析与分块的线程数
+    ingest_workers: int = 4
+    # 分块数达到该阈值时使用批量 INSERT 写入 DocumentChunk
+    chunk_bulk_insert_threshold: int = 200
+    # 批量 INSERT 每条语句的行数
+    chunk_insert_batch_size: int = 1000
+    # 超过该大小的 .txt（以及 .csv / .jsonl / .log）按记录流式加载与分块
+    stream_file_threshold_bytes: int = 64 * 1024 * 1024
+    # 流式入库时每累积多少个分块向量化并写入一次（决定内存上限）
+    stream_batch_chunks: int = 512
+    # 入库分阶段资源诊断（耗时、CPU、tracemalloc 峰值内存、对象数），开启后会明显变慢
+    ingest_profiling: bool = False
+    # 诊断时是否统计 GC 跟踪对象数（需遍历全部对象，大堆上开销较高）
+    ingest_profiling_count_objects: bool = True
+    # NDJSON 流式导入：累积到该分块数后合并向量化并写入
+    ndjson_import_batch_chunks: int = 2000
+    # 跨文档样板分块（页眉页脚、免责声明等）检测：
+    # 与至少 boilerplate_min_documents 个已有文档中的分块 SimHash 汉明距离不超过 boilerplate_max_distance 即视为样板
+    # 处理策略：off 关闭 / flag 仅标记 / skip 不写入也不向量化 / downweight 标记并在检索时按 boilerplate_weight 降权
+    boilerplate_policy: str = "off"
+    boilerplate_min_documents: int = 3
+    boilerplate_max_distance: int = 3
+    boilerplate_weight: float = 0.5
 
     # Agent 参数
     max_iterations: int = 10
@@ -4,8 +4,8 @@ from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 from uuid import uuid4
 
-from sqlalchemy import Column
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import BigInteger, Column, Computed, Index, LargeBinary
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlmodel import Field, SQLModel
 
 
@@ -85,11 +85,28 @@ class Document(SQLModelBase, table=True):
         default_factory=lambda: uuid4().hex, index=True, unique=True
     )
     user_id: Optional[int] = Field(default=None, index=True)
+    # 分区归属：知识库 / 项目，以及向量所在的逻辑集合（为空表示默认集合，见 PartitionRouter）
+    kb_id: Optional[str] = Field(default=None, index=True, max_length=64)
+    project_id: Optional[str] = Field(default=None, index=True, max_length=64)
+    vector_collection: Optional[str] = Field(default=None, index=True, max_length=63)
     name: str
     source_type: str = Field(max_length=20)  # url / file / text / api
     source: Optional[str] = None
     version: int = Field(default=1)
     status: str = Field(default="active", max_length=20)  # active / disabled / deleted
+    # 去重指纹：原始来源字节 / 归一化文本的 SHA-256
+    source_hash: Optional[str] = Field(
+        default=None,
+        index=True,
+        max_length=64,
+        description="原始来源字节的 SHA-256，URL 来源为空",
+    )
+    content_hash: Optional[str] = Field(
+        default=None,
+        index=True,
+        max_length=64,
+        description="提取并归一化后文本的 SHA-256",
+    )
 
 
 class DocumentChunk(SQLModelBase, table=True):
@@ -108,6 +125,29 @@ class DocumentChunk(SQLModelBase, table=True):
         index=True,
         description="在向量库中的主键，可选",
     )
+    # 分块向量的持久化副本，用于在不重新向量化的情况下重建向量索引
+    embedding: Optional[bytes] = Field(
+        default=None,
+        sa_column=Column(LargeBinary, nullable=True),
+        description="分块向量（紧凑二进制，精度见 embedding_dtype）",
+    )
+    embedding_dtype: Optional[str] = Field(
+        default=None,
+        max_length=10,
+        description="向量存储精度：float16 / float32",
+    )
+    embedding_model: Optional[str] = Field(
+        default=None,
+        max_length=200,
+        description="生成该向量所用的模型",
+    )
+    # 近似重复检测：分块文本的 64 位 SimHash，及是否被识别为跨文档样板内容（页眉页脚、免责声明等）
+    simhash: Optional[int] = Field(
+        default=None,
+        sa_column=Column(BigInteger, nullable=True),
+        description="分块文本的 64 位 SimHash（有符号）",
+    )
+    is_boilerplate: bool = Field(default=False, index=True)
     extra: Optional[Dict[str, Any]] = Field(
         default=None,
         sa_column=Column(JSONB, nullable=True),
@@ -115,6 +155,41 @@ class DocumentChunk(SQLModelBase, table=True):
     )
 
 
+# 关键词检索：由数据库根据 content 生成的全文检索向量 + GIN 索引。
+# simple 词典不做词干化与停用词处理，适合错误码、SKU、函数名等标识符的精确匹配。
+# 不映射为模型字段，ORM 读写分块时不会加载或写入该列，查询时通过 DocumentChunk.__table__.c.content_tsv 引用
+DocumentChunk.__table__.append_column(
+    Column("content_tsv", TSVECTOR, Computed("to_tsvector('simple', content)", persisted=True))
+)
+Index("ix_notes_document_chunk_content_tsv", DocumentChunk.__table__.c.content_tsv, postgresql_using="gin")
+
+
+class VectorCollectionAlias(SQLModelBase, table=True):
+    """向量集合别名：逻辑集合名 -> 实际集合名
+
+    重建向量索引时写入新的版本化集合，完成后只需更新此记录即可原子切换。
+    """
+
+    __tablename__ = "notes_vector_collection_alias"
+
+    alias: str = Field(index=True, unique=True, max_length=100)
+    collection_name: str = Field(max_length=100)
+    embedding_model: Optional[str] = Field(
+        default=None,
+        max_length=200,
+        description="写入该集合所用的向量模型",
+    )
+    embedding_model_dir: Optional[str] = Field(
+        default=None,
+        max_length=500,
+        description="向量模型的本地目录（可选）",
+    )
+    # 重建索引进行中的双写目标：所有进程按别名缓存 TTL 读取，新写入同步以新模型写入该集合
+    dual_write_collection: Optional[str] = Field(default=None, max_length=100)
+    dual_write_model: Optional[str] = Field(default=None, max_length=200)
+    dual_write_model_dir: Optional[str] = Field(default=None, max_length=500)
+
+
 class Memory(SQLModelBase, table=True):
     """长期记忆"""
 
@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Iterator
 import logging
 
+from sqlalchemy import text
 from sqlmodel import SQLModel, Session, create_engine
 
 from ..config import get_settings
@@ -10,6 +11,40 @@ from ..utils.logger import configure_sqlalchemy_logging
 
 _engine = None
 
+# 已有表新增列的幂等迁移：create_all 只创建缺失的表，不会为已存在的表补列或索引。
+# 新增到已有表的列都需要在这里登记（ADD COLUMN IF NOT EXISTS / CREATE INDEX IF NOT EXISTS，可重复执行）
+_COLUMN_MIGRATIONS: list[str] = [
+    # 文档去重指纹
+    "ALTER TABLE notes_document ADD COLUMN IF NOT EXISTS source_hash VARCHAR(64)",
+    "ALTER TABLE notes_document ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "CREATE INDEX IF NOT EXISTS ix_notes_document_source_hash ON notes_document (source_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_notes_document_content_hash ON notes_document (content_hash)",
+    # 文档分区归属与向量所在集合
+    "ALTER TABLE notes_document ADD COLUMN IF NOT EXISTS kb_id VARCHAR(64)",
+    "ALTER TABLE notes_document ADD COLUMN IF NOT EXISTS project_id VARCHAR(64)",
+    "ALTER TABLE notes_document ADD COLUMN IF NOT EXISTS vector_collection VARCHAR(63)",
+    "CREATE INDEX IF NOT EXISTS ix_notes_document_kb_id ON notes_document (kb_id)",
+    "CREATE INDEX IF NOT EXISTS ix_notes_document_project_id ON notes_document (project_id)",
+    "CREATE INDEX IF NOT EXISTS ix_notes_document_vector_collection ON notes_document (vector_collection)",
+    # 分块向量的持久化副本
+    "ALTER TABLE notes_document_chunk ADD COLUMN IF NOT EXISTS embedding BYTEA",
+    "ALTER TABLE notes_document_chunk ADD COLUMN IF NOT EXISTS embedding_dtype VARCHAR(10)",
+    "ALTER TABLE notes_document_chunk ADD COLUMN IF NOT EXISTS embedding_model VARCHAR(200)",
+    # 跨文档样板检测（NOT NULL 列需要默认值才能加到已有行上）
+    "ALTER TABLE notes_document_chunk ADD COLUMN IF NOT EXISTS simhash BIGINT",
+    "ALTER TABLE notes_document_chunk ADD COLUMN IF NOT EXISTS is_boilerplate BOOLEAN NOT NULL DEFAULT false",
+    "CREATE INDEX IF NOT EXISTS ix_notes_document_chunk_is_boilerplate ON notes_document_chunk (is_boilerplate)",
+    # 关键词检索的全文检索生成列与 GIN 索引（见 models.py 中 DocumentChunk 的 content_tsv）
+    "ALTER TABLE notes_document_chunk ADD COLUMN IF NOT EXISTS content_tsv tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_notes_document_chunk_content_tsv ON notes_document_chunk USING gin (content_tsv)",
+    # 别名记录模型目录与重建索引双写状态
+    "ALTER TABLE notes_vector_collection_alias ADD COLUMN IF NOT EXISTS embedding_model_dir VARCHAR(500)",
+    "ALTER TABLE notes_vector_collection_alias ADD COLUMN IF NOT EXISTS dual_write_collection VARCHAR(100)",
+    "ALTER TABLE notes_vector_collection_alias ADD COLUMN IF NOT EXISTS dual_write_model VARCHAR(200)",
+    "ALTER TABLE notes_vector_collection_alias ADD COLUMN IF NOT EXISTS dual_write_model_dir VARCHAR(500)",
+]
+
 
 def get_engine():
     """惰性创建数据库引擎"""
@@ -35,6 +70,14 @@ def init_db() -> None:
     from . import models  # noqa: F401  确保模型被导入
 
     SQLModel.metadata.create_all(engine)
+    _apply_column_migrations(engine)
+
+
+def _apply_column_migrations(engine) -> None:
+    """为已存在的表补齐新增列与索引"""
+    with engine.begin() as conn:
+        for statement in _COLUMN_MIGRATIONS:
+            conn.execute(text(statement))
 
 
 def get_session() -> Iterator[Session]:
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import time
+
+from .vector_store import SearchQuery, VectorStore
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class AsyncVectorStore:
+    """VectorStore 的异步检索接口（asearch、asearch_many、asearch_by_metadata），供 async 路由与工具使用
+
+    连接 Chroma HTTP 服务时（指定 host）使用 chromadb.AsyncHttpClient：请求走 httpx 异步连接池，
+    等待向量库响应期间不占用线程，并发只受 max_concurrency（同时进行中的向量库请求数）限制。
+    其他后端（嵌入式 Chroma、numpy、hnsw）本身在进程内同步计算，退化为在线程中调用同步 VectorStore。
+
+    与同步 VectorStore 共享别名解析、写缓冲与检索结果缓存；写入、删除与集合管理仍通过同步 VectorStore
+    （由同步路由在线程池中执行），写入后同样使这里缓存的检索结果失效。
+    """
+
+    def __init__(
+            self,
+            store: VectorStore,
+            host: str | None = None,
+            port: int = 8000,
+            max_concurrency: int = 64,
+    ):
+        self.store = store
+        self.host = host
+        self.port = port
+        # 同时进行中的向量库请求数上限
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._client = None
+        self._client_lock = asyncio.Lock()
+        # 异步集合句柄缓存：实际集合名 -> AsyncCollection
+        self._handles: dict[str, object] = {}
+        self._handles_lock = asyncio.Lock()
+        # 同步 VectorStore 删除集合或丢弃句柄时，同时丢弃异步句柄
+        store.add_collection_listener(self._forget_handle)
+
+    @property
+    def DEFAULT_COLLECTION_NAME(self) -> str:
+        return self.store.DEFAULT_COLLECTION_NAME
+
+    @property
+    def native(self) -> bool:
+        """是否使用原生异步客户端（否则在线程中调用同步 VectorStore）"""
+        return self.host is not None
+
+    # ---------- 客户端与句柄 ----------
+
+    async def _get_client(self):
+        if self._client is None:
+            async with self._client_lock:
+                if self._client is None:
+                    import chromadb
+                    self._client = await chromadb.AsyncHttpClient(host=self.host, port=self.port)
+        return self._client
+
+    async def _collection_handle(self, physical_name: str):
+        handle = self._handles.get(physical_name)
+        if handle is not None:
+            return handle
+        client = await self._get_client()
+        async with self._handles_lock:
+            handle = self._handles.get(physical_name)
+            if handle is None:
+                async with self._semaphore:
+                    handle = await client.get_or_create_collection(
+                        name=physical_name,
+                        metadata={"hnsw:space": "cosine"}
+                    )
+                self._handles[physical_name] = handle
+        return handle
+
+    def _forget_handle(self, physical_name: str | None):
+        if physical_name is None:
+            self._handles.clear()
+        else:
+            self._handles.pop(physical_name, None)
+
+    def _prepare(self, collection_name: str | None) -> str:
+        """解析集合名并写入该集合缓冲区中的数据（别名缓存过期时会同步查询 Postgres）"""
+        physical_name = self.store._resolve(collection_name)
+        self.store._flush_pending(physical_name)
+        return physical_name
+
+    async def _open(self, collection_name: str | None = None) -> tuple[str, object]:
+        """解析集合名并获取异步句柄，先写入该集合缓冲区中的数据，保证读到自己的写入
+
+        别名解析与 flush 都是阻塞调用，放到线程中执行，不阻塞事件循环。
+        """
+        physical_name = await asyncio.to_thread(self._prepare, collection_name)
+        return physical_name, await self._collection_handle(physical_name)
+
+    async def _run(self, func, *args, **kwargs):
+        """非 HTTP 后端：在线程中调用同步 VectorStore"""
+        async with self._semaphore:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def _call(self, method, **kwargs):
+        """调用异步集合方法，受 max_concurrency 限制"""
+        async with self._semaphore:
+            return await method(**kwargs)
+
+    # ---------- 检索 ----------
+
+    async def asearch(
+            self,
+            query_embedding: list[float],
+            top_k: int = 5,
+            where: dict | None = None,
+            collection_name: str | None = None,
+    ) -> dict:
+        """检索相似文档，可选 where 过滤（与 VectorStore.search 相同）"""
+        if not self.native:
+            return await self._run(self.store.search, query_embedding, top_k, where, collection_name)
+        physical_name, collection = await self._open(collection_name)
+
+        cache_key = self.store._cache_key(physical_name, query_embedding, where, top_k)
+        if cache_key is not None:
+            cached = self.store.search_cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"[AsyncVectorStore] 检索命中缓存 | collection: {physical_name} | top_k: {top_k}")
+                return cached
+
+        query_kwargs = {
+            "query_embeddings": [query_embedding],
+            "n_results": top_k,
+        }
+        # ChromaDB 不接受空字典，只在有有效条件时才添加 where
+        if where:
+            query_kwargs["where"] = where
+        try:
+            results = await self._call(collection.query, **query_kwargs)
+        except Exception as e:
+            logger.error(f"[AsyncVectorStore] 检索失败: {e}")
+            raise
+        if cache_key is not None:
+            self.store.search_cache.put(cache_key, results)
+
+        doc_count = len(results.get("documents", [[]])[0]) if results.get("documents") else 0
+        logger.info(f"[AsyncVectorStore] 检索完成 | 返回 {doc_count} 个结果")
+        return results
+
+    async def asearch_many(self, queries: list[SearchQuery], collection_name: str | None = None) -> list[dict]:
+        """批量检索（与 VectorStore.search_many 相同），where 不同的查询组并发执行"""
+        if not self.native:
+            return await self._run(self.store.search_many, queries, collection_name)
+        if not queries:
+            return []
+        physical_name, collection = await self._open(collection_name)
+
+        results: list[dict | None] = [None] * len(queries)
+        cache_keys = [
+            self.store._cache_key(physical_name, query.query_embedding, query.where, query.top_k) for query in queries
+        ]
+        groups: dict[str, list[int]] = {}
+        for i, query in enumerate(queries):
+            if cache_keys[i] is not None:
+                results[i] = self.store.search_cache.get(cache_keys[i])
+                if results[i] is not None:
+                    continue
+            key = json.dumps(query.where, sort_keys=True, ensure_ascii=False, default=str) if query.where else ""
+            groups.setdefault(key, []).append(i)
+
+        async def run_group(positions: list[int]):
+            where = queries[positions[0]].where
+            query_kwargs = {
+                "query_embeddings": [queries[i].query_embedding for i in positions],
+                "n_results": max(queries[i].top_k for i in positions),
+            }
+            if where:
+                query_kwargs["where"] = where
+            grouped = await self._call(collection.query, **query_kwargs)
+            for row, i in enumerate(positions):
+                top_k = queries[i].top_k
+                results[i] = {
+                    key: [grouped[key][row][:top_k]]
+                    for key in ("ids", "documents", "metadatas", "distances")
+                    if grouped.get(key) is not None
+                }
+                if cache_keys[i] is not None:
+                    self.store.search_cache.put(cache_keys[i], results[i])
+
+        try:
+            await asyncio.gather(*(run_group(positions) for positions in groups.values()))
+        except Exception as e:
+            logger.error(f"[AsyncVectorStore] 批量检索失败: {e}")
+            raise
+
+        logger.info(f"[AsyncVectorStore] 批量检索完成 | queries: {len(queries)} | calls: {len(groups)}")
+        return results
+
+    async def asearch_by_metadata(
+            self,
+            top_k: int = 5,
+            where: dict | None = None,
+            collection_name: str | None = None,
+    ) -> dict:
+        """按元数据过滤查询文档（与 VectorStore.search_by_metadata 相同）"""
+        if not self.native:
+            return await self._run(self.store.search_by_metadata, top_k, where, collection_name)
+        _, collection = await self._open(collection_name)
+
+        get_kwargs = {"limit": top_k}
+        if where:
+            get_kwargs["where"] = where
+        try:
+            results = await self._call(collection.get, **get_kwargs)
+        except Exception as e:
+            logger.error(f"[AsyncVectorStore] 元数据查询失败: {e}")
+            raise
+        return {
+            "documents": [results.get("documents", [])],
+            "distances": [[]],  # 元数据查询没有距离
+            "metadatas": [results.get("metadatas", [])],
+            "ids": [results.get("ids", [])],
+        }
+
+    # ---------- 生命周期 ----------
+
+    async def awarm_load(self, collection_name: str | None = None):
+        """预热异步客户端：建立连接并打开集合，失败只记录警告"""
+        if not self.native:
+            return
+        collection_name = collection_name or self.DEFAULT_COLLECTION_NAME
+        started = time.perf_counter()
+        try:
+            _, collection = await self._open(collection_name)
+            count = await self._call(collection.count)
+            logger.info(
+                f"[AsyncVectorStore] 异步客户端预热完成 | collection: {collection_name} | count: {count} | "
+                f"elapsed: {time.perf_counter() - started:.2f}s"
+            )
+        except Exception as e:
+            logger.warning(f"[AsyncVectorStore] 异步客户端预热失败 | collection: {collection_name} | error: {e}")
+
+    async def aclose(self):
+        """关闭异步客户端的连接池并丢弃句柄（应用关闭时调用，同步 VectorStore 由其自身的 close 关闭）"""
+        self._handles.clear()
+        client, self._client = self._client, None
+        if client is None:
+            return
+        # 较早的 chromadb 版本的异步客户端没有关闭方法，连接在客户端被回收时释放
+        close = getattr(client, "aclose", None) or getattr(client, "close", None)
+        if close is None:
+            return
+        try:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+            logger.info("[AsyncVectorStore] 异步客户端已关闭")
+        except Exception as e:
+            logger.warning(f"[AsyncVectorStore] 关闭异步客户端失败: {e}")
@@ -0,0 +1,8 @@
+from .base import VectorBackendClient, VectorBackendCollection
+from .factory import create_vector_client
+
+__all__ = [
+    "VectorBackendClient",
+    "VectorBackendCollection",
+    "create_vector_client",
+]
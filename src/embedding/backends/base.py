@@ -0,0 +1,105 @@
+from abc import ABC, abstractmethod
+from typing import Any
+
+
+class VectorBackendCollection(ABC):
+    """向量集合接口约定
+
+    与 chromadb Collection 的方法与返回结构保持一致，VectorStore 只依赖这些方法，
+    因此 chromadb 的集合可直接使用，进程内后端实现同样的接口即可替换。
+
+    - query 返回 {"ids", "documents", "metadatas", "distances"}，每项为"每个查询一个列表"；
+    - get 返回 {"ids", "documents", "metadatas"}（include 含 "embeddings" 时附带向量）；
+    - distances 为余弦距离（1 - 余弦相似度），与 Chroma 的 hnsw:space=cosine 一致；
+    - where 支持 $eq / $ne / $in / $nin / $gt / $gte / $lt / $lte / $and / $or。
+    """
+
+    name: str
+
+    @abstractmethod
+    def count(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add(
+            self,
+            ids: list[str],
+            embeddings: list[list[float]],
+            documents: list[str] | None = None,
+            metadatas: list[dict] | None = None,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def upsert(
+            self,
+            ids: list[str],
+            embeddings: list[list[float]],
+            documents: list[str] | None = None,
+            metadatas: list[dict] | None = None,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update(
+            self,
+            ids: list[str],
+            embeddings: list[list[float]] | None = None,
+            documents: list[str] | None = None,
+            metadatas: list[dict] | None = None,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, ids: list[str] | None = None, where: dict | None = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(
+            self,
+            ids: list[str] | None = None,
+            where: dict | None = None,
+            limit: int | None = None,
+            offset: int | None = None,
+            include: list[str] | None = None,
+    ) -> dict[str, Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def query(
+            self,
+            query_embeddings: list[list[float]],
+            n_results: int = 10,
+            where: dict | None = None,
+            include: list[str] | None = None,
+    ) -> dict[str, Any]:
+        raise NotImplementedError
+
+
+class VectorBackendClient(ABC):
+    """向量库客户端接口约定（与 chromadb Client 一致）"""
+
+    @abstractmethod
+    def get_or_create_collection(self, name: str, metadata: dict | None = None) -> VectorBackendCollection:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_collection(self, name: str) -> VectorBackendCollection:
+        """获取已存在的集合，不存在时抛出 ValueError"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_collection(self, name: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_collections(self) -> list[VectorBackendCollection]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_max_batch_size(self) -> int:
+        raise NotImplementedError
+
+    def close(self):
+        """释放资源、写入未落盘的数据（进程内后端使用）"""
+        pass
@@ -0,0 +1,70 @@
+from .base import VectorBackendClient
+
+
+def create_vector_client(backend: str, **kwargs) -> VectorBackendClient:
+    """向量库客户端工厂：根据 vector_store_type 创建对应客户端
+
+    chromadb 的 HttpClient / PersistentClient 与 VectorBackendClient 接口一致，直接返回；
+    各后端的依赖按需导入，未使用的后端无需安装。
+    """
+    backend = backend.lower().strip()
+
+    if backend == "chromadb":
+        import chromadb
+        mode = kwargs.get("chroma_mode", "http").lower().strip()
+        if mode == "embedded":
+            # 嵌入式模式：进程内读写本地持久化目录，省去 HTTP 序列化与网络往返
+            return chromadb.PersistentClient(path=kwargs.get("path", "./data/vectordb"))
+        if mode != "http":
+            raise ValueError(f"Unsupported chroma mode: {mode}. Supported: http, embedded")
+        return chromadb.HttpClient(
+            host=kwargs.get("host", "localhost"),
+            port=kwargs.get("port", 8000),
+        )
+    elif backend == "numpy":
+        from .numpy_backend import NumpyVectorClient
+        return NumpyVectorClient(
+            path=kwargs.get("path", "./data/vectordb"),
+            quantization=kwargs.get("numpy_quantization", "none"),
+            rerank_factor=kwargs.get("numpy_rerank_factor", 4),
+        )
+    elif backend == "hnsw":
+        try:
+            from .hnsw_backend import HnswVectorClient
+        except ImportError as e:
+            raise ImportError("vector_store_type=hnsw 需要安装 hnswlib：pip install 'notes[hnsw]'") from e
+        return HnswVectorClient(
+            path=kwargs.get("path", "./data/vectordb"),
+            m=kwargs.get("hnsw_m", 16),
+            ef_construction=kwargs.get("hnsw_ef_construction", 200),
+            ef_search=kwargs.get("hnsw_ef_search", 64),
+            save_every=kwargs.get("hnsw_save_every", 20_000),
+            rebuild_deleted_ratio=kwargs.get("hnsw_rebuild_deleted_ratio", 0.2),
+        )
+    elif backend == "sharded":
+        from .sharded_backend import ShardedVectorClient
+        shards = {spec: _create_shard_client(spec, **kwargs) for spec in kwargs.get("shards") or []}
+        return ShardedVectorClient(
+            shards,
+            virtual_nodes=kwargs.get("shard_virtual_nodes", 128),
+            read_timeout=kwargs.get("shard_timeout", 2.0),
+        )
+    else:
+        raise ValueError(f"Unsupported vector store type: {backend}. "
+                         f"Supported: chromadb, numpy, hnsw, sharded")
+
+
+def _create_shard_client(spec: str, **kwargs) -> VectorBackendClient:
+    """按端点字符串创建单个分片的客户端
+
+    host:port（可带 http:// 前缀）为 Chroma HTTP 服务；numpy:<目录> / hnsw:<目录> 为进程内后端，
+    便于本地开发时在一台机器上模拟多个分片。
+    """
+    backend, _, path = spec.partition(":")
+    if backend in ("numpy", "hnsw") and path:
+        return create_vector_client(backend, **{**kwargs, "path": path})
+    address = spec.removeprefix("http://").rstrip("/")
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid vector shard endpoint: {spec}. Expected host:port, numpy:<path> or hnsw:<path>")
+    return create_vector_client("chromadb", chroma_mode="http", host=host, port=int(port))
@@ -0,0 +1,597 @@
+from __future__ import annotations
+
+import json
+import re
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+import hnswlib
+import numpy as np
+
+from .base import VectorBackendClient, VectorBackendCollection
+from ...utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_VALID_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$")
+# 可直接写进 SQL 路径表达式的元数据键（其余键通过参数绑定）
+_PLAIN_KEY = re.compile(r"^[A-Za-z0-9_]+$")
+# 建立表达式索引的元数据键（VectorSearchTool 与按文档删除均按 document_uid 过滤）
+_INDEXED_KEYS = ("document_uid",)
+# 过滤后候选数不超过该值时直接精确计算，避免 HNSW 在稀疏过滤下召回不足
+_EXACT_SEARCH_MAX_CANDIDATES = 4096
+# 已软删除元素至少达到该数量才触发重建
+_REBUILD_MIN_DELETED = 1000
+# 重建与对账时每次从 SQLite 读取的行数
+_SCAN_BATCH_SIZE = 10_000
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class _WhereCompiler:
+    """将 Chroma 风格的 where 条件编译为基于 json_extract 的 SQL 条件"""
+
+    _COMPARE = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+    def __init__(self):
+        self.params: list[Any] = []
+
+    def compile(self, where: dict) -> str:
+        clauses = []
+        for key, condition in where.items():
+            if key == "$and":
+                clauses.append("(" + " AND ".join(self.compile(sub) for sub in condition) + ")" if condition else "1")
+            elif key == "$or":
+                clauses.append("(" + " OR ".join(self.compile(sub) for sub in condition) + ")" if condition else "0")
+            elif isinstance(condition, dict):
+                clauses.extend(self._condition(key, op, operand) for op, operand in condition.items())
+            else:
+                clauses.append(self._condition(key, "$eq", condition))
+        return " AND ".join(clauses) if clauses else "1"
+
+    def _path(self, key: str, function: str = "json_extract") -> str:
+        if _PLAIN_KEY.match(key):
+            return f"{function}(metadata, '$.\"{key}\"')"
+        self.params.append(f'$."{key}"')
+        return f"{function}(metadata, ?)"
+
+    def _condition(self, key: str, op: str, operand) -> str:
+        if op == "$eq":
+            self.params.append(operand)
+            return f"{self._path(key)} = ?"
+        if op == "$ne":
+            path = self._path(key)
+            self.params.append(operand)
+            return f"({path} IS NOT NULL AND {path} != ?)"
+        if op in ("$in", "$nin"):
+            if not operand:
+                return "0" if op == "$in" else f"{self._path(key)} IS NOT NULL"
+            path = self._path(key)
+            self.params.extend(operand)
+            placeholders = ", ".join("?" * len(operand))
+            if op == "$in":
+                return f"{path} IN ({placeholders})"
+            return f"({path} IS NOT NULL AND {path} NOT IN ({placeholders}))"
+        if op in self._COMPARE:
+            type_check = self._path(key, "json_type")
+            path = self._path(key)
+            self.params.append(operand)
+            return f"({type_check} IN ('integer', 'real') AND {path} {self._COMPARE[op]} ?)"
+        raise ValueError(f"不支持的过滤操作: {op}")
+
+
+class HnswCollection(VectorBackendCollection):
+    """进程内 HNSW 近似检索集合
+
+    存储布局（目录 <path>/<name>/）：
+    - index.bin：hnswlib 图索引，打开时整体读入内存（hnswlib 不支持 mmap），不重新构图；
+    - records.sqlite：旁路元数据库（label、id、文本、元数据 JSON、原始向量），
+      where 过滤编译为 SQL 在此执行，document_uid 建有表达式索引；
+    - collection.json：集合元信息（维度、HNSW 参数等）。
+
+    写入即时进入内存中的图索引并提交到 SQLite，图索引每累计 save_every 条写入落盘一次，
+    关闭时再落盘；进程崩溃后以 SQLite 为准对账（补回缺失的向量、标记多余的元素）。
+    删除为软删除（mark_deleted），软删除元素占比超过 rebuild_deleted_ratio 时用存活向量重建图。
+
+    检索：过滤后候选较少时精确计算，否则在 HNSW 上带过滤函数检索。所有操作由集合级可重入锁串行化。
+    """
+
+    INDEX_FILE = "index.bin"
+    RECORDS_FILE = "records.sqlite"
+    META_FILE = "collection.json"
+
+    def __init__(
+            self,
+            name: str,
+            directory: Path,
+            metadata: dict | None = None,
+            m: int = 16,
+            ef_construction: int = 200,
+            ef_search: int = 64,
+            save_every: int = 20_000,
+            rebuild_deleted_ratio: float = 0.2,
+    ):
+        self.name = name
+        self.metadata = metadata or {}
+        self._dir = directory
+        self._lock = threading.RLock()
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.save_every = max(1, save_every)
+        self.rebuild_deleted_ratio = rebuild_deleted_ratio
+
+        self._dim: int | None = None
+        self._index: hnswlib.Index | None = None
+        self._next_label = 0
+        self._live = 0
+        self._unsaved = 0
+
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self._dir / self.RECORDS_FILE, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "label INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, document TEXT, metadata TEXT, embedding BLOB NOT NULL)"
+        )
+        for key in _INDEXED_KEYS:
+            self._db.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_records_{key} ON records(json_extract(metadata, '$.\"{key}\"'))"
+            )
+        self._db.commit()
+        self._load()
+
+    # ---------- 持久化 ----------
+
+    def _load(self):
+        meta_path = self._dir / self.META_FILE
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            self._dim = meta.get("dim")
+            self.metadata = meta.get("metadata") or self.metadata
+            self.m = meta.get("m", self.m)
+            self.ef_construction = meta.get("ef_construction", self.ef_construction)
+        else:
+            self._write_meta()
+
+        self._live, max_label = self._db.execute("SELECT COUNT(*), MAX(label) FROM records").fetchone()
+        self._next_label = (max_label + 1) if max_label is not None else 0
+        if self._dim is None:
+            return
+
+        index_path = self._dir / self.INDEX_FILE
+        if index_path.exists():
+            self._index = hnswlib.Index(space="cosine", dim=self._dim)
+            # hnswlib 只能把图索引整体读入内存（没有 mmap 加载方式），常驻内存约为 index.bin 的大小；
+            # 原始向量与元数据留在 SQLite 中按需读取，不随图索引常驻
+            self._index.load_index(str(index_path), max_elements=max(self._live, 1024))
+            self._reconcile()
+        else:
+            self._rebuild()
+        self._index.set_ef(self.ef_search)
+        logger.info(
+            f"[HnswBackend] 加载集合 | name: {self.name} | count: {self._live} | dim: {self._dim} | "
+            f"elements: {self._index.element_count}"
+        )
+
+    def _write_meta(self):
+        (self._dir / self.META_FILE).write_text(
+            json.dumps(
+                {
+                    "name": self.name,
+                    "dim": self._dim,
+                    "metadata": self.metadata,
+                    "m": self.m,
+                    "ef_construction": self.ef_construction,
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+
+    def _reconcile(self):
+        """以 SQLite 为准修正上次未落盘的图索引：补回缺失的元素，标记已删除的元素"""
+        index_labels = set(self._index.get_ids_list())
+        if index_labels:
+            self._next_label = max(self._next_label, max(index_labels) + 1)
+        live_labels = {label for (label,) in self._db.execute("SELECT label FROM records")}
+        missing = sorted(live_labels - index_labels)
+        for start in range(0, len(missing), 900):
+            part = missing[start:start + 900]
+            rows = self._db.execute(
+                f"SELECT label, embedding FROM records WHERE label IN ({', '.join('?' * len(part))})", part
+            ).fetchall()
+            self._ensure_capacity(self._index.element_count + len(rows))
+            self._index.add_items(
+                np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows]),
+                [label for label, _ in rows],
+            )
+        stale = 0
+        for label in index_labels - live_labels:
+            try:
+                self._index.mark_deleted(label)
+                stale += 1
+            except RuntimeError:
+                # 已是软删除状态
+                pass
+        if missing or stale:
+            logger.info(
+                f"[HnswBackend] 对账图索引 | name: {self.name} | added: {len(missing)} | deleted: {stale}"
+            )
+            self._save()
+
+    def _save(self):
+        if self._index is None:
+            return
+        index_path = self._dir / self.INDEX_FILE
+        tmp_path = self._dir / (self.INDEX_FILE + ".tmp")
+        self._index.save_index(str(tmp_path))
+        tmp_path.replace(index_path)
+        self._unsaved = 0
+
+    def _new_index(self, capacity: int) -> hnswlib.Index:
+        index = hnswlib.Index(space="cosine", dim=self._dim)
+        index.init_index(max_elements=max(capacity, 1024), ef_construction=self.ef_construction, M=self.m)
+        index.set_ef(self.ef_search)
+        return index
+
+    def _rebuild(self):
+        """用 SQLite 中的存活向量重建图索引，清除软删除的元素"""
+        logger.info(f"[HnswBackend] 重建图索引 | name: {self.name} | live: {self._live}")
+        index = self._new_index(int(self._live * 1.25))
+        cursor = self._db.execute("SELECT label, embedding FROM records ORDER BY label")
+        while True:
+            rows = cursor.fetchmany(_SCAN_BATCH_SIZE)
+            if not rows:
+                break
+            index.add_items(
+                np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows]),
+                [label for label, _ in rows],
+            )
+        self._index = index
+        self._save()
+
+    def _ensure_capacity(self, rows: int):
+        capacity = self._index.get_max_elements()
+        if rows > capacity:
+            self._index.resize_index(max(rows, capacity * 2))
+
+    def _deleted_count(self) -> int:
+        return self._index.element_count - self._live if self._index is not None else 0
+
+    def _after_write(self, items: int):
+        self._unsaved += items
+        if self._unsaved >= self.save_every:
+            self._save()
+
+    def _maybe_rebuild(self):
+        deleted = self._deleted_count()
+        if deleted >= _REBUILD_MIN_DELETED and deleted > self._index.element_count * self.rebuild_deleted_ratio:
+            self._rebuild()
+
+    # ---------- 元数据 ----------
+
+    def _select_labels(self, ids: list[str] | None, where: dict | None) -> list[int]:
+        sql, params = self._filter_sql(ids, where)
+        return [label for (label,) in self._db.execute(f"SELECT label FROM records WHERE {sql}", params)]
+
+    def _select_vectors(self, where: dict | None, limit: int | None = None) -> list[tuple[int, bytes]]:
+        sql, params = self._filter_sql(None, where)
+        sql = f"SELECT label, embedding FROM records WHERE {sql}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._db.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _filter_sql(ids: list[str] | None, where: dict | None) -> tuple[str, list]:
+        clauses, params = [], []
+        if ids is not None:
+            clauses.append(f"id IN ({', '.join('?' * len(ids))})" if ids else "0")
+            params.extend(ids)
+        if where:
+            compiler = _WhereCompiler()
+            clauses.append(compiler.compile(where))
+            params.extend(compiler.params)
+        return (" AND ".join(clauses) if clauses else "1"), params
+
+    def _fetch(self, labels: list[int]) -> dict[int, tuple]:
+        found: dict[int, tuple] = {}
+        for start in range(0, len(labels), 900):
+            part = labels[start:start + 900]
+            for label, id_, document, metadata in self._db.execute(
+                    f"SELECT label, id, document, metadata FROM records WHERE label IN ({', '.join('?' * len(part))})",
+                    part,
+            ):
+                found[label] = (id_, document, json.loads(metadata) if metadata else None)
+        return found
+
+    # ---------- 集合接口 ----------
+
+    def count(self) -> int:
+        with self._lock:
+            return self._live
+
+    def _write(self, ids, embeddings, documents, metadatas, mode: str):
+        """写入一批记录：mode 为 add（已存在的 ID 报错）或 upsert（覆盖，沿用原 label）"""
+        if not ids:
+            return
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+            raise ValueError("embeddings 与 ids 数量不一致")
+
+        with self._lock:
+            if self._dim is None:
+                self._dim = int(matrix.shape[1])
+                self._write_meta()
+                self._index = self._new_index(len(ids))
+            elif matrix.shape[1] != self._dim:
+                raise ValueError(f"向量维度不匹配：集合为 {self._dim}，写入为 {matrix.shape[1]}")
+
+            existing = dict(self._db.execute(
+                f"SELECT id, label FROM records WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ).fetchall())
+            if mode == "add" and existing:
+                raise ValueError(f"ID 已存在: {list(existing)[:5]}")
+
+            new_ids = 0
+            labels = []
+            for id_ in ids:
+                label = existing.get(id_)
+                if label is None:
+                    label = self._next_label
+                    self._next_label += 1
+                    new_ids += 1
+                    existing[id_] = label
+                labels.append(label)
+
+            self._ensure_capacity(self._index.element_count + len(ids))
+            self._index.add_items(matrix, labels)
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO records(label, id, document, metadata, embedding) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            label,
+                            id_,
+                            documents[i] if documents else None,
+                            json.dumps(metadatas[i], ensure_ascii=False) if metadatas and metadatas[i] else None,
+                            matrix[i].tobytes(),
+                        )
+                        for i, (id_, label) in enumerate(zip(ids, labels))
+                    ],
+                )
+            self._live += new_ids
+            self._after_write(len(ids))
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        self._write(ids, embeddings, documents, metadatas, mode="add")
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        self._write(ids, embeddings, documents, metadatas, mode="upsert")
+
+    def update(self, ids, embeddings=None, documents=None, metadatas=None):
+        with self._lock:
+            if not ids or self._index is None:
+                return
+            existing = dict(self._db.execute(
+                f"SELECT id, label FROM records WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ).fetchall())
+            positions = [i for i, id_ in enumerate(ids) if id_ in existing]
+            if not positions:
+                return
+            with self._db:
+                if embeddings is not None:
+                    matrix = np.asarray([embeddings[i] for i in positions], dtype=np.float32)
+                    labels = [existing[ids[i]] for i in positions]
+                    self._index.add_items(matrix, labels)
+                    self._db.executemany(
+                        "UPDATE records SET embedding = ? WHERE label = ?",
+                        [(vector.tobytes(), label) for vector, label in zip(matrix, labels)],
+                    )
+                if documents is not None:
+                    self._db.executemany(
+                        "UPDATE records SET document = ? WHERE id = ?",
+                        [(documents[i], ids[i]) for i in positions],
+                    )
+                if metadatas is not None:
+                    self._db.executemany(
+                        "UPDATE records SET metadata = ? WHERE id = ?",
+                        [
+                            (json.dumps(metadatas[i], ensure_ascii=False) if metadatas[i] else None, ids[i])
+                            for i in positions
+                        ],
+                    )
+            self._after_write(len(positions))
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            if self._index is None or (ids is None and not where):
+                return
+            labels = self._select_labels(ids, where)
+            if not labels:
+                return
+            for label in labels:
+                self._index.mark_deleted(label)
+            with self._db:
+                for start in range(0, len(labels), 900):
+                    part = labels[start:start + 900]
+                    self._db.execute(f"DELETE FROM records WHERE label IN ({', '.join('?' * len(part))})", part)
+            self._live -= len(labels)
+            self._after_write(len(labels))
+            self._maybe_rebuild()
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None):
+        with self._lock:
+            sql, params = self._filter_sql(ids, where)
+            columns = "id, document, metadata" + (", embedding" if include and "embeddings" in include else "")
+            sql = f"SELECT {columns} FROM records WHERE {sql} ORDER BY label"
+            if limit is not None or offset:
+                sql += " LIMIT ? OFFSET ?"
+                params = [*params, limit if limit is not None else -1, offset or 0]
+            rows = self._db.execute(sql, params).fetchall()
+        result = {
+            "ids": [row[0] for row in rows],
+            "documents": [row[1] for row in rows],
+            "metadatas": [json.loads(row[2]) if row[2] else None for row in rows],
+        }
+        if include and "embeddings" in include:
+            result["embeddings"] = [np.frombuffer(row[3], dtype=np.float32).tolist() for row in rows]
+        return result
+
+    def query(self, query_embeddings, n_results=10, where=None, include=None):
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        result: dict[str, list] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            if self._index is None or self._live == 0:
+                for key in result:
+                    result[key] = [[] for _ in range(len(queries))]
+                return result
+
+            # 带过滤时先按上限读取候选向量：候选较少时直接精确计算，否则在 HNSW 上带过滤函数检索
+            exact_rows, allowed = None, None
+            if where:
+                exact_rows = self._select_vectors(where, limit=_EXACT_SEARCH_MAX_CANDIDATES + 1)
+                if len(exact_rows) > _EXACT_SEARCH_MAX_CANDIDATES:
+                    exact_rows, allowed = None, set(self._select_labels(None, where))
+            candidates = self._live if not where else len(exact_rows if exact_rows is not None else allowed)
+            k = min(n_results, candidates)
+            if k == 0:
+                for key in result:
+                    result[key] = [[] for _ in range(len(queries))]
+                return result
+
+            if exact_rows is not None:
+                labels, distances = self._exact_search(queries, exact_rows, k)
+            else:
+                try:
+                    self._index.set_ef(max(self.ef_search, k))
+                    if allowed is None:
+                        labels, distances = self._index.knn_query(queries, k=k)
+                    else:
+                        labels, distances = self._index.knn_query(
+                            queries, k=k, num_threads=1, filter=lambda label: label in allowed
+                        )
+                except RuntimeError:
+                    # 软删除或过滤使可达元素不足 k 个时 hnswlib 报错，退化为精确计算
+                    logger.warning(f"[HnswBackend] HNSW 检索结果不足，改为精确检索 | name: {self.name} | k: {k}")
+                    labels, distances = self._exact_search(queries, self._select_vectors(where), k)
+
+            records = self._fetch(sorted({int(label) for row in labels for label in row}))
+
+        for row_labels, row_distances in zip(labels, distances):
+            hits = [(records[int(label)], float(distance)) for label, distance in zip(row_labels, row_distances)]
+            result["ids"].append([record[0] for record, _ in hits])
+            result["documents"].append([record[1] for record, _ in hits])
+            result["metadatas"].append([record[2] for record, _ in hits])
+            result["distances"].append([distance for _, distance in hits])
+        return result
+
+    @staticmethod
+    def _exact_search(queries: np.ndarray, rows: list[tuple[int, bytes]], k: int) -> tuple[np.ndarray, np.ndarray]:
+        """对给定的 (label, 向量) 做精确余弦检索"""
+        label_array = np.fromiter((label for label, _ in rows), dtype=np.int64, count=len(rows))
+        vectors = np.frombuffer(b"".join(blob for _, blob in rows), dtype=np.float32).reshape(len(rows), -1)
+        scores = _normalize(queries) @ _normalize(vectors).T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return label_array[top], 1.0 - np.take_along_axis(top_scores, order, axis=1)
+
+    def rebuild(self):
+        """手动重建图索引（清除全部软删除元素）"""
+        with self._lock:
+            if self._index is not None:
+                self._rebuild()
+
+    def close(self):
+        with self._lock:
+            if self._index is not None and self._unsaved:
+                self._save()
+            self._db.close()
+
+
+class HnswVectorClient(VectorBackendClient):
+    """进程内 HNSW 向量库客户端：每个集合一个目录，适合百万级分块的近似检索
+
+    与 numpy 后端相同，数据只在本进程内可见，多 worker 部署时应继续使用 Chroma 服务。
+    """
+
+    def __init__(
+            self,
+            path: str,
+            m: int = 16,
+            ef_construction: int = 200,
+            ef_search: int = 64,
+            save_every: int = 20_000,
+            rebuild_deleted_ratio: float = 0.2,
+            max_batch_size: int = 10_000,
+    ):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_batch_size = max_batch_size
+        self._options = {
+            "m": m,
+            "ef_construction": ef_construction,
+            "ef_search": ef_search,
+            "save_every": save_every,
+            "rebuild_deleted_ratio": rebuild_deleted_ratio,
+        }
+        self._lock = threading.Lock()
+        self._collections: dict[str, HnswCollection] = {}
+
+    def _open(self, name: str, metadata: dict | None = None) -> HnswCollection:
+        if not _VALID_NAME.match(name):
+            raise ValueError(f"非法的集合名: {name}")
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = HnswCollection(name, self.path / name, metadata, **self._options)
+            self._collections[name] = collection
+        return collection
+
+    def get_or_create_collection(self, name: str, metadata: dict | None = None) -> HnswCollection:
+        with self._lock:
+            return self._open(name, metadata)
+
+    def get_collection(self, name: str) -> HnswCollection:
+        with self._lock:
+            if name not in self._collections and not (self.path / name).is_dir():
+                raise ValueError(f"Collection {name} does not exist.")
+            return self._open(name)
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            collection = self._collections.pop(name, None)
+            if collection is not None:
+                collection.close()
+            directory = self.path / name
+            if not directory.is_dir():
+                raise ValueError(f"Collection {name} does not exist.")
+            shutil.rmtree(directory)
+
+    def list_collections(self) -> list[HnswCollection]:
+        with self._lock:
+            return [
+                self._open(directory.name)
+                for directory in sorted(self.path.iterdir())
+                if directory.is_dir() and (directory / HnswCollection.META_FILE).exists()
+            ]
+
+    def get_max_batch_size(self) -> int:
+        return self.max_batch_size
+
+    def close(self):
+        """将所有集合未落盘的图索引写入磁盘"""
+        with self._lock:
+            for collection in self._collections.values():
+                collection.close()
+            self._collections.clear()
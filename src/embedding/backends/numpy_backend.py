@@ -0,0 +1,691 @@
+from __future__ import annotations
+
+import json
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .base import VectorBackendClient, VectorBackendCollection
+from ...utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_VALID_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$")
+# 掩码缓存条目上限，超过后整体清空
+_MASK_CACHE_SIZE = 256
+# 已删除行超过该数量且多于有效行时，打开集合时压缩文件
+_COMPACT_MIN_DEAD_ROWS = 1000
+# 量化扫描时每次反量化的行数：块小到能留在 CPU 缓存中时扫描最快（临时 float32 块约 BLOCK * dim * 4 字节）
+_SCAN_BLOCK_ROWS = 4096
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+def _quantize_int8(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """逐行对称 int8 标量量化：code = round(x / scale)，scale = max|x| / 127"""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class NumpyCollection(VectorBackendCollection):
+    """进程内精确检索集合
+
+    存储布局（目录 <path>/<name>/）：
+    - vectors.f32：归一化后的 float32 向量矩阵，按行 memmap，容量按倍数扩展；
+    - records.jsonl：追加写的记录日志（put / del），打开时重放得到 id、文本与元数据；
+    - collection.json：集合元信息（维度等）。
+
+    检索为一次矩阵乘法 + argpartition 的精确 top-k；where 过滤由元数据倒排表生成布尔掩码，
+    掩码按条件缓存，写入后失效。所有操作由集合级可重入锁串行化。
+
+    quantization=int8 时额外维护逐行量化的 int8 码本（vectors.i8 + scales.f32，约为 float32 的 1/4）：
+    检索先按块扫描码本取 k * rerank_factor 个候选，再读取 float32 memmap 中的候选行精确重排。
+    float32 文件只被随机读取少量行，可以留在磁盘上，常驻内存的只有码本。
+    码本可由 float32 文件随时重建，开关量化无需重新写入数据。
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    CODES_FILE = "vectors.i8"
+    SCALES_FILE = "scales.f32"
+    RECORDS_FILE = "records.jsonl"
+    META_FILE = "collection.json"
+
+    def __init__(
+            self,
+            name: str,
+            directory: Path,
+            metadata: dict | None = None,
+            quantization: str = "none",
+            rerank_factor: int = 4,
+    ):
+        if quantization not in ("none", "int8"):
+            raise ValueError(f"Unsupported quantization: {quantization}. Supported: none, int8")
+        self.name = name
+        self.metadata = metadata or {}
+        self.quantization = quantization
+        self.rerank_factor = max(1, rerank_factor)
+        self._dir = directory
+        self._lock = threading.RLock()
+
+        self._dim: int | None = None
+        self._capacity = 0
+        self._size = 0
+        self._vectors: np.memmap | None = None
+        self._codes: np.memmap | None = None
+        self._scales: np.memmap | None = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._ids: list[str | None] = []
+        self._documents: list[str | None] = []
+        self._metadatas: list[dict | None] = []
+        self._row_of: dict[str, int] = {}
+        # 元数据倒排表：key -> value -> 行号集合（仅有效行）
+        self._postings: dict[str, dict[Any, set[int]]] = {}
+        self._mask_cache: dict[str, np.ndarray] = {}
+        self._log = None
+
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    # ---------- 持久化 ----------
+
+    def _load(self):
+        meta_path = self._dir / self.META_FILE
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            self._dim = meta.get("dim")
+            self.metadata = meta.get("metadata") or self.metadata
+        else:
+            self._write_meta()
+
+        if self._dim:
+            vectors_path = self._dir / self.VECTORS_FILE
+            capacity = vectors_path.stat().st_size // (4 * self._dim) if vectors_path.exists() else 0
+            if capacity:
+                self._capacity = capacity
+                self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self._dim))
+                self._alive = np.zeros(capacity, dtype=bool)
+
+        records_path = self._dir / self.RECORDS_FILE
+        if records_path.exists():
+            with records_path.open(encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        op = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 进程崩溃时最后一行可能不完整
+                        logger.warning(f"[NumpyBackend] 跳过损坏的记录行 | collection: {self.name}")
+                        continue
+                    if op["op"] == "put" and op["row"] < self._capacity:
+                        self._set_row(op["row"], op["id"], op.get("document"), op.get("metadata"))
+                    elif op["op"] == "del":
+                        self._clear_row(op["row"])
+
+        self._log = records_path.open("a", encoding="utf-8")
+        dead = self._size - int(self._alive[:self._size].sum())
+        if dead >= _COMPACT_MIN_DEAD_ROWS and dead > self._size - dead:
+            self._compact()
+            return
+        self._load_codes()
+        logger.info(f"[NumpyBackend] 加载集合 | name: {self.name} | count: {self.count()} | dim: {self._dim}")
+
+    def _write_meta(self):
+        (self._dir / self.META_FILE).write_text(
+            json.dumps(
+                {
+                    "name": self.name,
+                    "dim": self._dim,
+                    "metadata": self.metadata,
+                    # 码本与 float32 文件同步时记录量化方式；为空表示码本不存在或已过期
+                    "quantization": self.quantization if self._codes is not None else None,
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+
+    def _load_codes(self):
+        """打开量化码本；码本缺失或与当前配置不一致时由 float32 文件重建"""
+        codes_path = self._dir / self.CODES_FILE
+        scales_path = self._dir / self.SCALES_FILE
+        meta_path = self._dir / self.META_FILE
+        synced = json.loads(meta_path.read_text(encoding="utf-8")).get("quantization") if meta_path.exists() else None
+
+        if self.quantization == "none" or not self._capacity:
+            if synced is not None or codes_path.exists():
+                # 关闭量化（或集合为空）：删除码本，避免之后重新开启时使用过期的码本
+                self._codes = self._scales = None
+                codes_path.unlink(missing_ok=True)
+                scales_path.unlink(missing_ok=True)
+                self._write_meta()
+            return
+
+        if (
+                synced == self.quantization
+                and codes_path.exists() and codes_path.stat().st_size == self._capacity * self._dim
+                and scales_path.exists() and scales_path.stat().st_size == self._capacity * 4
+        ):
+            self._codes = np.memmap(codes_path, dtype=np.int8, mode="r+", shape=(self._capacity, self._dim))
+            self._scales = np.memmap(scales_path, dtype=np.float32, mode="r+", shape=(self._capacity,))
+            return
+
+        logger.info(f"[NumpyBackend] 构建量化码本 | name: {self.name} | rows: {self._size} | mode: {self.quantization}")
+        with codes_path.open("wb") as f:
+            f.truncate(self._capacity * self._dim)
+        with scales_path.open("wb") as f:
+            f.truncate(self._capacity * 4)
+        self._codes = np.memmap(codes_path, dtype=np.int8, mode="r+", shape=(self._capacity, self._dim))
+        self._scales = np.memmap(scales_path, dtype=np.float32, mode="r+", shape=(self._capacity,))
+        for start in range(0, self._size, _SCAN_BLOCK_ROWS):
+            end = min(start + _SCAN_BLOCK_ROWS, self._size)
+            self._codes[start:end], self._scales[start:end] = _quantize_int8(np.asarray(self._vectors[start:end]))
+        self._codes.flush()
+        self._scales.flush()
+        self._write_meta()
+
+    def _write_codes(self, rows, matrix: np.ndarray):
+        if self._codes is None:
+            return
+        codes, scales = _quantize_int8(matrix)
+        self._codes[rows] = codes
+        self._scales[rows] = scales
+        self._codes.flush()
+        self._scales.flush()
+
+    def _append_log(self, ops: list[dict]):
+        self._log.write("".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops))
+        self._log.flush()
+
+    def _ensure_capacity(self, rows: int):
+        """保证向量矩阵至少容纳 rows 行，按倍数扩容"""
+        if rows <= self._capacity:
+            return
+        new_capacity = max(rows, self._capacity * 2, 1024)
+        vectors_path = self._dir / self.VECTORS_FILE
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with vectors_path.open("ab") as f:
+            f.truncate(new_capacity * self._dim * 4)
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(new_capacity, self._dim))
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:self._capacity] = self._alive[:self._capacity]
+        self._alive = alive
+        self._capacity = new_capacity
+
+        if self._codes is not None:
+            self._codes.flush()
+            self._scales.flush()
+            self._codes = self._scales = None
+            with (self._dir / self.CODES_FILE).open("ab") as f:
+                f.truncate(new_capacity * self._dim)
+            with (self._dir / self.SCALES_FILE).open("ab") as f:
+                f.truncate(new_capacity * 4)
+            self._codes = np.memmap(
+                self._dir / self.CODES_FILE, dtype=np.int8, mode="r+", shape=(new_capacity, self._dim)
+            )
+            self._scales = np.memmap(self._dir / self.SCALES_FILE, dtype=np.float32, mode="r+", shape=(new_capacity,))
+        elif self.quantization != "none":
+            # 集合打开时为空、尚无码本：首次写入时创建
+            self._load_codes()
+
+    def _compact(self):
+        """重写文件，去掉已删除的行"""
+        rows = np.flatnonzero(self._alive[:self._size])
+        logger.info(f"[NumpyBackend] 压缩集合 | name: {self.name} | live: {len(rows)} | rows: {self._size}")
+        vectors = np.array(self._vectors[rows]) if len(rows) else np.zeros((0, self._dim), dtype=np.float32)
+        records = [(self._ids[r], self._documents[r], self._metadatas[r]) for r in rows]
+
+        self._log.close()
+        self._vectors = self._codes = self._scales = None
+        # 码本按压缩后的行号由 _load 重建
+        (self._dir / self.CODES_FILE).unlink(missing_ok=True)
+        (self._dir / self.SCALES_FILE).unlink(missing_ok=True)
+        tmp_vectors = self._dir / (self.VECTORS_FILE + ".tmp")
+        tmp_records = self._dir / (self.RECORDS_FILE + ".tmp")
+        vectors.tofile(tmp_vectors)
+        with tmp_records.open("w", encoding="utf-8") as f:
+            for row, (id_, document, metadata) in enumerate(records):
+                f.write(json.dumps(
+                    {"op": "put", "row": row, "id": id_, "document": document, "metadata": metadata},
+                    ensure_ascii=False,
+                ) + "\n")
+        tmp_vectors.replace(self._dir / self.VECTORS_FILE)
+        tmp_records.replace(self._dir / self.RECORDS_FILE)
+
+        self._capacity = 0
+        self._size = 0
+        self._alive = np.zeros(0, dtype=bool)
+        self._ids, self._documents, self._metadatas = [], [], []
+        self._row_of, self._postings, self._mask_cache = {}, {}, {}
+        self._load()
+
+    # ---------- 行维护 ----------
+
+    def _set_row(self, row: int, id_: str, document: str | None, metadata: dict | None):
+        if row >= len(self._ids):
+            grow = row + 1 - len(self._ids)
+            self._ids.extend([None] * grow)
+            self._documents.extend([None] * grow)
+            self._metadatas.extend([None] * grow)
+        if self._alive[row]:
+            self._unindex(row)
+        self._ids[row] = id_
+        self._documents[row] = document
+        self._metadatas[row] = metadata
+        self._row_of[id_] = row
+        self._alive[row] = True
+        self._size = max(self._size, row + 1)
+        for key, value in (metadata or {}).items():
+            if isinstance(value, (str, int, float, bool)):
+                self._postings.setdefault(key, {}).setdefault(value, set()).add(row)
+
+    def _clear_row(self, row: int):
+        if row >= self._size or not self._alive[row]:
+            return
+        self._unindex(row)
+        self._row_of.pop(self._ids[row], None)
+        self._alive[row] = False
+        self._ids[row] = self._documents[row] = self._metadatas[row] = None
+
+    def _unindex(self, row: int):
+        for key, value in (self._metadatas[row] or {}).items():
+            rows = self._postings.get(key, {}).get(value)
+            if rows is not None:
+                rows.discard(row)
+                if not rows:
+                    del self._postings[key][value]
+
+    def _write(self, ids, embeddings, documents, metadatas, mode: str):
+        """写入一批记录：mode 为 add（已存在的 ID 报错）或 upsert（覆盖）"""
+        if not ids:
+            return
+        matrix = _normalize(np.asarray(embeddings, dtype=np.float32))
+        if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+            raise ValueError("embeddings 与 ids 数量不一致")
+        # 同一批次内的重复 ID：add 报错，upsert 以最后一条为准（否则会追加出两条有效记录）
+        last = {id_: i for i, id_ in enumerate(ids)}
+        if len(last) != len(ids):
+            if mode == "add":
+                raise ValueError(f"批次内 ID 重复: {[id_ for id_ in last if ids.count(id_) > 1][:5]}")
+            keep = sorted(last.values())
+            ids = [ids[i] for i in keep]
+            matrix = matrix[keep]
+            documents = [documents[i] for i in keep] if documents else documents
+            metadatas = [metadatas[i] for i in keep] if metadatas else metadatas
+
+        with self._lock:
+            if self._dim is None:
+                self._dim = int(matrix.shape[1])
+                self._write_meta()
+            elif matrix.shape[1] != self._dim:
+                raise ValueError(f"向量维度不匹配：集合为 {self._dim}，写入为 {matrix.shape[1]}")
+            if mode == "add":
+                duplicated = [id_ for id_ in ids if id_ in self._row_of]
+                if duplicated:
+                    raise ValueError(f"ID 已存在: {duplicated[:5]}")
+
+            rows = []
+            next_row = self._size
+            for id_ in ids:
+                row = self._row_of.get(id_)
+                if row is None:
+                    row = next_row
+                    next_row += 1
+                rows.append(row)
+            self._ensure_capacity(next_row)
+
+            self._vectors[rows] = matrix
+            self._vectors.flush()
+            self._write_codes(rows, matrix)
+            ops = []
+            for i, (id_, row) in enumerate(zip(ids, rows)):
+                document = documents[i] if documents else None
+                metadata = metadatas[i] if metadatas else None
+                self._set_row(row, id_, document, metadata)
+                ops.append({"op": "put", "row": row, "id": id_, "document": document, "metadata": metadata})
+            self._append_log(ops)
+            self._mask_cache.clear()
+
+    # ---------- 过滤 ----------
+
+    def _where_mask(self, where: dict | None) -> np.ndarray:
+        """将 where 条件转换为有效行的布尔掩码（长度为 _size），按条件缓存"""
+        alive = self._alive[:self._size]
+        if not where:
+            return alive
+        cache_key = json.dumps(where, sort_keys=True, ensure_ascii=False, default=str)
+        mask = self._mask_cache.get(cache_key)
+        if mask is None:
+            mask = self._eval_where(where) & alive
+            if len(self._mask_cache) >= _MASK_CACHE_SIZE:
+                self._mask_cache.clear()
+            self._mask_cache[cache_key] = mask
+        return mask
+
+    def _rows_mask(self, rows) -> np.ndarray:
+        mask = np.zeros(self._size, dtype=bool)
+        if rows:
+            mask[list(rows)] = True
+        return mask
+
+    def _eval_where(self, where: dict) -> np.ndarray:
+        masks = []
+        for key, condition in where.items():
+            if key == "$and":
+                mask = np.ones(self._size, dtype=bool)
+                for sub in condition:
+                    mask &= self._eval_where(sub)
+            elif key == "$or":
+                mask = np.zeros(self._size, dtype=bool)
+                for sub in condition:
+                    mask |= self._eval_where(sub)
+            elif isinstance(condition, dict):
+                mask = np.ones(self._size, dtype=bool)
+                for op, operand in condition.items():
+                    mask &= self._eval_condition(key, op, operand)
+            else:
+                mask = self._eval_condition(key, "$eq", condition)
+            masks.append(mask)
+
+        result = np.ones(self._size, dtype=bool)
+        for mask in masks:
+            result &= mask
+        return result
+
+    def _eval_condition(self, key: str, op: str, operand) -> np.ndarray:
+        postings = self._postings.get(key, {})
+        if op == "$eq":
+            return self._rows_mask(postings.get(operand, ()))
+        if op == "$in":
+            return self._rows_mask(set().union(*(postings.get(v, set()) for v in operand)) if operand else ())
+
+        has_key = self._rows_mask(set().union(*postings.values()) if postings else ())
+        if op == "$ne":
+            return has_key & ~self._rows_mask(postings.get(operand, ()))
+        if op == "$nin":
+            excluded = set().union(*(postings.get(v, set()) for v in operand)) if operand else set()
+            return has_key & ~self._rows_mask(excluded)
+
+        compare = {
+            "$gt": lambda v: v > operand,
+            "$gte": lambda v: v >= operand,
+            "$lt": lambda v: v < operand,
+            "$lte": lambda v: v <= operand,
+        }.get(op)
+        if compare is None:
+            raise ValueError(f"不支持的过滤操作: {op}")
+        rows: set[int] = set()
+        for value, value_rows in postings.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and compare(value):
+                rows |= value_rows
+        return self._rows_mask(rows)
+
+    # ---------- 集合接口 ----------
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._alive[:self._size].sum())
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        self._write(ids, embeddings, documents, metadatas, mode="add")
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        self._write(ids, embeddings, documents, metadatas, mode="upsert")
+
+    def update(self, ids, embeddings=None, documents=None, metadatas=None):
+        with self._lock:
+            existing = [(i, self._row_of[id_]) for i, id_ in enumerate(ids) if id_ in self._row_of]
+            if not existing:
+                return
+            if embeddings is not None:
+                matrix = _normalize(np.asarray([embeddings[i] for i, _ in existing], dtype=np.float32))
+                self._vectors[[row for _, row in existing]] = matrix
+                self._vectors.flush()
+                self._write_codes([row for _, row in existing], matrix)
+            ops = []
+            for i, row in existing:
+                document = documents[i] if documents is not None else self._documents[row]
+                metadata = metadatas[i] if metadatas is not None else self._metadatas[row]
+                self._set_row(row, ids[i], document, metadata)
+                ops.append({"op": "put", "row": row, "id": ids[i], "document": document, "metadata": metadata})
+            self._append_log(ops)
+            self._mask_cache.clear()
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            if ids is not None:
+                rows = {self._row_of[id_] for id_ in ids if id_ in self._row_of}
+                if where:
+                    rows &= set(np.flatnonzero(self._where_mask(where)).tolist())
+            elif where:
+                rows = set(np.flatnonzero(self._where_mask(where)).tolist())
+            else:
+                return
+            if not rows:
+                return
+            for row in rows:
+                self._clear_row(row)
+            self._append_log([{"op": "del", "row": row} for row in sorted(rows)])
+            self._mask_cache.clear()
+
+    def _records(self, rows, include: list[str] | None) -> dict[str, Any]:
+        result = {
+            "ids": [self._ids[r] for r in rows],
+            "documents": [self._documents[r] for r in rows],
+            "metadatas": [self._metadatas[r] for r in rows],
+        }
+        if include and "embeddings" in include:
+            result["embeddings"] = [self._vectors[r].tolist() for r in rows]
+        return result
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None):
+        with self._lock:
+            if ids is not None:
+                rows = [self._row_of[id_] for id_ in ids if id_ in self._row_of]
+                if where:
+                    mask = self._where_mask(where)
+                    rows = [r for r in rows if mask[r]]
+            else:
+                rows = np.flatnonzero(self._where_mask(where)).tolist()
+            start = offset or 0
+            rows = rows[start:start + limit] if limit is not None else rows[start:]
+            return self._records(rows, include)
+
+    def query(self, query_embeddings, n_results=10, where=None, include=None):
+        queries = _normalize(np.asarray(query_embeddings, dtype=np.float32))
+        result: dict[str, list] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            if self._dim is None or self._size == 0:
+                for key in result:
+                    result[key] = [[] for _ in range(len(queries))]
+                return result
+
+            mask = self._where_mask(where)
+            candidates = np.flatnonzero(mask)
+            k = min(n_results, len(candidates))
+            if k == 0:
+                for key in result:
+                    result[key] = [[] for _ in range(len(queries))]
+                return result
+
+            subset = len(candidates) * 4 < self._size
+            if self._codes is not None:
+                hits = self._quantized_search(queries, mask, candidates if subset else None, k)
+            else:
+                hits = self._exact_search(queries, mask, candidates if subset else None, k)
+
+            for rows, scores in hits:
+                records = self._records(rows.tolist(), include)
+                result["ids"].append(records["ids"])
+                result["documents"].append(records["documents"])
+                result["metadatas"].append(records["metadatas"])
+                result["distances"].append((1.0 - scores).astype(float).tolist())
+        return result
+
+    def _exact_search(self, queries, mask, candidates, k) -> list[tuple[np.ndarray, np.ndarray]]:
+        """在 float32 向量上精确检索，返回每个查询的 (行号, 相似度)，按相似度降序"""
+        # 候选行较少时只对候选行做矩阵乘法，否则整体相乘后屏蔽不满足条件的行（避免复制大矩阵）
+        if candidates is not None:
+            scores = queries @ self._vectors[candidates].T
+        else:
+            scores = queries @ self._vectors[:self._size].T
+            if not mask.all():
+                scores[:, ~mask] = -np.inf
+
+        hits = []
+        for row_scores in scores:
+            top = np.argpartition(-row_scores, k - 1)[:k]
+            top = top[np.argsort(-row_scores[top])]
+            hits.append((candidates[top] if candidates is not None else top, row_scores[top]))
+        return hits
+
+    def _quantized_search(self, queries, mask, candidates, k) -> list[tuple[np.ndarray, np.ndarray]]:
+        """先按块扫描 int8 码本取 k * rerank_factor 个候选，再用 float32 向量精确重排"""
+        total = len(candidates) if candidates is not None else self._size
+        m = min(k * self.rerank_factor, total)
+        block_rows, block_scores = [], []
+        for start in range(0, total, _SCAN_BLOCK_ROWS):
+            end = min(start + _SCAN_BLOCK_ROWS, total)
+            rows = candidates[start:end] if candidates is not None else np.arange(start, end)
+            if candidates is not None:
+                codes, scales = self._codes[rows], self._scales[rows]
+            else:
+                codes, scales = self._codes[start:end], self._scales[start:end]
+            approx = (queries @ codes.astype(np.float32).T) * scales
+            if candidates is None:
+                approx[:, ~mask[start:end]] = -np.inf
+            take = min(m, end - start)
+            top = np.argpartition(-approx, take - 1, axis=1)[:, :take]
+            block_rows.append(rows[top])
+            block_scores.append(np.take_along_axis(approx, top, axis=1))
+
+        rows = np.concatenate(block_rows, axis=1)
+        approx = np.concatenate(block_scores, axis=1)
+        top = np.argpartition(-approx, m - 1, axis=1)[:, :m]
+        shortlist = np.take_along_axis(rows, top, axis=1)
+        valid = np.take_along_axis(approx, top, axis=1) > -np.inf
+
+        # 所有查询的候选行合并后一次读取 float32 向量
+        unique_rows = np.unique(shortlist[valid])
+        exact = queries @ self._vectors[unique_rows].T
+
+        hits = []
+        for i in range(len(queries)):
+            query_rows = shortlist[i][valid[i]]
+            query_scores = exact[i, np.searchsorted(unique_rows, query_rows)]
+            order = np.argsort(-query_scores)[:k]
+            hits.append((query_rows[order], query_scores[order]))
+        return hits
+
+    def memory_usage(self) -> dict:
+        """向量数据占用（字节）：float32 文件与量化码本；开启量化后常驻内存的只有码本"""
+        with self._lock:
+            float_bytes = self._size * (self._dim or 0) * 4
+            code_bytes = self._size * ((self._dim or 0) + 4) if self._codes is not None else 0
+            return {
+                "rows": self._size,
+                "dim": self._dim,
+                "quantization": self.quantization if self._codes is not None else "none",
+                "float_bytes": float_bytes,
+                "code_bytes": code_bytes,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            if self._codes is not None:
+                self._codes.flush()
+                self._scales.flush()
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+
+class NumpyVectorClient(VectorBackendClient):
+    """进程内向量库客户端：每个集合一个目录，适合单集合几十万分块以内的精确检索
+
+    数据只在本进程内可见，多进程（多个 uvicorn worker）部署时各进程不会看到彼此的写入，
+    应配合单 worker 使用，或继续使用 Chroma 服务。
+    quantization=int8 时检索扫描 int8 码本并精确重排，常驻内存约为 float32 的 1/4。
+    """
+
+    def __init__(
+            self,
+            path: str,
+            max_batch_size: int = 100_000,
+            quantization: str = "none",
+            rerank_factor: int = 4,
+    ):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_batch_size = max_batch_size
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        self._lock = threading.Lock()
+        self._collections: dict[str, NumpyCollection] = {}
+
+    def _open(self, name: str, metadata: dict | None = None) -> NumpyCollection:
+        if not _VALID_NAME.match(name):
+            raise ValueError(f"非法的集合名: {name}")
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = NumpyCollection(
+                name,
+                self.path / name,
+                metadata,
+                quantization=self.quantization,
+                rerank_factor=self.rerank_factor,
+            )
+            self._collections[name] = collection
+        return collection
+
+    def get_or_create_collection(self, name: str, metadata: dict | None = None) -> NumpyCollection:
+        with self._lock:
+            return self._open(name, metadata)
+
+    def get_collection(self, name: str) -> NumpyCollection:
+        with self._lock:
+            if name not in self._collections and not (self.path / name).is_dir():
+                raise ValueError(f"Collection {name} does not exist.")
+            return self._open(name)
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            collection = self._collections.pop(name, None)
+            if collection is not None:
+                collection.close()
+            directory = self.path / name
+            if not directory.is_dir():
+                raise ValueError(f"Collection {name} does not exist.")
+            shutil.rmtree(directory)
+
+    def list_collections(self) -> list[NumpyCollection]:
+        with self._lock:
+            return [
+                self._open(directory.name)
+                for directory in sorted(self.path.iterdir())
+                if directory.is_dir() and (directory / NumpyCollection.META_FILE).exists()
+            ]
+
+    def get_max_batch_size(self) -> int:
+        return self.max_batch_size
+
+    def close(self):
+        with self._lock:
+            for collection in self._collections.values():
+                collection.close()
+            self._collections.clear()
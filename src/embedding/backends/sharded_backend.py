@@ -0,0 +1,349 @@
+import bisect
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+from .base import VectorBackendClient, VectorBackendCollection
+from ...utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 合并检索结果时保留的字段（每个查询一个列表）
+_RESULT_KEYS = ("ids", "documents", "metadatas", "distances")
+# 分片上不存在集合时的占位结果
+_MISSING = object()
+
+
+def _hash64(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """一致性哈希环：每个节点映射为 virtual_nodes 个虚拟节点
+
+    增加节点时只有约 1/N 的键改变归属，其余键仍落在原节点上。
+    """
+
+    def __init__(self, nodes: list[str], virtual_nodes: int = 128):
+        if not nodes:
+            raise ValueError("一致性哈希环至少需要一个节点")
+        points = sorted(
+            (_hash64(f"{node}#{i}"), node)
+            for node in nodes
+            for i in range(max(1, virtual_nodes))
+        )
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: str) -> str:
+        i = bisect.bisect(self._hashes, _hash64(key)) % len(self._hashes)
+        return self._nodes[i]
+
+
+def routing_key(id_: str, metadata: dict | None) -> str:
+    """分片路由键：同一文档的分块落在同一分片，没有 document_uid 时按向量 ID 路由"""
+    document_uid = (metadata or {}).get("document_uid")
+    return str(document_uid) if document_uid else id_
+
+
+def is_missing_collection(error: Exception) -> bool:
+    """异常是否表示分片上不存在该集合（本地后端与旧版 Chroma 抛 ValueError，新版 Chroma 抛 NotFoundError）"""
+    return isinstance(error, ValueError) or type(error).__name__ in ("NotFoundError", "InvalidCollectionException")
+
+
+class ShardedCollection(VectorBackendCollection):
+    """跨分片的逻辑集合
+
+    - 写入（add / upsert）按 document_uid 一致性哈希路由到单个分片；
+    - update 先定位 ID 所在分片（扩容迁移期间可能不在哈希环指定的分片上）；
+    - 删除广播到所有分片；
+    - query 并发查询所有分片，合并后按距离取 top_k。单个分片超时或失败时跳过，
+      结果中 partial 为 True，failed_shards 列出未返回的分片；全部失败时抛出异常。
+    """
+
+    def __init__(self, name: str, client: "ShardedVectorClient", metadata: dict | None = None):
+        self.name = name
+        self.metadata = metadata
+        self._client = client
+        self._handles: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def shard_handle(self, shard: str):
+        """分片上的集合句柄（新加入的分片上按需创建），也供按分片迁移数据使用"""
+        with self._lock:
+            handle = self._handles.get(shard)
+        if handle is None:
+            handle = self._client.shards[shard].get_or_create_collection(
+                name=self.name,
+                metadata=self.metadata or {"hnsw:space": "cosine"},
+            )
+            with self._lock:
+                self._handles[shard] = handle
+        return handle
+
+    def _set_handle(self, shard: str, handle):
+        with self._lock:
+            self._handles[shard] = handle
+
+    def _on_shards(
+            self,
+            func: Callable[[Any], Any],
+            shards: list[str] | None = None,
+            timeout: float | None = None,
+    ) -> tuple[dict[str, Any], dict[str, str]]:
+        return self._client.fan_out(lambda shard: func(self.shard_handle(shard)), shards, timeout)
+
+    @staticmethod
+    def _raise_failed(operation: str, failed: dict[str, str]):
+        if failed:
+            raise RuntimeError(f"分片{operation}失败: {failed}")
+
+    def count(self) -> int:
+        counts, failed = self._on_shards(lambda handle: handle.count())
+        self._raise_failed("计数", failed)
+        return sum(counts.values())
+
+    def _route(self, ids: list[str], metadatas: list[dict] | None) -> dict[str, list[int]]:
+        positions: dict[str, list[int]] = {}
+        for i, id_ in enumerate(ids):
+            shard = self._client.owner_of(routing_key(id_, metadatas[i] if metadatas else None))
+            positions.setdefault(shard, []).append(i)
+        return positions
+
+    def _write(self, method: str, ids, embeddings, documents=None, metadatas=None):
+        positions = self._route(ids, metadatas)
+
+        def write(shard: str):
+            rows = positions[shard]
+            kwargs = {"ids": [ids[i] for i in rows], "embeddings": [embeddings[i] for i in rows]}
+            if documents is not None:
+                kwargs["documents"] = [documents[i] for i in rows]
+            if metadatas is not None:
+                kwargs["metadatas"] = [metadatas[i] for i in rows]
+            getattr(self.shard_handle(shard), method)(**kwargs)
+
+        _, failed = self._client.fan_out(write, list(positions))
+        self._raise_failed("写入", failed)
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        self._write("add", ids, embeddings, documents, metadatas)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        self._write("upsert", ids, embeddings, documents, metadatas)
+
+    def update(self, ids, embeddings=None, documents=None, metadatas=None):
+        found, failed = self._on_shards(lambda handle: handle.get(ids=ids, include=[])["ids"])
+        self._raise_failed("定位", failed)
+        owner = {id_: shard for shard, shard_ids in found.items() for id_ in shard_ids}
+        positions: dict[str, list[int]] = {}
+        for i, id_ in enumerate(ids):
+            if id_ in owner:
+                positions.setdefault(owner[id_], []).append(i)
+
+        def update(shard: str):
+            rows = positions[shard]
+            kwargs: dict[str, Any] = {"ids": [ids[i] for i in rows]}
+            for key, values in (("embeddings", embeddings), ("documents", documents), ("metadatas", metadatas)):
+                if values is not None:
+                    kwargs[key] = [values[i] for i in rows]
+            self.shard_handle(shard).update(**kwargs)
+
+        _, failed = self._client.fan_out(update, list(positions))
+        self._raise_failed("更新", failed)
+
+    def delete(self, ids=None, where=None):
+        _, failed = self._on_shards(lambda handle: handle.delete(ids=ids, where=where))
+        self._raise_failed("删除", failed)
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None):
+        # 各分片取前 offset + limit 条，拼接后统一截取（分页顺序按分片顺序稳定）
+        start = offset or 0
+        per_shard_limit = start + limit if limit is not None else None
+        kwargs: dict[str, Any] = {"ids": ids, "where": where, "limit": per_shard_limit}
+        if include is not None:
+            kwargs["include"] = include
+        pages, failed = self._on_shards(lambda handle: handle.get(**kwargs))
+        self._raise_failed("读取", failed)
+
+        merged: dict[str, list] = {"ids": []}
+        for shard in self._client.shard_names:
+            page = pages.get(shard)
+            if not page:
+                continue
+            for key in ("ids", "documents", "metadatas", "embeddings"):
+                values = page.get(key)
+                if values is not None:
+                    merged.setdefault(key, []).extend(list(values))
+        end = start + limit if limit is not None else None
+        return {key: values[start:end] for key, values in merged.items()}
+
+    def query(self, query_embeddings, n_results=10, where=None, include=None):
+        kwargs: dict[str, Any] = {"query_embeddings": query_embeddings, "n_results": n_results}
+        if where:
+            kwargs["where"] = where
+        if include is not None:
+            kwargs["include"] = include
+        results, failed = self._on_shards(lambda handle: handle.query(**kwargs), timeout=self._client.read_timeout)
+        if not results:
+            raise RuntimeError(f"所有分片检索失败: {failed}")
+        if failed:
+            logger.warning(f"[ShardedCollection] 部分分片未返回，结果不完整 | collection: {self.name} | failed: {failed}")
+
+        merged: dict[str, Any] = {key: [] for key in _RESULT_KEYS}
+        for q in range(len(query_embeddings)):
+            candidates: dict[str, tuple] = {}
+            for shard_result in results.values():
+                ids = shard_result["ids"][q]
+                documents = (shard_result.get("documents") or [[None] * len(ids)] * (q + 1))[q]
+                metadatas = (shard_result.get("metadatas") or [[None] * len(ids)] * (q + 1))[q]
+                distances = (shard_result.get("distances") or [[None] * len(ids)] * (q + 1))[q]
+                for id_, document, metadata, distance in zip(ids, documents, metadatas, distances):
+                    # 扩容迁移期间同一 ID 可能短暂存在于两个分片，保留距离较小的一条
+                    previous = candidates.get(id_)
+                    if previous is None or (distance is not None and previous[0] is not None and distance < previous[0]):
+                        candidates[id_] = (distance, id_, document, metadata)
+            ranked = sorted(
+                candidates.values(), key=lambda item: float("inf") if item[0] is None else item[0]
+            )[:n_results]
+            merged["ids"].append([item[1] for item in ranked])
+            merged["documents"].append([item[2] for item in ranked])
+            merged["metadatas"].append([item[3] for item in ranked])
+            merged["distances"].append([item[0] for item in ranked])
+
+        merged["partial"] = bool(failed)
+        merged["failed_shards"] = sorted(failed)
+        return merged
+
+
+class ShardedVectorClient(VectorBackendClient):
+    """分片向量库客户端：多个后端端点组成一致性哈希环，对 VectorStore 表现为单个客户端
+
+    shards 为 端点标识 -> 客户端，端点标识即分片在哈希环上的名字：扩容时只追加新端点，
+    已有端点的标识不能改变，否则大部分数据的归属都会变化。
+    扩容后原有数据仍可检索（检索会查询所有分片），python -m src.rebalance_shards 将数据迁移到新的归属分片。
+    """
+
+    def __init__(
+            self,
+            shards: dict[str, VectorBackendClient],
+            virtual_nodes: int = 128,
+            read_timeout: float = 2.0,
+            max_workers: int | None = None,
+    ):
+        if not shards:
+            raise ValueError("分片模式至少需要配置一个分片端点")
+        self.shards = shards
+        self.shard_names = list(shards)
+        self.ring = HashRing(self.shard_names, virtual_nodes)
+        # 检索时单个分片的超时（秒），写入不设超时
+        self.read_timeout = read_timeout
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers or max(4, len(shards) * 8),
+            thread_name_prefix="vector-shard",
+        )
+
+    def owner_of(self, key: str) -> str:
+        return self.ring.node_for(key)
+
+    def fan_out(
+            self,
+            func: Callable[[str], Any],
+            shards: list[str] | None = None,
+            timeout: float | None = None,
+    ) -> tuple[dict[str, Any], dict[str, str]]:
+        """在多个分片上并发执行 func(shard)，返回 (成功结果, 失败原因)
+
+        超时的分片记为失败，其调用在后台线程中继续执行直至底层客户端自身超时。
+        只有一个分片且不限时（写入）时直接在当前线程执行。
+        """
+        shards = self.shard_names if shards is None else shards
+        if len(shards) == 1 and timeout is None:
+            shard = shards[0]
+            try:
+                return {shard: func(shard)}, {}
+            except Exception as e:
+                return {}, {shard: str(e)}
+
+        futures = {self._pool.submit(func, shard): shard for shard in shards}
+        done, not_done = wait(futures, timeout=timeout)
+        results: dict[str, Any] = {}
+        failed: dict[str, str] = {}
+        for future in done:
+            shard = futures[future]
+            try:
+                results[shard] = future.result()
+            except Exception as e:
+                failed[shard] = str(e)
+        for future in not_done:
+            failed[futures[future]] = f"timeout after {timeout}s"
+        return results, failed
+
+    def get_or_create_collection(self, name: str, metadata: dict | None = None) -> ShardedCollection:
+        collection = ShardedCollection(name, self, metadata)
+        handles, failed = self.fan_out(
+            lambda shard: self.shards[shard].get_or_create_collection(name=name, metadata=metadata)
+        )
+        if failed:
+            raise RuntimeError(f"分片创建集合失败: {failed}")
+        for shard, handle in handles.items():
+            collection._set_handle(shard, handle)
+        return collection
+
+    def _on_existing(self, func: Callable[[str], Any], operation: str) -> dict[str, Any]:
+        """在所有分片上执行集合操作，跳过不存在该集合的分片（如新加入的分片）
+
+        其他错误（如分片不可用）抛出 RuntimeError，不把不可用的分片当作没有该集合。
+        """
+        def call(shard: str):
+            try:
+                return func(shard)
+            except Exception as e:
+                if is_missing_collection(e):
+                    return _MISSING
+                raise
+
+        results, failed = self.fan_out(call)
+        if failed:
+            raise RuntimeError(f"分片{operation}失败: {failed}")
+        return {shard: result for shard, result in results.items() if result is not _MISSING}
+
+    def get_collection(self, name: str) -> ShardedCollection:
+        handles = self._on_existing(lambda shard: self.shards[shard].get_collection(name=name), "获取集合")
+        if not handles:
+            raise ValueError(f"Collection {name} does not exist.")
+        metadata = next((getattr(handle, "metadata", None) for handle in handles.values()), None)
+        collection = ShardedCollection(name, self, metadata)
+        for shard, handle in handles.items():
+            collection._set_handle(shard, handle)
+        return collection
+
+    def delete_collection(self, name: str):
+        deleted = self._on_existing(lambda shard: self.shards[shard].delete_collection(name=name), "删除集合")
+        if not deleted:
+            raise ValueError(f"Collection {name} does not exist.")
+
+    def list_collections(self) -> list[ShardedCollection]:
+        listed, failed = self.fan_out(lambda shard: self.shards[shard].list_collections())
+        if failed:
+            raise RuntimeError(f"分片列出集合失败: {failed}")
+        collections: dict[str, ShardedCollection] = {}
+        for shard in self.shard_names:
+            for handle in listed[shard]:
+                collection = collections.get(handle.name)
+                if collection is None:
+                    collection = collections[handle.name] = ShardedCollection(
+                        handle.name, self, getattr(handle, "metadata", None)
+                    )
+                collection._set_handle(shard, handle)
+        return [collections[name] for name in sorted(collections)]
+
+    def get_max_batch_size(self) -> int:
+        sizes, _ = self.fan_out(lambda shard: int(self.shards[shard].get_max_batch_size()))
+        return min(sizes.values()) if sizes else 0
+
+    def close(self):
+        for client in self.shards.values():
+            if isinstance(client, VectorBackendClient):
+                client.close()
+        self._pool.shutdown(wait=False)
@@ -1,10 +1,25 @@
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from ..tools.document_loader import LoadedRecord
+
+
+@dataclass
+class RecordChunk:
+    """按记录边界切分的分块，携带所覆盖的行号范围（含首尾）"""
+
+    text: str
+    start_row: int
+    end_row: int
+
 
 class DocumentChunker:
     """文本分块处理"""
 
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+        self.chunk_size = chunk_size
         self.splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
@@ -14,3 +29,33 @@ class DocumentChunker:
     def chunk(self, text: str) -> list[str]:
         """分割文本为块"""
         return self.splitter.split_text(text)
+
+    def chunk_records(self, records: Iterable[LoadedRecord]) -> Iterator[RecordChunk]:
+        """按记录边界流式分块
+
+        连续的记录合并到不超过 chunk_size 的分块中，记录不会被拆到两个分块；
+        单条记录超过 chunk_size 时单独按文本切分，各片段沿用该记录的行号。
+        """
+        texts: list[str] = []
+        size = 0
+        start_row = end_row = 0
+        for record in records:
+            if len(record.text) > self.chunk_size:
+                if texts:
+                    yield RecordChunk("\n".join(texts), start_row, end_row)
+                    texts, size = [], 0
+                for piece in self.splitter.split_text(record.text):
+                    yield RecordChunk(piece, record.start_row, record.end_row)
+                continue
+
+            if texts and size + 1 + len(record.text) > self.chunk_size:
+                yield RecordChunk("\n".join(texts), start_row, end_row)
+                texts, size = [], 0
+            if not texts:
+                start_row = record.start_row
+            texts.append(record.text)
+            size += len(record.text) + (1 if size else 0)
+            end_row = record.end_row
+
+        if texts:
+            yield RecordChunk("\n".join(texts), start_row, end_row)
@@ -0,0 +1,196 @@
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Callable
+
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class CollectionStats:
+    """单个集合的统计信息"""
+
+    name: str
+    count: int = 0
+    dimension: int | None = None
+    embedding_model: str | None = None
+    last_write_at: datetime | None = None
+    reconciled_at: datetime | None = None
+    # 计数可能不准确（upsert、按条件删除后无法得知变化量），等待下一次对账
+    stale: bool = False
+
+
+class CollectionStatsCache:
+    """集合统计缓存：写入时增量更新，后台线程定期与向量库对账
+
+    - add 写入按条数增量更新计数；upsert / update / 删除无法得知实际变化量，只标记为待对账；
+    - 后台线程每 stale_interval 秒刷新待对账的集合，每 reconcile_interval 秒全量对账一次
+      （覆盖其他进程的写入、新建与删除的集合）；
+    - 对账读取计数期间集合又被写入时，不覆盖增量结果，保持待对账状态。
+
+    读取（get / list）只访问内存，不产生向量库请求。
+    """
+
+    def __init__(
+            self,
+            client,
+            reconcile_interval: float = 300.0,
+            stale_interval: float = 5.0,
+            model_resolver: Callable[[str], str | None] | None = None,
+    ):
+        self.client = client
+        self.reconcile_interval = reconcile_interval
+        self.stale_interval = stale_interval
+        # 实际集合名 -> 写入该集合所用的向量模型
+        self._model_resolver = model_resolver
+        self._lock = threading.Lock()
+        self._stats: dict[str, CollectionStats] = {}
+        # 每个集合的写入序号，用于识别对账期间发生的写入
+        self._write_seq: dict[str, int] = {}
+        self._reconciled_once = False
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    # ---------- 写入时更新 ----------
+
+    def _touch(self, name: str, dimension: int | None) -> CollectionStats:
+        """调用方需持有 _lock"""
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = CollectionStats(name=name, embedding_model=self._resolve_model(name))
+        if dimension:
+            stats.dimension = dimension
+        stats.last_write_at = datetime.now(timezone.utc)
+        self._write_seq[name] = self._write_seq.get(name, 0) + 1
+        return stats
+
+    def record_add(self, name: str, added: int, dimension: int | None = None):
+        """新增向量（ID 不重复）：计数增量更新"""
+        with self._lock:
+            self._touch(name, dimension).count += added
+
+    def record_change(self, name: str, dimension: int | None = None):
+        """upsert / update / 删除：变化量未知，标记待对账"""
+        with self._lock:
+            self._touch(name, dimension).stale = True
+
+    def record_drop(self, name: str):
+        with self._lock:
+            self._stats.pop(name, None)
+            self._write_seq[name] = self._write_seq.get(name, 0) + 1
+
+    # ---------- 读取 ----------
+
+    def get(self, name: str) -> CollectionStats | None:
+        with self._lock:
+            stats = self._stats.get(name)
+            return CollectionStats(**asdict(stats)) if stats else None
+
+    def list(self) -> list[CollectionStats]:
+        if not self._reconciled_once:
+            # 首次读取前尚未对账（缓存中只有本进程写过的集合），同步对账一次
+            self.reconcile()
+        with self._lock:
+            return [CollectionStats(**asdict(stats)) for _, stats in sorted(self._stats.items())]
+
+    # ---------- 对账 ----------
+
+    def _resolve_model(self, name: str) -> str | None:
+        if self._model_resolver is None:
+            return None
+        try:
+            return self._model_resolver(name)
+        except Exception:
+            return None
+
+    def _refresh(self, collection) -> CollectionStats:
+        """读取单个集合的计数与维度（调用方不持有 _lock）"""
+        name = collection.name
+        with self._lock:
+            seq = self._write_seq.get(name, 0)
+            known = self._stats.get(name)
+            dimension = known.dimension if known else None
+        count = collection.count()
+        if dimension is None and count:
+            sample = collection.get(limit=1, include=["embeddings"])
+            embeddings = sample.get("embeddings")
+            if embeddings is not None and len(embeddings):
+                dimension = len(embeddings[0])
+
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = CollectionStats(name=name)
+            stats.embedding_model = self._resolve_model(name)
+            stats.dimension = stats.dimension or dimension
+            stats.reconciled_at = datetime.now(timezone.utc)
+            if self._write_seq.get(name, 0) == seq:
+                stats.count = count
+                stats.stale = False
+            else:
+                # 读取计数期间有新的写入，计数无法确定，下一轮再对账
+                stats.stale = True
+            return stats
+
+    def reconcile(self):
+        """全量对账：以向量库中的集合列表与计数为准"""
+        started = time.perf_counter()
+        collections = self.client.list_collections()
+        names = set()
+        for collection in collections:
+            names.add(collection.name)
+            try:
+                self._refresh(collection)
+            except Exception as e:
+                logger.warning(f"[CollectionStats] 集合对账失败 | collection: {collection.name} | error: {e}")
+        with self._lock:
+            for name in list(self._stats):
+                if name not in names:
+                    del self._stats[name]
+            self._reconciled_once = True
+        logger.info(
+            f"[CollectionStats] 对账完成 | collections: {len(names)} | "
+            f"elapsed: {time.perf_counter() - started:.2f}s"
+        )
+
+    def reconcile_stale(self):
+        """刷新待对账的集合"""
+        with self._lock:
+            stale = [name for name, stats in self._stats.items() if stats.stale]
+        for name in stale:
+            try:
+                self._refresh(self.client.get_collection(name=name))
+            except Exception as e:
+                logger.warning(f"[CollectionStats] 集合对账失败 | collection: {name} | error: {e}")
+
+    def start(self):
+        """启动后台对账线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="collection-stats-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(1.0, self.stale_interval * 2))
+            self._thread = None
+
+    def _loop(self):
+        next_full = 0.0
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() >= next_full:
+                    self.reconcile()
+                    next_full = time.monotonic() + self.reconcile_interval
+                else:
+                    self.reconcile_stale()
+            except Exception as e:
+                # 向量库暂不可用：保留现有统计，稍后重试全量对账
+                logger.warning(f"[CollectionStats] 对账失败 | error: {e}")
+                next_full = time.monotonic() + self.stale_interval
+            self._stop.wait(self.stale_interval)
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import threading
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Callable, List
 
 import torch
 from modelscope import snapshot_download
@@ -78,29 +79,118 @@ class QwenEmbeddingEmbedder(BaseEmbedder):
         return self._encode(texts)
 
 
+# 已加载的模型：(model_name, model_dir) -> 实现，同一模型在进程内只加载一次
+_backends: dict[tuple[str, str | None], BaseEmbedder] = {}
+_backends_lock = threading.Lock()
+
+
+def _load_backend(model_name: str, model_dir: str | None) -> BaseEmbedder:
+    key = (model_name, model_dir)
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is not None:
+            return backend
+        lower_name = model_name.lower()
+        if model_dir:
+            # 显式指定本地目录时，优先作为 Qwen 向量模型加载
+            backend = QwenEmbeddingEmbedder(model_id=model_name, model_dir=model_dir)
+        elif "qwen3-embedding" in lower_name or lower_name.startswith("qwen/"):
+            backend = QwenEmbeddingEmbedder(model_id=model_name)
+        else:
+            backend = SentenceTransformerEmbedder(model_name=model_name)
+        _backends[key] = backend
+        return backend
+
+
 class TextEmbedder(BaseEmbedder):
-    """向量化层统一入口，按配置选择具体模型"""
+    """向量化层统一入口，按配置选择具体模型
+
+    指定 model_resolver 时，每次向量化前调用它获取当前应使用的 (模型, 本地目录)，
+    变化时切换模型（例如集合别名在其他进程中被重建索引切换到新模型）。
+    resolver 自身需要足够轻量（如读取带 TTL 缓存的别名表）。
+    """
 
     def __init__(
             self,
             model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
             model_dir: str | None = None,
+            model_resolver: Callable[[], tuple[str, str | None]] | None = None,
     ):
-        lower_name = model_name.lower()
-
-        if model_dir:
-            # 显式指定本地目录时，优先作为 Qwen 向量模型加载
-            self._backend: BaseEmbedder = QwenEmbeddingEmbedder(
-                model_id=model_name,
-                model_dir=model_dir,
-            )
-        elif "qwen3-embedding" in lower_name or lower_name.startswith("qwen/"):
-            self._backend = QwenEmbeddingEmbedder(model_id=model_name)
-        else:
-            self._backend = SentenceTransformerEmbedder(model_name=model_name)
+        self.model_name = model_name
+        self.model_dir = model_dir
+        self._model_resolver = model_resolver
+        self._backend: BaseEmbedder = _load_backend(model_name, model_dir)
+        self._lock = threading.Lock()
+
+    def _sync_model(self) -> BaseEmbedder:
+        """按 model_resolver 切换到当前模型，返回本次使用的实现"""
+        if self._model_resolver is None:
+            return self._backend
+        model_name, model_dir = self._model_resolver()
+        if (model_name, model_dir) != (self.model_name, self.model_dir):
+            with self._lock:
+                if (model_name, model_dir) != (self.model_name, self.model_dir):
+                    self._backend = _load_backend(model_name, model_dir)
+                    self.model_name, self.model_dir = model_name, model_dir
+        return self._backend
 
     def embed_text(self, text: str) -> list[float]:
-        return self._backend.embed_text(text)
+        return self._sync_model().embed_text(text)
 
     def embed_batch(self, texts: list[str]) -> list[list[float]]:
-        return self._backend.embed_batch(texts)
+        return self._sync_model().embed_batch(texts)
+
+
+class CollectionEmbedders:
+    """按逻辑集合选择向量模型
+
+    各集合（默认集合与分区集合）可分别通过别名重建索引切换到不同模型，写入与检索某个集合时
+    必须使用该集合当前的模型。model_resolver(集合名) 返回集合记录的 (模型, 本地目录)，
+    未记录时使用默认模型。同一模型的实现在进程内共享，只加载一次。
+    """
+
+    def __init__(
+            self,
+            model_name: str,
+            model_dir: str | None = None,
+            model_resolver: Callable[[str], tuple[str, str | None] | None] | None = None,
+    ):
+        self.default_model = (model_name, model_dir)
+        self._model_resolver = model_resolver
+        self._by_collection: dict[str, TextEmbedder] = {}
+        self._by_model: dict[tuple[str, str | None], TextEmbedder] = {}
+        self._lock = threading.Lock()
+
+    def model_of(self, collection_name: str) -> tuple[str, str | None]:
+        """集合当前所用的 (模型, 本地目录)"""
+        if self._model_resolver is None:
+            return self.default_model
+        return self._model_resolver(collection_name) or self.default_model
+
+    def get(self, collection_name: str) -> TextEmbedder:
+        """集合对应的嵌入器，每次向量化前按 model_of 切换到集合当前的模型"""
+        embedder = self._by_collection.get(collection_name)
+        if embedder is None:
+            with self._lock:
+                embedder = self._by_collection.get(collection_name)
+                if embedder is None:
+                    model_name, model_dir = self.model_of(collection_name)
+                    embedder = TextEmbedder(
+                        model_name=model_name,
+                        model_dir=model_dir,
+                        model_resolver=lambda: self.model_of(collection_name),
+                    )
+                    self._by_collection[collection_name] = embedder
+        return embedder
+
+    def for_model(self, model_name: str, model_dir: str | None = None) -> TextEmbedder:
+        """固定使用指定模型的嵌入器"""
+        key = (model_name, model_dir)
+        embedder = self._by_model.get(key)
+        if embedder is None:
+            with self._lock:
+                embedder = self._by_model.get(key)
+                if embedder is None:
+                    embedder = TextEmbedder(model_name=model_name, model_dir=model_dir)
+                    self._by_model[key] = embedder
+        return embedder
@@ -0,0 +1,93 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SearchResultCache:
+    """向量检索结果缓存（LRU + 集合写版本）
+
+    键为 (集合, 写版本, 量化后查询向量的哈希, where, top_k)。VectorStore 对集合的每次写入、
+    更新与删除都会递增该集合的写版本，旧版本的条目不会再被命中，随 LRU 淘汰。
+    查询向量按 float16 量化后取哈希，同一问题的重复向量化结果即使有末位浮点误差也能命中。
+
+    写版本只覆盖本进程内的写入：其他进程（多 worker、离线导入）写入同一集合时，
+    条目最多在 ttl 秒后过期。
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple[float, dict]] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def version(self, collection: str) -> int:
+        with self._lock:
+            return self._versions.get(collection, 0)
+
+    def bump(self, collection: str):
+        """集合发生写入：之后的查询不再命中此前缓存的结果"""
+        with self._lock:
+            self._versions[collection] = self._versions.get(collection, 0) + 1
+            self.invalidations += 1
+
+    @staticmethod
+    def make_key(collection: str, version: int, query_embedding: list[float], where: dict | None, top_k: int) -> tuple:
+        vector_hash = hashlib.blake2b(
+            np.asarray(query_embedding, dtype=np.float16).tobytes(), digest_size=16
+        ).hexdigest()
+        where_key = json.dumps(where, sort_keys=True, ensure_ascii=False, default=str) if where else ""
+        return collection, version, vector_hash, where_key, top_k
+
+    def get(self, key: tuple) -> dict | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl > 0 and now - entry[0] > self.ttl):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            result = entry[1]
+        # 返回副本，调用方修改结果不会污染缓存
+        return copy.deepcopy(result)
+
+    def put(self, key: tuple, result: dict):
+        result = copy.deepcopy(result)
+        with self._lock:
+            # 查询期间集合已被写入：结果可能不含最新数据，不再缓存
+            if key[1] != self._versions.get(key[0], 0):
+                return
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,18 @@
+import numpy as np
+
+# 支持的向量存储精度：float16 体积减半，对余弦检索的精度影响可忽略
+SUPPORTED_DTYPES = ("float16", "float32")
+
+
+def encode_vector(vector: list[float], dtype: str = "float16") -> bytes:
+    """将向量编码为紧凑的二进制（小端序）"""
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    return np.asarray(vector, dtype=np.dtype(dtype).newbyteorder("<")).tobytes()
+
+
+def decode_vector(data: bytes, dtype: str = "float16") -> list[float]:
+    """将二进制解码为 float32 向量"""
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    return np.frombuffer(data, dtype=np.dtype(dtype).newbyteorder("<")).astype(np.float32).tolist()
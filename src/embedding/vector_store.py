@@ -1,47 +1,192 @@
-import chromadb
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+from .backends import VectorBackendClient, create_vector_client
+from .collection_stats import CollectionStatsCache
+from .search_cache import SearchResultCache
+from ..common.exceptions import VectorStoreOperationFailedException
+from ..utils.concurrency import KeyedLock
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+@dataclass
+class SearchQuery:
+    """search_many 的单个查询"""
+
+    query_embedding: list[float]
+    top_k: int = 5
+    where: dict | None = None
+
+
+def _matches_where(metadata: dict | None, where: dict) -> bool:
+    """判断元数据是否满足 where 条件（支持等值与 $in、$and，其余条件视为不匹配）"""
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            if set(condition) != {"$in"} or metadata.get(key) not in condition["$in"]:
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
 class VectorStore:
-    """向量数据库封装（ChromaDB）
+    """向量数据库封装
 
-    当前使用 Docker 部署的 Chroma HTTP 服务，而不是本地文件持久化。
+    底层客户端可替换（见 embedding.backends）：默认连接 Docker 部署的 Chroma HTTP 服务，
+    chroma_mode=embedded 时在进程内以 PersistentClient 打开 vector_db_path，
+    vector_store_type=numpy 时使用进程内的 memmap 精确检索后端，hnsw 时使用进程内的 HNSW 近似检索后端。
     """
 
     DEFAULT_COLLECTION_NAME = "documents"
 
-    def __init__(self, host: str = "localhost", port: int = 8000):
-        # 通过 HTTP 客户端连接 Chroma 服务
-        self.client = chromadb.HttpClient(host=host, port=port)
-        self.collection = None
-        self._collection_name = None
+    def __init__(
+            self,
+            host: str = "localhost",
+            port: int = 8000,
+            write_batch_size: int = 1000,
+            write_concurrency: int = 4,
+            write_max_retries: int = 3,
+            write_retry_backoff: float = 0.5,
+            write_buffer_size: int = 0,
+            write_buffer_max_delay: float = 0.5,
+            write_buffer_max_attempts: int = 5,
+            alias_resolver: Callable[[str], str] | None = None,
+            client: VectorBackendClient | None = None,
+            search_cache: SearchResultCache | None = None,
+            collection_stats: CollectionStatsCache | None = None,
+    ):
+        # 未指定客户端时通过 HTTP 客户端连接 Chroma 服务
+        self.client = client or create_vector_client("chromadb", host=host, port=port)
+        # 集合句柄缓存：实际集合名 -> 句柄。实例为进程级单例、由请求线程并发使用，
+        # 不保存"当前集合"，每次调用按名称取句柄；同一集合的首次获取由按名称的锁串行化
+        self._handles: dict[str, object] = {}
+        self._handles_lock = threading.Lock()
+        self._handle_locks = KeyedLock()
+        # 句柄失效回调（例如 AsyncVectorStore 的异步句柄缓存），参数为实际集合名，None 表示全部
+        self._collection_listeners: list[Callable[[str | None], None]] = []
+        # 检索结果缓存（可选）：每次写入、更新、删除递增集合写版本，使旧结果失效
+        self.search_cache = search_cache
+        # 集合统计缓存（可选）：写入时增量更新，list_collections / get_collection_info 直接读取
+        self.collection_stats = collection_stats
+        # 别名解析：逻辑集合名 -> 实际集合名（用于重建索引后原子切换），未配置时原样返回
+        self._alias_resolver = alias_resolver
+
+        # 写入分批参数：单批大小（不超过客户端上限）、并发批次数、失败重试
+        self.write_batch_size = max(1, write_batch_size)
+        self.write_concurrency = max(1, write_concurrency)
+        self.write_max_retries = max(0, write_max_retries)
+        self.write_retry_backoff = write_retry_backoff
+        self._client_max_batch_size: int | None = None
+
+        # 写缓冲（write-behind）：write_buffer_size <= 0 时关闭。
+        # 按集合累积小批量写入，达到条数阈值或最长等待时间后合并为一次写入。
+        self.write_buffer_size = write_buffer_size
+        self.write_buffer_max_delay = write_buffer_max_delay
+        # flush 失败时数据放回缓冲区重试，连续失败达到该次数后放弃，向量 ID 记入 failed_writes
+        self.write_buffer_max_attempts = max(1, write_buffer_max_attempts)
+        self.failed_writes: dict[str, list[str]] = {}
+        self._pending: dict[str, dict] = {}
+        self._pending_lock = threading.Lock()
+        # 同一集合的 flush 串行执行：读操作等待进行中的 flush 完成，保证读到自己的写入
+        self._flush_locks = KeyedLock()
+        self._flusher: threading.Thread | None = None
+        self._flusher_stop = threading.Event()
+
+    def _resolve(self, collection_name: str | None = None) -> str:
+        """将逻辑集合名（可能是别名）解析为实际集合名，未指定时使用默认集合"""
+        collection_name = collection_name or self.DEFAULT_COLLECTION_NAME
+        if self._alias_resolver is None:
+            return collection_name
+        return self._alias_resolver(collection_name)
+
+    def _collection_handle(self, physical_name: str):
+        """获取实际集合的句柄（命中缓存时不访问向量库）"""
+        with self._handles_lock:
+            handle = self._handles.get(physical_name)
+        if handle is not None:
+            return handle
+        with self._handle_locks.hold(physical_name):
+            with self._handles_lock:
+                handle = self._handles.get(physical_name)
+            if handle is None:
+                handle = self.client.get_or_create_collection(
+                    name=physical_name,
+                    metadata={"hnsw:space": "cosine"}
+                )
+                with self._handles_lock:
+                    self._handles[physical_name] = handle
+        return handle
+
+    def _open(self, collection_name: str | None = None) -> tuple[str, object]:
+        """解析集合名并获取句柄，先写入该集合缓冲区中的数据，保证读到自己的写入"""
+        physical_name = self._resolve(collection_name)
+        self._flush_pending(physical_name)
+        return physical_name, self._collection_handle(physical_name)
 
-    def _ensure_collection(self, collection_name: str | None = None):
-        """确保 collection 已初始化（懒加载）"""
-        collection_name = collection_name or self._collection_name or self.DEFAULT_COLLECTION_NAME
-        if self.collection is None or self._collection_name != collection_name:
-            self.create_collection(collection_name)
+    def add_collection_listener(self, callback: Callable[[str | None], None]):
+        """注册句柄失效回调：集合被删除或句柄被丢弃时调用"""
+        self._collection_listeners.append(callback)
+
+    def _notify_collection_listeners(self, physical_name: str | None):
+        for callback in self._collection_listeners:
+            callback(physical_name)
+
+    def invalidate_collection(self, collection_name: str | None = None):
+        """丢弃缓存的集合句柄（集合被其他进程删除或重建后调用）；不指定时清空全部"""
+        physical_name = None if collection_name is None else self._resolve(collection_name)
+        with self._handles_lock:
+            if physical_name is None:
+                self._handles.clear()
+            else:
+                self._handles.pop(physical_name, None)
+        self._notify_collection_listeners(physical_name)
+
+    def _invalidate(self, physical_name: str, added: int | None = None, dimension: int | None = None):
+        """集合数据发生变化：递增写版本，使缓存的检索结果失效，并更新集合统计
+
+        added 为确定新增的向量数；变化量未知（upsert、更新、删除、写入失败）时为 None，统计标记为待对账。
+        """
+        if self.search_cache is not None:
+            self.search_cache.bump(physical_name)
+        if self.collection_stats is not None:
+            if added is not None:
+                self.collection_stats.record_add(physical_name, added, dimension)
+            else:
+                self.collection_stats.record_change(physical_name, dimension)
 
     def create_collection(self, collection_name: str):
-        """创建或获取集合"""
-        logger.info(f"[VectorStore] 创建/获取集合: {collection_name}")
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"}
-        )
-        self._collection_name = collection_name
-        count = self.collection.count() if self.collection else 0
-        logger.info(f"[VectorStore] 集合 '{collection_name}' 当前包含 {count} 个向量")
+        """创建或获取集合（collection_name 为别名时创建/获取其指向的集合）"""
+        physical_name = self._resolve(collection_name)
+        logger.info(f"[VectorStore] 创建/获取集合: {collection_name} -> {physical_name}")
+        collection = self._collection_handle(physical_name)
+        logger.info(f"[VectorStore] 集合 '{physical_name}' 当前包含 {collection.count()} 个向量")
+        return collection
 
     def delete_collection(self, collection_name: str):
-        """删除集合"""
-        logger.info(f"[VectorStore] 删除集合: {collection_name}")
-        self.client.delete_collection(name=collection_name)
-        if self._collection_name == collection_name:
-            self.collection = None
-            self._collection_name = None
+        """删除集合，并使其缓存的句柄失效"""
+        physical_name = self._resolve(collection_name)
+        logger.info(f"[VectorStore] 删除集合: {collection_name} -> {physical_name}")
+        with self._pending_lock:
+            self._pending.pop(physical_name, None)
+        with self._handle_locks.hold(physical_name):
+            with self._handles_lock:
+                self._handles.pop(physical_name, None)
+            self.client.delete_collection(name=physical_name)
+        self._notify_collection_listeners(physical_name)
+        if self.search_cache is not None:
+            self.search_cache.bump(physical_name)
+        if self.collection_stats is not None:
+            self.collection_stats.record_drop(physical_name)
 
     def add_documents(
             self,
@@ -51,27 +196,324 @@ class VectorStore:
             metadatas: list[dict] | None = None,
             collection_name: str | None = None,
     ):
-        """添加文档到向量库"""
-        collection_name = collection_name or self._collection_name or self.DEFAULT_COLLECTION_NAME
-        self._ensure_collection(collection_name)
-
-        self.collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas or []
+        """添加文档到向量库
+
+        开启写缓冲时（write_buffer_size > 0）带 metadatas 的写入先进入缓冲区，
+        由 flush() / 条数阈值 / 最长等待时间触发合并写入；对同一集合的读、改、删
+        操作会先 flush，保证提交方能读到自己的写入。
+
+        实际写入时按 write_batch_size（且不超过客户端报告的最大批量）自动拆分，
+        最多 write_concurrency 个批次并发发送；失败的批次改用 upsert 幂等重试。
+        重试耗尽后清理本次已写入的向量并抛出异常，避免向量库残留半份数据。
+        """
+        physical_name = self._resolve(collection_name)
+        if self.write_buffer_size > 0 and metadatas:
+            self._buffer_add(physical_name, ids, embeddings, documents, metadatas)
+            return
+        self._write_now(physical_name, ids, embeddings, documents, metadatas)
+
+    def upsert_documents(
+            self,
+            ids: list[str],
+            embeddings: list[list[float]],
+            documents: list[str],
+            metadatas: list[dict] | None = None,
+            collection_name: str | None = None,
+    ):
+        """插入或覆盖向量（幂等，不经过写缓冲），用于重建索引等可重复执行的写入"""
+        physical_name = self._resolve(collection_name)
+        self._flush_pending(physical_name)
+        self._write_now(physical_name, ids, embeddings, documents, metadatas, upsert=True)
+
+    def _write_now(
+            self,
+            collection_name: str,
+            ids: list[str],
+            embeddings: list[list[float]],
+            documents: list[str],
+            metadatas: list[dict] | None,
+            upsert: bool = False,
+    ):
+        """立即分批写入向量库（collection_name 为实际集合名）"""
+        collection = self._collection_handle(collection_name)
+
+        batch_size = self._effective_batch_size()
+        batches = [
+            {
+                "ids": ids[start:start + batch_size],
+                "embeddings": embeddings[start:start + batch_size],
+                "documents": documents[start:start + batch_size],
+                "metadatas": metadatas[start:start + batch_size] if metadatas else None,
+            }
+            for start in range(0, len(ids), batch_size)
+        ]
+        if not batches:
+            return
+
+        logger.debug(
+            f"[VectorStore] 写入向量 | collection: {collection_name} | total: {len(ids)} | batches: {len(batches)}"
         )
 
+        added = None
+        try:
+            if len(batches) == 1:
+                self._write_batch(collection, batches[0], upsert)
+            else:
+                workers = min(self.write_concurrency, len(batches))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    # list() 等待全部批次完成，并抛出第一个失败批次的异常
+                    list(pool.map(lambda batch: self._write_batch(collection, batch, upsert), batches))
+            # add 的 ID 均为新 ID，计数可增量更新；upsert 可能覆盖已有向量，变化量未知
+            added = None if upsert else len(ids)
+        except Exception as e:
+            if upsert:
+                # upsert 的 ID 可能原本就存在，删除会丢掉写入前的数据；upsert 幂等，由调用方重试即可
+                logger.error(f"[VectorStore] upsert 向量失败，部分批次可能已写入 | collection: {collection_name} | error: {e}")
+                raise VectorStoreOperationFailedException(detail=str(e)) from e
+            logger.error(f"[VectorStore] 写入向量失败，清理本次已写入的数据 | collection: {collection_name} | error: {e}")
+            try:
+                collection.delete(ids=ids)
+            except Exception as cleanup_error:
+                logger.error(f"[VectorStore] 清理失败: {cleanup_error}")
+            raise VectorStoreOperationFailedException(detail=str(e)) from e
+        finally:
+            self._invalidate(collection_name, added, len(embeddings[0]) if len(embeddings) else None)
+
+    def _buffer_add(
+            self,
+            collection_name: str,
+            ids: list[str],
+            embeddings: list[list[float]],
+            documents: list[str],
+            metadatas: list[dict],
+    ):
+        """写入缓冲区，达到条数阈值时立即 flush 该集合"""
+        with self._pending_lock:
+            pending = self._pending.get(collection_name)
+            if pending is None:
+                pending = {
+                    "ids": [],
+                    "embeddings": [],
+                    "documents": [],
+                    "metadatas": [],
+                    "first_at": time.monotonic(),
+                }
+                self._pending[collection_name] = pending
+            pending["ids"].extend(ids)
+            pending["embeddings"].extend(embeddings)
+            pending["documents"].extend(documents)
+            pending["metadatas"].extend(metadatas)
+            size = len(pending["ids"])
+            self._start_flusher()
+
+        if size >= self.write_buffer_size:
+            self._flush_pending(collection_name)
+
+    def _start_flusher(self):
+        """按需启动后台 flush 线程（调用方需持有 _pending_lock）"""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        self._flusher_stop.clear()
+        self._flusher = threading.Thread(
+            target=self._flush_loop,
+            name="vector-store-flusher",
+            daemon=True,
+        )
+        self._flusher.start()
+
+    def _flush_loop(self):
+        """后台线程：定期 flush 等待时间超过 write_buffer_max_delay 的集合"""
+        interval = max(0.05, self.write_buffer_max_delay / 2)
+        while not self._flusher_stop.wait(interval):
+            now = time.monotonic()
+            with self._pending_lock:
+                due = [
+                    name for name, pending in self._pending.items()
+                    if now - pending["first_at"] >= self.write_buffer_max_delay
+                ]
+            for name in due:
+                self._flush_pending(name)
+
+    def _flush_pending(self, collection_name: str, raise_errors: bool = False) -> bool:
+        """将某个集合缓冲区中的数据写入向量库，返回是否写入成功
+
+        缓冲区中混有其他请求提交的数据，默认失败时只记录日志、不抛给触发 flush 的调用方；
+        失败的数据放回缓冲区队首，由后续 flush 重试（见 _requeue_pending）。
+        """
+        if self.write_buffer_size <= 0:
+            return True
+        with self._flush_locks.hold(collection_name):
+            with self._pending_lock:
+                pending = self._pending.pop(collection_name, None)
+            if not pending:
+                return True
+            logger.debug(
+                f"[VectorStore] flush 写缓冲 | collection: {collection_name} | size: {len(pending['ids'])}"
+            )
+            try:
+                self._write_now(
+                    collection_name,
+                    pending["ids"],
+                    pending["embeddings"],
+                    pending["documents"],
+                    pending["metadatas"],
+                )
+                return True
+            except Exception as e:
+                self._requeue_pending(collection_name, pending, e)
+                if raise_errors:
+                    raise
+                return False
+
+    def _requeue_pending(self, collection_name: str, pending: dict, error: Exception):
+        """flush 失败的数据放回缓冲区队首（排在失败后新提交的数据之前）
+
+        连续失败 write_buffer_max_attempts 次后放弃，向量 ID（即分块的 chunk_uid）记入 failed_writes；
+        Postgres 中的分块仍在，可通过 python -m src.rebuild_index 补写。
+        """
+        attempts = pending.get("attempts", 0) + 1
+        if attempts >= self.write_buffer_max_attempts:
+            with self._pending_lock:
+                self.failed_writes.setdefault(collection_name, []).extend(pending["ids"])
+            logger.error(
+                f"[VectorStore] 写缓冲 flush 多次失败，放弃写入 | collection: {collection_name} | "
+                f"size: {len(pending['ids'])} | attempts: {attempts} | error: {error} | ids: {pending['ids']}"
+            )
+            return
+        logger.warning(
+            f"[VectorStore] 写缓冲 flush 失败，放回缓冲区等待重试 | collection: {collection_name} | "
+            f"size: {len(pending['ids'])} | attempts: {attempts}/{self.write_buffer_max_attempts} | error: {error}"
+        )
+        with self._pending_lock:
+            newer = self._pending.get(collection_name)
+            if newer is not None:
+                for key in ("ids", "embeddings", "documents", "metadatas"):
+                    pending[key].extend(newer[key])
+            pending["attempts"] = attempts
+            # 重新计时：后台线程在 write_buffer_max_delay 后重试，而不是立即重试
+            pending["first_at"] = time.monotonic()
+            self._pending[collection_name] = pending
+            self._start_flusher()
+
+    def _discard_pending(self, collection_name: str, ids: list[str] | None = None, where: dict | None = None):
+        """删除时同步移除缓冲区中匹配的数据（flush 失败而仍在缓冲区的数据不能在删除后被写回）"""
+        with self._pending_lock:
+            pending = self._pending.get(collection_name)
+            if not pending:
+                return
+            drop = set(ids or [])
+            keep = [
+                i for i, (id_, metadata) in enumerate(zip(pending["ids"], pending["metadatas"]))
+                if id_ not in drop and not (where and _matches_where(metadata, where))
+            ]
+            for key in ("ids", "embeddings", "documents", "metadatas"):
+                pending[key] = [pending[key][i] for i in keep]
+            if not keep:
+                self._pending.pop(collection_name, None)
+
+    def _patch_pending(self, collection_name: str, ids: list[str], embeddings, documents, metadatas):
+        """更新时同步修改缓冲区中尚未写入的数据"""
+        with self._pending_lock:
+            pending = self._pending.get(collection_name)
+            if not pending:
+                return
+            positions = {id_: i for i, id_ in enumerate(pending["ids"])}
+            for row, id_ in enumerate(ids):
+                i = positions.get(id_)
+                if i is None:
+                    continue
+                for key, values in (("embeddings", embeddings), ("documents", documents), ("metadatas", metadatas)):
+                    if values is not None:
+                        pending[key][i] = values[row]
+
+    def flush(self, collection_name: str | None = None):
+        """立即写入缓冲区中的数据；不指定集合时 flush 全部集合，失败时抛出第一个错误"""
+        if collection_name is not None:
+            self._flush_pending(collection_name, raise_errors=True)
+            return
+        with self._pending_lock:
+            names = list(self._pending.keys())
+        first_error = None
+        for name in names:
+            try:
+                self._flush_pending(name, raise_errors=True)
+            except Exception as e:
+                first_error = first_error or e
+        if first_error is not None:
+            raise first_error
+
+    def close(self):
+        """停止后台 flush 线程与统计对账线程，并写入缓冲区中剩余的数据（应用关闭时调用）"""
+        if self.collection_stats is not None:
+            self.collection_stats.stop()
+        self._flusher_stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=max(1.0, self.write_buffer_max_delay * 2))
+            self._flusher = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"[VectorStore] 关闭时 flush 写缓冲失败 | error: {e} | failed_writes: {self.failed_writes}")
+        if isinstance(self.client, VectorBackendClient):
+            self.client.close()
+
+    def _effective_batch_size(self) -> int:
+        """实际写入批量：配置值与客户端上限取较小者"""
+        if self._client_max_batch_size is None:
+            try:
+                self._client_max_batch_size = int(self.client.get_max_batch_size())
+            except Exception:
+                # 旧版本客户端不提供上限，视为不限制
+                self._client_max_batch_size = 0
+        if self._client_max_batch_size > 0:
+            return min(self.write_batch_size, self._client_max_batch_size)
+        return self.write_batch_size
+
+    def _write_batch(self, collection, batch: dict, upsert: bool = False):
+        """写入单个批次：首次使用 add（或 upsert），失败后以 upsert 幂等重试（指数退避）"""
+        kwargs = {key: value for key, value in batch.items() if value is not None}
+        try:
+            if upsert:
+                collection.upsert(**kwargs)
+            else:
+                collection.add(**kwargs)
+            return
+        except Exception as e:
+            last_error = e
+
+        for attempt in range(1, self.write_max_retries + 1):
+            delay = self.write_retry_backoff * (2 ** (attempt - 1))
+            logger.warning(
+                f"[VectorStore] 批次写入失败，{delay:.1f}s 后以 upsert 重试 | "
+                f"attempt: {attempt}/{self.write_max_retries} | size: {len(batch['ids'])} | error: {last_error}"
+            )
+            time.sleep(delay)
+            try:
+                collection.upsert(**kwargs)
+                return
+            except Exception as e:
+                last_error = e
+
+        raise last_error
+
     def search(
             self,
             query_embedding: list[float],
             top_k: int = 5,
             where: dict | None = None,
+            collection_name: str | None = None,
     ) -> dict:
         """检索相似文档，可选 where 过滤"""
-        self._ensure_collection()
+        physical_name, collection = self._open(collection_name)
+
+        cache_key = self._cache_key(physical_name, query_embedding, where, top_k)
+        if cache_key is not None:
+            cached = self.search_cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"[VectorStore] 检索命中缓存 | collection: {physical_name} | top_k: {top_k}")
+                return cached
 
-        logger.debug(f"[VectorStore] 执行向量检索 | top_k: {top_k} | where: {where}")
+        logger.debug(f"[VectorStore] 执行向量检索 | collection: {physical_name} | top_k: {top_k} | where: {where}")
 
         try:
             query_kwargs = {
@@ -82,7 +524,10 @@ class VectorStore:
             if where:
                 query_kwargs["where"] = where
 
-            results = self.collection.query(**query_kwargs)
+            results = collection.query(**query_kwargs)
+            # 分片后端部分分片超时时结果不完整（partial），不写入缓存
+            if cache_key is not None and not results.get("partial"):
+                self.search_cache.put(cache_key, results)
 
             doc_count = len(results.get("documents", [[]])[0]) if results.get("documents") else 0
             logger.info(f"[VectorStore] 检索完成 | 返回 {doc_count} 个结果")
@@ -92,19 +537,87 @@ class VectorStore:
             logger.error(f"[VectorStore] 检索失败: {e}")
             raise
 
-    def search_by_metadata(self, top_k: int = 5, where: dict | None = None, ) -> dict:
+    def _cache_key(self, physical_name: str, query_embedding: list[float], where: dict | None, top_k: int):
+        """检索缓存键（未开启缓存时为 None），包含集合当前写版本"""
+        if self.search_cache is None:
+            return None
+        return self.search_cache.make_key(
+            physical_name, self.search_cache.version(physical_name), query_embedding, where, top_k
+        )
+
+    def search_many(self, queries: list[SearchQuery], collection_name: str | None = None) -> list[dict]:
+        """批量检索：where 条件相同的查询合并为一次 query 调用（n_results 取组内最大 top_k）
+
+        返回与 queries 一一对应的结果，每项结构与 search() 相同。
+        """
+        if not queries:
+            return []
+        physical_name, collection = self._open(collection_name)
+
+        results: list[dict | None] = [None] * len(queries)
+        cache_keys = [
+            self._cache_key(physical_name, query.query_embedding, query.where, query.top_k) for query in queries
+        ]
+        groups: dict[str, list[int]] = {}
+        for i, query in enumerate(queries):
+            if cache_keys[i] is not None:
+                results[i] = self.search_cache.get(cache_keys[i])
+                if results[i] is not None:
+                    continue
+            key = json.dumps(query.where, sort_keys=True, ensure_ascii=False, default=str) if query.where else ""
+            groups.setdefault(key, []).append(i)
+        logger.debug(
+            f"[VectorStore] 执行批量向量检索 | collection: {physical_name} | queries: {len(queries)} | "
+            f"calls: {len(groups)}"
+        )
+
+        try:
+            for positions in groups.values():
+                where = queries[positions[0]].where
+                query_kwargs = {
+                    "query_embeddings": [queries[i].query_embedding for i in positions],
+                    "n_results": max(queries[i].top_k for i in positions),
+                }
+                if where:
+                    query_kwargs["where"] = where
+                grouped = collection.query(**query_kwargs)
+                for row, i in enumerate(positions):
+                    top_k = queries[i].top_k
+                    results[i] = {
+                        key: [grouped[key][row][:top_k]]
+                        for key in ("ids", "documents", "metadatas", "distances")
+                        if grouped.get(key) is not None
+                    }
+                    if grouped.get("partial"):
+                        results[i]["partial"] = True
+                        results[i]["failed_shards"] = grouped.get("failed_shards", [])
+                    elif cache_keys[i] is not None:
+                        self.search_cache.put(cache_keys[i], results[i])
+        except Exception as e:
+            logger.error(f"[VectorStore] 批量检索失败: {e}")
+            raise
+
+        logger.info(f"[VectorStore] 批量检索完成 | queries: {len(queries)} | calls: {len(groups)}")
+        return results
+
+    def search_by_metadata(
+            self,
+            top_k: int = 5,
+            where: dict | None = None,
+            collection_name: str | None = None,
+    ) -> dict:
         """按元数据过滤查询文档（不需要向量检索）"""
-        self._ensure_collection()
+        physical_name, collection = self._open(collection_name)
 
-        logger.debug(f"[VectorStore] 执行元数据查询 | top_k: {top_k} | where: {where}")
+        logger.debug(f"[VectorStore] 执行元数据查询 | collection: {physical_name} | top_k: {top_k} | where: {where}")
 
         try:
             # 如果 where 为空，使用 get() 不带 where 参数获取所有数据
             if not where:
                 logger.info(f"[VectorStore] 元数据查询未提供 where 条件，返回前 {top_k} 条数据")
-                results = self.collection.get(limit=top_k)
+                results = collection.get(limit=top_k)
             else:
-                results = self.collection.get(where=where, limit=top_k, )
+                results = collection.get(where=where, limit=top_k, )
 
             doc_count = len(results.get("documents", [])) if results.get("documents") else 0
             logger.info(f"[VectorStore] 元数据查询完成 | 返回 {doc_count} 个结果")
@@ -119,28 +632,45 @@ class VectorStore:
             logger.error(f"[VectorStore] 元数据查询失败: {e}")
             raise
 
-    def delete_by_source(self, source_id: str):
+    def delete_by_source(self, source_id: str, collection_name: str | None = None):
         """删除某个来源的所有文档"""
-        self._ensure_collection()
+        physical_name, collection = self._open(collection_name)
 
         # 按元数据过滤删除
-        self.collection.delete(
+        self._discard_pending(physical_name, where={"source_id": source_id})
+        collection.delete(
             where={"source_id": source_id}
         )
+        self._invalidate(physical_name)
 
-    def delete_by_document_uid(self, document_uid: str):
+    def delete_by_document_uid(self, document_uid: str, collection_name: str | None = None):
         """根据 document_uid 删除向量库中该文档的所有 chunks"""
-        self._ensure_collection()
+        physical_name, collection = self._open(collection_name)
         
         logger.info(f"[VectorStore] 删除文档的所有向量数据 | document_uid: {document_uid}")
         
         # 按元数据中的 document_uid 过滤删除
-        self.collection.delete(
+        self._discard_pending(physical_name, where={"document_uid": document_uid})
+        collection.delete(
             where={"document_uid": document_uid}
         )
+        self._invalidate(physical_name)
         
         logger.info(f"[VectorStore] 已删除 document_uid={document_uid} 的所有向量数据")
 
+    def delete_by_document_uids(self, document_uids: list[str], collection_name: str | None = None):
+        """根据 document_uid 列表批量删除向量（单次 $in 条件删除，调用方负责控制列表长度）"""
+        if not document_uids:
+            return
+        physical_name, collection = self._open(collection_name)
+
+        logger.info(f"[VectorStore] 批量删除文档向量 | collection: {physical_name} | documents: {len(document_uids)}")
+        self._discard_pending(physical_name, where={"document_uid": {"$in": document_uids}})
+        collection.delete(
+            where={"document_uid": {"$in": document_uids}}
+        )
+        self._invalidate(physical_name)
+
     def update_documents(
             self,
             ids: list[str],
@@ -150,8 +680,7 @@ class VectorStore:
             collection_name: str | None = None,
     ):
         """更新向量库中的文档"""
-        collection_name = collection_name or self._collection_name or self.DEFAULT_COLLECTION_NAME
-        self._ensure_collection(collection_name)
+        physical_name, collection = self._open(collection_name)
         
         update_kwargs = {"ids": ids}
         if embeddings is not None:
@@ -161,25 +690,38 @@ class VectorStore:
         if metadatas is not None:
             update_kwargs["metadatas"] = metadatas
             
-        self.collection.update(**update_kwargs)
+        self._patch_pending(physical_name, ids, embeddings, documents, metadatas)
+        collection.update(**update_kwargs)
+        self._invalidate(physical_name)
 
     def delete_by_ids(self, ids: list[str], collection_name: str | None = None):
         """根据 ID 列表删除向量"""
-        collection_name = collection_name or self._collection_name or self.DEFAULT_COLLECTION_NAME
-        self._ensure_collection(collection_name)
-        self.collection.delete(ids=ids)
+        physical_name, collection = self._open(collection_name)
+        self._discard_pending(physical_name, ids=ids)
+        collection.delete(ids=ids)
+        self._invalidate(physical_name)
 
     def delete_by_where(self, where: dict, collection_name: str | None = None):
         """根据 where 条件删除向量"""
-        collection_name = collection_name or self._collection_name or self.DEFAULT_COLLECTION_NAME
-        self._ensure_collection(collection_name)
-        self.collection.delete(where=where)
+        physical_name, collection = self._open(collection_name)
+        self._discard_pending(physical_name, where=where)
+        collection.delete(where=where)
+        self._invalidate(physical_name)
 
     def get_collection_info(self, collection_name: str | None = None) -> dict:
-        """获取集合信息"""
-        collection_name = collection_name or self._collection_name or self.DEFAULT_COLLECTION_NAME
+        """获取集合信息（开启集合统计时直接读取缓存）"""
+        collection_name = collection_name or self.DEFAULT_COLLECTION_NAME
+        physical_name = self._resolve(collection_name)
+        self._flush_pending(physical_name)
+        if self.collection_stats is not None:
+            stats = self.collection_stats.get(physical_name)
+            if stats is not None:
+                return {**asdict(stats), "name": collection_name}
         try:
-            collection = self.client.get_collection(name=collection_name)
+            with self._handles_lock:
+                collection = self._handles.get(physical_name)
+            # 只查询已存在的集合，不为未知名称创建集合
+            collection = collection or self.client.get_collection(name=physical_name)
             return {
                 "name": collection_name,
                 "count": collection.count(),
@@ -191,7 +733,16 @@ class VectorStore:
             }
 
     def list_collections(self) -> list[dict]:
-        """列出所有集合"""
+        """列出所有集合
+
+        开启集合统计时从缓存读取（不逐个集合请求 count），统计信息由写入增量更新、后台定期对账。
+        """
+        if self.collection_stats is not None:
+            try:
+                return [asdict(stats) for stats in self.collection_stats.list()]
+            except Exception as e:
+                logger.error(f"[VectorStore] 列出集合失败: {e}")
+                return []
         try:
             collections = self.client.list_collections()
             return [
@@ -205,6 +756,28 @@ class VectorStore:
             logger.error(f"[VectorStore] 列出集合失败: {e}")
             return []
 
+    def warm_load(self, collection_name: str | None = None):
+        """预热集合：打开集合并执行一次检索，使嵌入式/进程内后端在启动时完成索引加载
+
+        失败只记录警告，不影响应用启动（HTTP 模式下 Chroma 服务未就绪时同样如此）。
+        """
+        collection_name = collection_name or self.DEFAULT_COLLECTION_NAME
+        started = time.perf_counter()
+        try:
+            collection = self._collection_handle(self._resolve(collection_name))
+            count = collection.count()
+            if count:
+                sample = collection.get(limit=1, include=["embeddings"])
+                embeddings = sample.get("embeddings")
+                if embeddings is not None and len(embeddings):
+                    collection.query(query_embeddings=[list(embeddings[0])], n_results=1)
+            logger.info(
+                f"[VectorStore] 集合预热完成 | collection: {collection_name} | count: {count} | "
+                f"elapsed: {time.perf_counter() - started:.2f}s"
+            )
+        except Exception as e:
+            logger.warning(f"[VectorStore] 集合预热失败 | collection: {collection_name} | error: {e}")
+
     def persist(self):
-        """持久化数据（PersistentClient 自动持久化，此方法保留以保持兼容性）"""
+        """持久化数据（嵌入式 PersistentClient 与进程内后端写入即持久化，此方法保留以保持兼容性）"""
         pass
@@ -0,0 +1,78 @@
+"""从 NDJSON 文件流式导入已分块（可带向量）的文档
+
+每行一个文档：{"name": ..., "source": ..., "embedding_model": ..., "chunks": [{"content": ..., "embedding": [...]}]}
+逐行读取与校验，按批合并向量化缺少向量的分块并写入 Postgres 与向量库，内存占用恒定。
+按归一化文本哈希去重，中断后重新执行会跳过已导入的文档。
+
+用法：
+    python -m src.import_ndjson corpus.ndjson --batch-chunks 5000
+    zcat corpus.ndjson.gz | python -m src.import_ndjson -
+"""
+
+import argparse
+import sys
+import time
+
+from sqlmodel import Session
+
+from .api.dependencies import (
+    get_boilerplate_index, get_collection_embedders, get_document_chunker, get_embedder, get_reindex_manager,
+    get_vector_store,
+)
+from .config import get_settings
+from .db.session import get_engine, init_db
+from .services.document_import_service import NdjsonDocumentImporter
+from .services.document_service import DocumentService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="从 NDJSON 文件流式导入文档")
+    parser.add_argument("path", help="NDJSON 文件路径，- 表示标准输入")
+    parser.add_argument(
+        "--batch-chunks", type=int, default=get_settings().ndjson_import_batch_chunks,
+        help="每批合并向量化并写入的分块数",
+    )
+    args = parser.parse_args()
+
+    init_db()
+    stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    started = time.perf_counter()
+    try:
+        with Session(get_engine()) as session:
+            service = DocumentService(
+                db=session,
+                chunker=get_document_chunker(),
+                embedder=get_embedder(),
+                vector_store=get_vector_store(),
+                reindex_manager=get_reindex_manager(),
+                boilerplate_index=get_boilerplate_index(),
+                collection_embedders=get_collection_embedders(),
+            )
+            importer = NdjsonDocumentImporter(service, args.batch_chunks)
+            stats = importer.stats
+            for line_no, line in enumerate(stream, 1):
+                if importer.feed(line_no, line):
+                    importer.flush()
+                    elapsed = time.perf_counter() - started
+                    print(
+                        f"[import] lines={line_no} | documents={stats.documents} | chunks={stats.chunks} | "
+                        f"embedded={stats.embedded} | failed={stats.failed} | "
+                        f"{stats.chunks / max(elapsed, 1e-9):,.0f} chunks/s"
+                    )
+            importer.flush()
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    get_vector_store().close()
+    for error in stats.errors:
+        print(f"[import] 失败 | {error}")
+    print(
+        f"[import] 完成 | documents={stats.documents} | deduplicated={stats.deduplicated} | "
+        f"chunks={stats.chunks} | embedded={stats.embedded} | failed={stats.failed} | "
+        f"elapsed={time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
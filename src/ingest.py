@@ -0,0 +1,205 @@
+"""离线批量导入目录中的文档
+
+在进程池中并行计算文件哈希、加载与分块，主进程跨文件合并分块后满批向量化，
+通过与 API 相同的 DocumentService / VectorStore 写入 Postgres 与向量库。
+原始来源哈希已入库的文件会被跳过，中断后重新执行即可从断点继续。
+
+用法：
+    python -m src.ingest /data/kb --glob "**/*.pdf" --workers 8
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlmodel import Session
+
+from .api.dependencies import (
+    get_boilerplate_index, get_collection_embedders, get_document_chunker, get_embedder, get_reindex_manager,
+    get_vector_store,
+)
+from .config import get_settings
+from .db.session import get_engine, init_db
+from .embedding.chunker import DocumentChunker
+from .services.document_service import DocumentService, PreparedDocument, find_ingested_source_hashes
+from .tools.document_loader import DocumentLoader
+from .utils.hashing import sha256_file, sha256_text
+from .utils.text_processor import TextProcessor
+
+# 工作进程内的分块器，由进程池 initializer 创建
+_worker_chunker: DocumentChunker | None = None
+
+
+def _init_worker():
+    global _worker_chunker
+    _worker_chunker = DocumentChunker()
+
+
+def _hash_file(path: str) -> str:
+    return sha256_file(path)
+
+
+def _extract_file(path: str) -> tuple[str, list[str]]:
+    """加载并分块单个文件，返回 (归一化文本哈希, 分块列表)"""
+    text = DocumentLoader.load(path, source_type="file")
+    content_hash = sha256_text(TextProcessor.normalize_whitespace(text))
+    return content_hash, _worker_chunker.chunk(text)
+
+
+@dataclass
+class IngestStats:
+    files: int = 0
+    chunks: int = 0
+    skipped: int = 0
+    deduplicated: int = 0
+    failed: int = 0
+
+    def report(self, elapsed: float) -> str:
+        rate = max(elapsed, 1e-9)
+        return (
+            f"files={self.files} | chunks={self.chunks} | skipped={self.skipped} | "
+            f"deduplicated={self.deduplicated} | failed={self.failed} | elapsed={elapsed:.1f}s | "
+            f"{self.files / rate:,.1f} files/s | {self.chunks / rate:,.0f} chunks/s"
+        )
+
+
+def _collect_files(root: Path, pattern: str) -> list[Path]:
+    suffixes = DocumentLoader.SUPPORTED_SUFFIXES
+    return sorted(p for p in root.glob(pattern) if p.is_file() and p.suffix.lower() in suffixes)
+
+
+def _submit_window(
+        pool: ProcessPoolExecutor,
+        paths: list[Path],
+        seen: set[str],
+        stats: IngestStats,
+) -> list[tuple[Path, str, Future | None]]:
+    """提交一批文件的解析与分块任务，跳过已入库（或本次已提交）的文件
+
+    需要流式入库的大文件不提交到进程池（Future 为 None），由主进程逐个流式处理。
+    """
+    threshold = get_settings().stream_file_threshold_bytes
+    hashes = list(pool.map(_hash_file, [str(p) for p in paths], chunksize=16))
+    with Session(get_engine()) as session:
+        ingested = find_ingested_source_hashes(session, hashes)
+
+    submitted = []
+    for path, source_hash in zip(paths, hashes):
+        if source_hash in ingested or source_hash in seen:
+            stats.skipped += 1
+            continue
+        seen.add(source_hash)
+        if DocumentLoader.is_streaming(str(path), threshold):
+            submitted.append((path, source_hash, None))
+        else:
+            submitted.append((path, source_hash, pool.submit(_extract_file, str(path))))
+    return submitted
+
+
+def ingest(root: Path, pattern: str, workers: int, batch_files: int) -> IngestStats:
+    files = _collect_files(root, pattern)
+    print(f"[ingest] 发现 {len(files)} 个待处理文件 | root={root} | glob={pattern}")
+
+    seen: set[str] = set()
+    stats = IngestStats()
+    started = time.perf_counter()
+    windows = [files[i:i + batch_files] for i in range(0, len(files), batch_files)]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        submitted = _submit_window(pool, windows[0], seen, stats) if windows else []
+        for next_idx in range(1, len(windows) + 1):
+            current = submitted
+            # 流水线：当前窗口向量化与写入时，下一窗口已在工作进程中解析
+            submitted = (
+                _submit_window(pool, windows[next_idx], seen, stats)
+                if next_idx < len(windows) else []
+            )
+
+            prepared: list[PreparedDocument] = []
+            streamed: list[Path] = []
+            for path, source_hash, future in current:
+                if future is None:
+                    streamed.append(path)
+                    continue
+                try:
+                    content_hash, chunks = future.result()
+                except Exception as e:
+                    stats.failed += 1
+                    print(f"[ingest] 解析失败 | {path} | {e}")
+                    continue
+                prepared.append(PreparedDocument(
+                    name=str(path.relative_to(root)),
+                    source_type="file",
+                    source_content=str(path),
+                    source_hash=source_hash,
+                    content_hash=content_hash,
+                    chunks=chunks,
+                ))
+            if not prepared and not streamed:
+                continue
+
+            results = []
+            with Session(get_engine()) as session:
+                service = DocumentService(
+                    db=session,
+                    chunker=get_document_chunker(),
+                    embedder=get_embedder(),
+                    vector_store=get_vector_store(),
+                    reindex_manager=get_reindex_manager(),
+                    boilerplate_index=get_boilerplate_index(),
+                    collection_embedders=get_collection_embedders(),
+                )
+                try:
+                    results.extend(service.ingest_prepared(prepared))
+                except Exception as e:
+                    session.rollback()
+                    stats.failed += len(prepared)
+                    print(f"[ingest] 批次写入失败 | files={len(prepared)} | {e}")
+
+                for path in streamed:
+                    try:
+                        results.append(service.create_document_with_chunks(
+                            name=str(path.relative_to(root)),
+                            source_type="file",
+                            source_content=str(path),
+                        ))
+                    except Exception as e:
+                        stats.failed += 1
+                        print(f"[ingest] 流式入库失败 | {path} | {e}")
+
+            for result in results:
+                stats.files += 1
+                if result.deduplicated:
+                    stats.deduplicated += 1
+                else:
+                    stats.chunks += result.chunks_count
+            print(f"[ingest] {stats.report(time.perf_counter() - started)}")
+
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="离线批量导入目录中的文档")
+    parser.add_argument("root", help="要导入的目录")
+    parser.add_argument("--glob", default="**/*", help="文件匹配模式（相对 root），如 \"**/*.pdf\"")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="解析与分块的进程数")
+    parser.add_argument("--batch-files", type=int, default=256, help="每批合并向量化并写入的文件数")
+    args = parser.parse_args()
+
+    root = Path(args.root).resolve()
+    if not root.is_dir():
+        parser.error(f"目录不存在: {root}")
+
+    init_db()
+    started = time.perf_counter()
+    stats = ingest(root, args.glob, max(1, args.workers), max(1, args.batch_files))
+
+    get_vector_store().close()
+    print(f"[ingest] 完成 | {stats.report(time.perf_counter() - started)}")
+
+
+if __name__ == "__main__":
+    main()
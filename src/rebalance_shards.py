@@ -0,0 +1,137 @@
+"""分片扩容后按一致性哈希重新分布向量数据
+
+vector_shards 追加新端点后执行：逐个分片分页读取各集合的向量，把哈希环上归属已变为其他分片的
+文档（按 document_uid 路由）先写入新分片、再从原分片删除。迁移期间检索仍查询所有分片并按 ID 去重，
+结果保持完整；中断后重新执行即可继续。
+
+用法：
+    python -m src.rebalance_shards --batch-size 500
+    python -m src.rebalance_shards --collection documents --dry-run
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+
+from .config import get_settings
+from .embedding.backends import create_vector_client
+from .embedding.backends.sharded_backend import ShardedVectorClient, is_missing_collection, routing_key
+
+
+@dataclass
+class RebalanceStats:
+    scanned: int = 0
+    moved: int = 0
+
+    def report(self, elapsed: float) -> str:
+        return (
+            f"scanned={self.scanned} | moved={self.moved} | elapsed={elapsed:.1f}s | "
+            f"rate={self.scanned / max(elapsed, 1e-9):,.0f} vectors/s"
+        )
+
+
+def rebalance_collection(
+        client: ShardedVectorClient,
+        name: str,
+        batch_size: int,
+        dry_run: bool = False,
+) -> RebalanceStats:
+    """将集合中不在归属分片上的向量迁移到归属分片"""
+    stats = RebalanceStats()
+    collection = client.get_collection(name)
+    started = time.perf_counter()
+
+    for source in client.shard_names:
+        try:
+            handle = client.shards[source].get_collection(name=name)
+        except Exception as e:
+            if not is_missing_collection(e):
+                raise
+            continue  # 新分片上还没有该集合
+
+        offset = 0
+        while True:
+            page = handle.get(
+                limit=batch_size,
+                offset=offset,
+                include=["embeddings", "documents", "metadatas"],
+            )
+            ids = page["ids"]
+            if not ids:
+                break
+            stats.scanned += len(ids)
+
+            metadatas = page.get("metadatas") or [None] * len(ids)
+            moving: dict[str, list[int]] = {}
+            for i, id_ in enumerate(ids):
+                owner = client.owner_of(routing_key(id_, metadatas[i]))
+                if owner != source:
+                    moving.setdefault(owner, []).append(i)
+            moved = [i for rows in moving.values() for i in rows]
+
+            if not dry_run and moved:
+                documents = page.get("documents")
+                embeddings = page.get("embeddings")
+                for owner, rows in moving.items():
+                    # 先写入归属分片再从原分片删除，中途失败时数据只会短暂重复（检索按 ID 去重）
+                    collection.shard_handle(owner).upsert(
+                        ids=[ids[i] for i in rows],
+                        embeddings=[list(embeddings[i]) for i in rows],
+                        documents=[documents[i] for i in rows] if documents is not None else None,
+                        metadatas=[metadatas[i] for i in rows] if page.get("metadatas") is not None else None,
+                    )
+                handle.delete(ids=[ids[i] for i in moved])
+                # 迁走的行已删除，偏移只跳过留下的行
+                offset += len(ids) - len(moved)
+            else:
+                offset += len(ids)
+            stats.moved += len(moved)
+
+            print(f"[rebalance] collection={name} | shard={source} | {stats.report(time.perf_counter() - started)}")
+
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="分片扩容后按一致性哈希重新分布向量数据")
+    parser.add_argument("--collection", action="append", default=None,
+                        help="要迁移的集合（可重复指定），默认迁移全部集合")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批读取的向量数")
+    parser.add_argument("--dry-run", action="store_true", help="只统计需要迁移的向量数，不写入")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    if settings.vector_store_type.lower().strip() != "sharded":
+        raise SystemExit("[rebalance] 仅适用于 vector_store_type=sharded")
+    client = create_vector_client(
+        "sharded",
+        path=settings.vector_db_path,
+        numpy_quantization=settings.numpy_quantization,
+        numpy_rerank_factor=settings.numpy_rerank_factor,
+        hnsw_m=settings.hnsw_m,
+        hnsw_ef_construction=settings.hnsw_ef_construction,
+        hnsw_ef_search=settings.hnsw_ef_search,
+        hnsw_save_every=settings.hnsw_save_every,
+        hnsw_rebuild_deleted_ratio=settings.hnsw_rebuild_deleted_ratio,
+        shards=settings.vector_shards,
+        shard_timeout=settings.vector_shard_timeout,
+        shard_virtual_nodes=settings.vector_shard_virtual_nodes,
+    )
+
+    names = args.collection or [collection.name for collection in client.list_collections()]
+    total = RebalanceStats()
+    started = time.perf_counter()
+    try:
+        for name in names:
+            stats = rebalance_collection(client, name, max(1, args.batch_size), args.dry_run)
+            total.scanned += stats.scanned
+            total.moved += stats.moved
+    finally:
+        client.close()
+
+    action = "需要迁移" if args.dry_run else "已迁移"
+    print(f"[rebalance] 完成 | collections={len(names)} | {action} | {total.report(time.perf_counter() - started)}")
+
+
+if __name__ == "__main__":
+    main()
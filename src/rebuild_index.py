@@ -0,0 +1,135 @@
+"""从 Postgres 中持久化的分块向量重建向量索引
+
+向量直接从 DocumentChunk.embedding 解码后批量写入新集合，不经过模型推理；
+只有缺少向量或向量模型与当前模型不一致的分块才会重新向量化。
+
+用法：
+    python -m src.rebuild_index --alias documents --switch-alias
+"""
+
+import argparse
+import time
+from datetime import datetime, timezone
+
+from sqlmodel import Session, select
+
+from .api.dependencies import get_collection_alias_registry, get_collection_embedders, get_vector_store
+from .config import get_settings
+from .db.models import Document, DocumentChunk
+from .db.session import get_engine
+from .embedding.vector_codec import decode_vector
+from .services.boilerplate_index import boilerplate_metadata
+from .services.partition_service import partition_column, partition_metadata
+
+
+def rebuild(alias: str, target: str, batch_size: int) -> tuple[int, int]:
+    """将别名下的全部有效分块写入 target 集合，返回 (写入分块数, 重新向量化分块数)"""
+    settings = get_settings()
+    vector_store = get_vector_store()
+    # 别名（默认集合或分区集合）当前所用的模型，整个重建过程固定使用它
+    model, model_dir = get_collection_embedders().model_of(alias)
+    embedder = get_collection_embedders().for_model(model, model_dir)
+
+    statement = (
+        select(
+            DocumentChunk.id,
+            DocumentChunk.chunk_uid,
+            DocumentChunk.document_id,
+            DocumentChunk.chunk_index,
+            DocumentChunk.content,
+            DocumentChunk.embedding,
+            DocumentChunk.embedding_dtype,
+            DocumentChunk.embedding_model,
+            DocumentChunk.is_boilerplate,
+            Document.document_uid,
+            Document.name,
+            Document.kb_id,
+            Document.project_id,
+        )
+        .join(Document, Document.id == DocumentChunk.document_id)
+        .where(
+            DocumentChunk.is_deleted == False,  # noqa: E712
+            Document.is_deleted == False,  # noqa: E712
+            partition_column() == alias,
+        )
+    )
+
+    written = 0
+    reembedded = 0
+    last_id = 0
+    started = time.perf_counter()
+    with Session(get_engine()) as session:
+        while True:
+            rows = session.exec(
+                statement.where(DocumentChunk.id > last_id)
+                .order_by(DocumentChunk.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            embeddings: list[list[float] | None] = [
+                decode_vector(row.embedding, row.embedding_dtype)
+                if row.embedding is not None and row.embedding_model == model
+                else None
+                for row in rows
+            ]
+            missing = [i for i, vector in enumerate(embeddings) if vector is None]
+            if missing:
+                # 缺少或过期的向量才走模型推理
+                vectors = embedder.embed_batch([rows[i].content for i in missing])
+                for i, vector in zip(missing, vectors):
+                    embeddings[i] = vector
+                reembedded += len(missing)
+
+            vector_store.upsert_documents(
+                ids=[row.chunk_uid for row in rows],
+                embeddings=embeddings,
+                documents=[row.content for row in rows],
+                metadatas=[
+                    {
+                        "document_uid": row.document_uid,
+                        "document_id": row.document_id,
+                        "chunk_uid": row.chunk_uid,
+                        "chunk_index": row.chunk_index,
+                        "name": row.name,
+                        **partition_metadata(row.kb_id, row.project_id),
+                        **boilerplate_metadata(row.is_boilerplate, settings),
+                    }
+                    for row in rows
+                ],
+                collection_name=target,
+            )
+            written += len(rows)
+
+            elapsed = time.perf_counter() - started
+            print(
+                f"[rebuild] chunks={written} | reembedded={reembedded} | "
+                f"elapsed={elapsed:.1f}s | rate={written / max(elapsed, 1e-9):,.0f} chunks/s"
+            )
+
+    return written, reembedded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="从 Postgres 中持久化的向量重建向量索引")
+    parser.add_argument("--alias", default="documents", help="要重建的逻辑集合名（别名）")
+    parser.add_argument("--target", default=None, help="目标集合名，默认 <alias>__r<时间戳>")
+    parser.add_argument("--batch-size", type=int, default=2000, help="每批读取并写入的分块数")
+    parser.add_argument("--switch-alias", action="store_true", help="完成后将别名切换到目标集合")
+    args = parser.parse_args()
+
+    target = args.target or f"{args.alias}__r{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}"
+    written, reembedded = rebuild(args.alias, target, max(1, args.batch_size))
+
+    if args.switch_alias:
+        model, model_dir = get_collection_embedders().model_of(args.alias)
+        get_collection_alias_registry().switch(args.alias, target, model, model_dir)
+
+    get_vector_store().close()
+    print(f"[rebuild] 完成 | target={target} | chunks={written} | reembedded={reembedded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+
+from sqlmodel import Session, select
+
+from ..config import Settings
+from ..db.models import Document, DocumentChunk
+from ..db.session import get_engine
+from ..utils.hashing import hamming_distance
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def boilerplate_metadata(is_boilerplate: bool, settings: Settings) -> dict:
+    """样板分块写入向量库的附加元数据：标记，downweight 策略下附带检索权重"""
+    if not is_boilerplate:
+        return {}
+    if settings.boilerplate_policy == "downweight":
+        return {"boilerplate": True, "weight": settings.boilerplate_weight}
+    return {"boilerplate": True}
+
+
+class BoilerplateIndex:
+    """分块 SimHash 近似重复索引，用于识别跨文档重复的样板分块
+
+    索引项为 (simhash, 文档键)，文档键取文档的 content_hash（有效文档按其去重，一一对应）。
+    采用分段查找：64 位切成 max_distance + 1 段，汉明距离不超过 max_distance 的两个值
+    至少有一段完全相同，只需比较段相同的候选。
+
+    索引在首次使用时从 Postgres 加载，之后由本进程的写入与删除增量维护；
+    多进程部署时各进程只能看到启动后自身写入的增量，重启后重新加载即可对齐。
+    """
+
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max(0, max_distance)
+        self._bands = self.max_distance + 1
+        self._band_bits = 64 // self._bands
+        self._lock = threading.Lock()
+        self._loaded = False
+        # 每段：段值 -> [(simhash, 文档键编号)]
+        self._tables: list[dict[int, list[tuple[int, int]]]] = [defaultdict(list) for _ in range(self._bands)]
+        self._key_ids: dict[str, int] = {}
+        # 编号单调递增（rename 会移除键，不能用 len(_key_ids) 分配）
+        self._next_key_id = 0
+        self._removed: set[int] = set()
+
+    def _band_values(self, simhash: int) -> list[int]:
+        value = simhash & _MASK64
+        mask = (1 << self._band_bits) - 1
+        return [(value >> (i * self._band_bits)) & mask for i in range(self._bands)]
+
+    def _key_id(self, key: str) -> int:
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            key_id = self._key_ids[key] = self._next_key_id
+            self._next_key_id += 1
+        self._removed.discard(key_id)
+        return key_id
+
+    def _add_locked(self, simhash: int, key: str):
+        key_id = self._key_id(key)
+        for table, band in zip(self._tables, self._band_values(simhash)):
+            table[band].append((simhash, key_id))
+
+    def ensure_loaded(self):
+        """首次使用时从数据库加载有效分块的 SimHash"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            with Session(get_engine()) as session:
+                rows = session.exec(
+                    select(DocumentChunk.simhash, Document.content_hash, Document.id)
+                    .join(Document, Document.id == DocumentChunk.document_id)
+                    .where(
+                        DocumentChunk.simhash.is_not(None),
+                        DocumentChunk.is_deleted == False,  # noqa: E712
+                        Document.is_deleted == False,  # noqa: E712
+                    )
+                )
+                count = 0
+                for simhash, content_hash, document_id in rows:
+                    self._add_locked(simhash, content_hash or f"doc:{document_id}")
+                    count += 1
+            self._loaded = True
+        logger.info(f"[BoilerplateIndex] 加载分块 SimHash | chunks: {count} | documents: {len(self._key_ids)}")
+
+    def count_documents(self, simhash: int, exclude_key: str | None = None, limit: int | None = None) -> int:
+        """统计含有与 simhash 近似重复分块的文档数（不含 exclude_key 自身），达到 limit 即停止"""
+        exclude_id = self._key_ids.get(exclude_key) if exclude_key else None
+        matched: set[int] = set()
+        with self._lock:
+            for table, band in zip(self._tables, self._band_values(simhash)):
+                for candidate, key_id in table.get(band, ()):
+                    if key_id == exclude_id or key_id in self._removed or key_id in matched:
+                        continue
+                    if hamming_distance(candidate, simhash) <= self.max_distance:
+                        matched.add(key_id)
+                        if limit is not None and len(matched) >= limit:
+                            return len(matched)
+        return len(matched)
+
+    def add(self, key: str, simhashes: list[int]):
+        """登记一个文档的分块 SimHash"""
+        with self._lock:
+            for simhash in simhashes:
+                self._add_locked(simhash, key)
+
+    def rename(self, old_key: str, new_key: str):
+        """更换文档键（流式入库时内容指纹在写完后才确定）"""
+        with self._lock:
+            key_id = self._key_ids.pop(old_key, None)
+            if key_id is None:
+                return
+            existing = self._key_ids.get(new_key)
+            if existing is None or existing in self._removed:
+                self._key_ids[new_key] = key_id
+            else:
+                # 新键已有有效文档：内容指纹相同即分块相同，保留已有编号，丢弃临时键的索引项
+                self._removed.add(key_id)
+
+    def remove(self, keys: list[str]):
+        """移除文档（逻辑删除，查找时跳过）"""
+        with self._lock:
+            for key in keys:
+                key_id = self._key_ids.get(key)
+                if key_id is not None:
+                    self._removed.add(key_id)
@@ -1,4 +1,6 @@
 from __future__ import annotations
+import asyncio
+
 import yaml
 
 from langchain_core.messages import HumanMessage, SystemMessage
@@ -27,12 +29,39 @@ class ChatApplicationService:
         self._convo_service = convo_service
         self._runtime_service = runtime_service
 
-    def handle_chat_request(self, req: ChatRequest) -> ChatResponse:
+    async def handle_chat_request(self, req: ChatRequest) -> ChatResponse:
         """
         处理一个聊天请求的完整业务流程。
+        会话的读写是同步数据库调用，放到线程中执行；Agent 以异步方式运行。
         """
         logger.info(f"开始处理聊天请求 | conversation_uid: {req.conversation_uid}")
 
+        conversation, initial_state, history_count_before_user = await asyncio.to_thread(
+            self._prepare_state, req
+        )
+
+        # 3. (运行时服务) 执行 Agent
+        result_state = await self._runtime_service.run(state=initial_state)
+
+        await asyncio.to_thread(self._save_turn, conversation, req, result_state, history_count_before_user)
+
+        # 获取最终答案（最后一条消息的内容）
+        answer = result_state["messages"][-1].content
+
+        logger.info(f"聊天请求处理完成 | conversation_uid: {req.conversation_uid}")
+
+        # 5. 返回结构化的响应数据
+        # TODO: 从 result_state.context.retrieved_content 中提取真实的引用文档
+        return ChatResponse(
+            conversation_uid=req.conversation_uid,
+            user_message=req.message,
+            answer=answer,
+            source_documents=[],
+            retrieved_content=[],
+        )
+
+    def _prepare_state(self, req: ChatRequest):
+        """加载会话与历史消息，构造 Agent 初始状态，返回 (会话, 初始状态, 用户消息之前的消息数)"""
         # 1. (会话服务) 加载或创建会话，并获取历史消息
         conversation = self._convo_service.get_or_create(req.conversation_uid)
         history_messages = self._convo_service.load_history_messages(conversation)
@@ -73,10 +102,10 @@ class ChatApplicationService:
             messages=history_messages,
             conversation_uid=req.conversation_uid
         )
+        return conversation, initial_state, history_count_before_user
 
-        # 3. (运行时服务) 执行 Agent
-        result_state = self._runtime_service.run(state=initial_state)
-
+    def _save_turn(self, conversation, req: ChatRequest, result_state: AgentState, history_count_before_user: int):
+        """持久化新一轮的对话"""
         # 4. (会话服务) 持久化新一轮的对话
         # 保存所有新产生的消息（包括用户消息、AI消息和工具消息）
         result_messages = result_state["messages"]
@@ -90,18 +119,3 @@ class ChatApplicationService:
             else:
                 # 其他消息（AI消息、工具消息等）完整保存
                 self._convo_service.add_langchain_message(conversation, msg)
-        
-        # 获取最终答案（最后一条消息的内容）
-        answer = result_state["messages"][-1].content
-
-        logger.info(f"聊天请求处理完成 | conversation_uid: {req.conversation_uid}")
-
-        # 5. 返回结构化的响应数据
-        # TODO: 从 result_state.context.retrieved_content 中提取真实的引用文档
-        return ChatResponse(
-            conversation_uid=req.conversation_uid,
-            user_message=req.message,
-            answer=answer,
-            source_documents=[],
-            retrieved_content=[],
-        )
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, select
+
+from ..common.exceptions import ReindexAlreadyRunningException
+from ..db.models import VectorCollectionAlias
+from ..db.session import get_engine
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class AliasEntry:
+    """别名记录的缓存"""
+
+    collection_name: str
+    embedding_model: str | None = None
+    embedding_model_dir: str | None = None
+    dual_write_collection: str | None = None
+    dual_write_model: str | None = None
+    dual_write_model_dir: str | None = None
+
+
+@dataclass
+class DualWriteTarget:
+    """重建索引进行中的双写目标（embedder 由 ReindexManager 按模型填充）"""
+
+    alias: str
+    target_collection: str
+    embedding_model: str
+    embedding_model_dir: str | None = None
+    embedder: object | None = None
+
+
+class CollectionAliasRegistry:
+    """向量集合别名注册表
+
+    别名持久化在 Postgres 中，进程内按 cache_ttl 缓存。
+    VectorStore 通过 resolve() 将逻辑集合名解析为实际集合名；
+    switch() 只更新一行记录，对所有进程原子生效（其他进程最多在 cache_ttl 秒后读到新值）。
+    重建索引的双写目标也记录在别名行上，所有进程以同样的 TTL 读取，多 worker 部署下的写入都会双写。
+    """
+
+    def __init__(self, cache_ttl: float = 5.0):
+        self.cache_ttl = cache_ttl
+        self._lock = threading.Lock()
+        self._aliases: dict[str, AliasEntry] = {}
+        self._loaded_at: float | None = None
+
+    def _load(self) -> dict[str, AliasEntry]:
+        """读取别名表（带 TTL 缓存），数据库不可用时沿用上次结果"""
+        now = time.monotonic()
+        with self._lock:
+            if self._loaded_at is not None and now - self._loaded_at < self.cache_ttl:
+                return self._aliases
+
+        try:
+            with Session(get_engine()) as session:
+                rows = session.exec(
+                    select(VectorCollectionAlias).where(
+                        VectorCollectionAlias.is_deleted == False  # noqa: E712
+                    )
+                ).all()
+                aliases = {row.alias: self._entry(row) for row in rows}
+        except Exception as e:
+            logger.warning(f"[CollectionAlias] 读取别名失败，沿用缓存: {e}")
+            aliases = self._aliases
+
+        with self._lock:
+            self._aliases = aliases
+            self._loaded_at = now
+        return aliases
+
+    @staticmethod
+    def _entry(row: VectorCollectionAlias) -> AliasEntry:
+        return AliasEntry(
+            collection_name=row.collection_name,
+            embedding_model=row.embedding_model,
+            embedding_model_dir=row.embedding_model_dir,
+            dual_write_collection=row.dual_write_collection,
+            dual_write_model=row.dual_write_model,
+            dual_write_model_dir=row.dual_write_model_dir,
+        )
+
+    def _store(self, alias: str, row: VectorCollectionAlias):
+        """写库后同步更新本进程缓存"""
+        with self._lock:
+            self._aliases = {**self._aliases, alias: self._entry(row)}
+
+    def resolve(self, name: str) -> str:
+        """将逻辑集合名解析为实际集合名；不是别名时原样返回"""
+        entry = self._load().get(name)
+        return entry.collection_name if entry else name
+
+    def get_embedding_model(self, alias: str) -> str | None:
+        """获取别名当前指向集合所用的向量模型"""
+        entry = self._load().get(alias)
+        return entry.embedding_model if entry else None
+
+    def get_model(self, alias: str) -> tuple[str, str | None] | None:
+        """获取别名当前指向集合所用的 (向量模型, 本地目录)，未记录模型时为 None"""
+        entry = self._load().get(alias)
+        if entry is None or not entry.embedding_model:
+            return None
+        return entry.embedding_model, entry.embedding_model_dir
+
+    def get_collection_model(self, collection_name: str) -> str | None:
+        """获取实际集合所用的向量模型（集合当前被某个别名指向时才可知）"""
+        for entry in self._load().values():
+            if entry.collection_name == collection_name and entry.embedding_model:
+                return entry.embedding_model
+        return None
+
+    def get_dual_write(self, alias: str) -> DualWriteTarget | None:
+        """别名正在重建索引时返回双写目标"""
+        entry = self._load().get(alias)
+        if entry is None or not entry.dual_write_collection:
+            return None
+        return DualWriteTarget(
+            alias=alias,
+            target_collection=entry.dual_write_collection,
+            embedding_model=entry.dual_write_model,
+            embedding_model_dir=entry.dual_write_model_dir,
+        )
+
+    def begin_dual_write(
+            self,
+            alias: str,
+            target_collection: str,
+            embedding_model: str,
+            embedding_model_dir: str | None = None,
+            stale_after: float = 600.0,
+    ):
+        """登记双写目标；别名已有进行中的重建（stale_after 秒内有心跳）时拒绝
+
+        重建任务可能由任意 worker 发起，以别名行上的记录保证同一别名同时只有一个任务。
+        """
+        with Session(get_engine()) as session:
+            row = session.exec(
+                select(VectorCollectionAlias)
+                .where(VectorCollectionAlias.alias == alias)
+                .with_for_update()
+            ).first()
+            now = datetime.now(timezone.utc)
+            if row is None:
+                # 尚未切换过的别名：当前集合即同名集合
+                row = VectorCollectionAlias(alias=alias, collection_name=alias)
+            elif row.dual_write_collection and not row.is_deleted:
+                updated_at = row.updated_at if row.updated_at.tzinfo else row.updated_at.replace(tzinfo=timezone.utc)
+                if now - updated_at < timedelta(seconds=stale_after):
+                    raise ReindexAlreadyRunningException(
+                        detail=f"alias: {alias} | target: {row.dual_write_collection}"
+                    )
+                logger.warning(
+                    f"[CollectionAlias] 接管超时未完成的重建 | alias: {alias} | target: {row.dual_write_collection}"
+                )
+            row.dual_write_collection = target_collection
+            row.dual_write_model = embedding_model
+            row.dual_write_model_dir = embedding_model_dir
+            row.is_deleted = False
+            row.updated_at = now
+            session.add(row)
+            session.commit()
+            session.refresh(row)
+            self._store(alias, row)
+
+    def heartbeat(self, alias: str):
+        """重建任务定期刷新别名行的 updated_at，表明任务仍在运行"""
+        with Session(get_engine()) as session:
+            row = session.exec(select(VectorCollectionAlias).where(VectorCollectionAlias.alias == alias)).first()
+            if row is not None:
+                row.updated_at = datetime.now(timezone.utc)
+                session.add(row)
+                session.commit()
+
+    def end_dual_write(self, alias: str):
+        """清除双写目标（重建失败时调用；成功时由 switch() 一并清除）"""
+        with Session(get_engine()) as session:
+            row = session.exec(
+                select(VectorCollectionAlias)
+                .where(VectorCollectionAlias.alias == alias)
+                .with_for_update()
+            ).first()
+            if row is None:
+                return
+            row.dual_write_collection = None
+            row.dual_write_model = None
+            row.dual_write_model_dir = None
+            row.updated_at = datetime.now(timezone.utc)
+            session.add(row)
+            session.commit()
+            session.refresh(row)
+            self._store(alias, row)
+
+    def switch(
+            self,
+            alias: str,
+            collection_name: str,
+            embedding_model: str | None = None,
+            embedding_model_dir: str | None = None,
+    ):
+        """将别名原子地指向新的集合，并清除双写目标"""
+        with Session(get_engine()) as session:
+            row = session.exec(
+                select(VectorCollectionAlias)
+                .where(VectorCollectionAlias.alias == alias)
+                .with_for_update()
+            ).first()
+            previous = row.collection_name if row else alias
+            if row is None:
+                row = VectorCollectionAlias(alias=alias, collection_name=collection_name)
+            row.collection_name = collection_name
+            row.embedding_model = embedding_model
+            row.embedding_model_dir = embedding_model_dir
+            row.dual_write_collection = None
+            row.dual_write_model = None
+            row.dual_write_model_dir = None
+            row.is_deleted = False
+            row.updated_at = datetime.now(timezone.utc)
+            session.add(row)
+            session.commit()
+            session.refresh(row)
+            self._store(alias, row)
+        logger.info(f"[CollectionAlias] 别名切换 | {alias}: {previous} -> {collection_name}")
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from pydantic import ValidationError
+
+from ..api.models import NdjsonDocumentRecord
+from ..services.document_service import DocumentService, PreparedDocument
+from ..services.partition_service import DocumentPartition
+from ..utils.hashing import sha256_text
+from ..utils.logger import get_logger
+from ..utils.text_processor import TextProcessor
+
+logger = get_logger(__name__)
+
+# 导入结果中最多保留的失败原因条数
+MAX_REPORTED_ERRORS = 100
+
+
+@dataclass
+class DocumentImportStats:
+    """NDJSON 导入统计"""
+
+    documents: int = 0
+    deduplicated: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    boilerplate_chunks: int = 0
+    skipped_chunks: int = 0
+    failed: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def add_error(self, message: str, count: int = 1):
+        self.failed += count
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+
+class NdjsonDocumentImporter:
+    """流式导入已分块（可带向量）的文档
+
+    每行一个 NdjsonDocumentRecord，逐行校验后缓冲；缓冲分块数达到 batch_chunks 时
+    通过 DocumentService.ingest_prepared 合并向量化缺少向量的分块并批量写入，
+    内存占用只与批次大小相关，与导入总量无关。
+
+    用法：
+        importer = NdjsonDocumentImporter(service, batch_chunks)
+        for line_no, line in enumerate(lines, 1):
+            if importer.feed(line_no, line):
+                importer.flush()
+        importer.flush()
+    """
+
+    def __init__(self, service: DocumentService, batch_chunks: int):
+        self.service = service
+        self.batch_chunks = max(1, batch_chunks)
+        self.stats = DocumentImportStats()
+        self._buffer: list[tuple[int, PreparedDocument]] = []
+        self._buffered_chunks = 0
+        # 当前模型的向量维度：模型名 -> 维度（首次需要时向量化一段探测文本得到）
+        self._dimensions: dict[str, int] = {}
+
+    def _current_model(self, partition: DocumentPartition) -> tuple[str, int]:
+        """文档所在集合当前所用的 (模型名, 向量维度)"""
+        collection = self.service.partition_router.collection_for_document(partition)
+        embedder = self.service.embedder_for(collection)
+        model_name = embedder.model_name
+        if model_name not in self._dimensions:
+            self._dimensions[model_name] = len(embedder.embed_text("dimension probe"))
+        return model_name, self._dimensions[model_name]
+
+    def feed(self, line_no: int, line: str | bytes) -> bool:
+        """校验并缓冲一行记录，返回缓冲区是否已满（需要 flush）"""
+        if not line.strip():
+            return False
+        try:
+            record = NdjsonDocumentRecord.model_validate_json(line)
+        except ValidationError as e:
+            self.stats.add_error(f"line {line_no}: {e.errors(include_url=False)}")
+            return False
+
+        chunks = [chunk.content for chunk in record.chunks]
+        partition = DocumentPartition(kb_id=record.kb_id, project_id=record.project_id, user_id=record.user_id)
+        # 向量必须与文档所在集合使用同一模型：未声明模型或模型不一致时忽略已有向量、重新向量化
+        vectors_usable = False
+        if record.embedding_model is not None and any(chunk.embedding is not None for chunk in record.chunks):
+            model_name, dimension = self._current_model(partition)
+            vectors_usable = record.embedding_model == model_name
+            wrong = [
+                i for i, chunk in enumerate(record.chunks)
+                if chunk.embedding is not None and len(chunk.embedding) != dimension
+            ]
+            if vectors_usable and wrong:
+                # 维度不符的记录单独拒绝，不让它导致整批向量写入失败
+                self.stats.add_error(
+                    f"line {line_no}: chunks {wrong[:10]} embedding dimension != {dimension} ({model_name})"
+                )
+                return False
+        self._buffer.append((line_no, PreparedDocument(
+            name=record.name,
+            source_type=record.source_type,
+            source_content=record.source,
+            source_hash=None,
+            content_hash=sha256_text(TextProcessor.normalize_whitespace("\n".join(chunks))),
+            chunks=chunks,
+            embeddings=[chunk.embedding if vectors_usable else None for chunk in record.chunks],
+            chunk_extras=[chunk.extra for chunk in record.chunks],
+            partition=partition,
+        )))
+        self._buffered_chunks += len(chunks)
+        return self._buffered_chunks >= self.batch_chunks
+
+    def flush(self):
+        """写入缓冲区中的记录；写入失败时回滚并将整批计为失败"""
+        if not self._buffer:
+            return
+        line_nos = [line_no for line_no, _ in self._buffer]
+        prepared = [p for _, p in self._buffer]
+        self._buffer = []
+        self._buffered_chunks = 0
+
+        try:
+            results = self.service.ingest_prepared(prepared)
+        except Exception as e:
+            self.service.db.rollback()
+            logger.warning(
+                f"[DocumentImport] 批次写入失败 | lines: {line_nos[0]}-{line_nos[-1]} | error: {e}"
+            )
+            self.stats.add_error(f"lines {line_nos[0]}-{line_nos[-1]}: {e}", count=len(prepared))
+            return
+
+        for p, result in zip(prepared, results):
+            if result.deduplicated:
+                self.stats.deduplicated += 1
+                continue
+            self.stats.documents += 1
+            self.stats.chunks += result.chunks_count
+            self.stats.embedded += sum(1 for vector in p.embeddings if vector is None)
+            self.stats.boilerplate_chunks += result.boilerplate_chunks
+            self.stats.skipped_chunks += result.skipped_chunks
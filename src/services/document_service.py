@@ -1,14 +1,166 @@
 from __future__ import annotations
 
-from typing import Sequence
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+from uuid import uuid4
 
+from sqlalchemy import func, insert, update
 from sqlmodel import Session, select
 
+from ..config import Settings, get_settings
 from ..db.models import Document, DocumentChunk
-from ..embedding.chunker import DocumentChunker
-from ..embedding.embedder import TextEmbedder
+from ..embedding.chunker import DocumentChunker, RecordChunk
+from ..embedding.embedder import CollectionEmbedders, TextEmbedder
+from ..embedding.vector_codec import encode_vector
 from ..embedding.vector_store import VectorStore
-from ..tools.document_loader import DocumentLoader
+from ..services.boilerplate_index import BoilerplateIndex, boilerplate_metadata
+from ..services.partition_service import DocumentPartition, PartitionRouter, partition_metadata
+from ..services.reindex_service import ReindexManager
+from ..tools.document_loader import DocumentLoader, LoadedRecord
+from ..utils.concurrency import KeyedLock
+from ..utils.hashing import sha256_file, sha256_text, simhash64
+from ..utils.logger import get_logger
+from ..utils.profiling import NULL_PROFILER, IngestProfiler
+from ..utils.text_processor import TextProcessor
+
+logger = get_logger(__name__)
+
+# 进程内的去重锁：合并同一内容的并发上传
+# 加锁顺序约定：先 source:* 再 content:*，同类 key 按字典序，避免批量上传之间死锁
+_ingest_locks = KeyedLock()
+
+
+@dataclass
+class DocumentIngestResult:
+    """单个文档的入库结果"""
+
+    document: Document = field(
+        metadata={"description": "新建或复用的文档记录"}
+    )
+    chunks_count: int = field(
+        metadata={"description": "文档的分块数量"}
+    )
+    deduplicated: bool = field(
+        default=False,
+        metadata={"description": "是否命中已有文档（跳过解析、分块与向量化）"}
+    )
+    boilerplate_chunks: int = field(
+        default=0,
+        metadata={"description": "识别为跨文档样板内容的分块数"}
+    )
+    skipped_chunks: int = field(
+        default=0,
+        metadata={"description": "因样板策略为 skip 而未写入的分块数"}
+    )
+    profile: dict | None = field(
+        default=None,
+        metadata={"description": "分阶段资源报告，仅在开启诊断时返回"}
+    )
+
+
+@dataclass
+class DocumentUploadItem:
+    """批量上传中的单个待入库文档"""
+
+    name: str = field(
+        metadata={"description": "文档名称"}
+    )
+    source_type: str = field(
+        metadata={"description": "来源类型：url / text / file"}
+    )
+    content: str = field(
+        metadata={"description": "文档内容、URL 或文件路径"}
+    )
+    partition: DocumentPartition = field(
+        default_factory=DocumentPartition,
+        metadata={"description": "文档所属的知识库 / 项目 / 用户"}
+    )
+
+
+@dataclass
+class BatchIngestItem:
+    """批量上传中单个文档的处理结果"""
+
+    index: int = field(
+        metadata={"description": "文档在请求中的位置"}
+    )
+    name: str = field(
+        metadata={"description": "文档名称"}
+    )
+    result: DocumentIngestResult | None = field(
+        default=None,
+        metadata={"description": "入库结果，失败时为空"}
+    )
+    error: str | None = field(
+        default=None,
+        metadata={"description": "失败原因"}
+    )
+
+
+@dataclass
+class PreparedDocument:
+    """已完成解析与分块、等待向量化和写入的文档"""
+
+    name: str
+    source_type: str
+    source_content: str | None
+    source_hash: str | None
+    content_hash: str
+    chunks: list[str]
+    # 与 chunks 一一对应的已有向量（须由当前向量模型生成），为 None 的分块才会向量化
+    embeddings: list[list[float] | None] | None = None
+    # 与 chunks 一一对应的分块附加元信息，写入 DocumentChunk.extra
+    chunk_extras: list[dict | None] | None = None
+    # 样板检测结果：与 chunks 一一对应的 SimHash 与样板标记，以及被跳过的分块数
+    simhashes: list[int] | None = None
+    boilerplate: list[bool] | None = None
+    skipped_chunks: int = 0
+    # 分区归属，决定文档写入的向量集合
+    partition: DocumentPartition | None = None
+
+    @property
+    def boilerplate_chunks(self) -> int:
+        return sum(self.boilerplate or []) + self.skipped_chunks
+
+
+def find_active_documents(
+        session: Session,
+        hash_field: str,
+        hashes: list[str],
+) -> dict[tuple[str, str | None], Document]:
+    """按内容指纹批量查找有效（未删除且启用）的文档
+
+    返回 (指纹, 向量集合) -> 文档，同一集合中的同一指纹取最早创建的一条；
+    不同分区中的相同内容各自独立，互不复用。
+    """
+    if not hashes:
+        return {}
+    column = getattr(Document, hash_field)
+    docs = session.exec(
+        select(Document)
+        .where(
+            column.in_(set(hashes)),
+            Document.is_deleted == False,  # noqa: E712
+            Document.status == "active",
+        )
+        .order_by(Document.id)
+    ).all()
+
+    found: dict[tuple[str, str | None], Document] = {}
+    for doc in docs:
+        found.setdefault((getattr(doc, hash_field), doc.vector_collection), doc)
+    return found
+
+
+def find_ingested_source_hashes(session: Session, source_hashes: Sequence[str]) -> set[str]:
+    """返回已存在有效文档（默认集合中）的原始来源哈希，用于离线导入跳过已入库的文件"""
+    found = find_active_documents(session, "source_hash", list(source_hashes))
+    return {source_hash for source_hash, collection in found if collection is None}
 
 
 class DocumentService:
@@ -18,11 +170,24 @@ class DocumentService:
             chunker: DocumentChunker,
             embedder: TextEmbedder,
             vector_store: VectorStore,
+            settings: Settings | None = None,
+            reindex_manager: ReindexManager | None = None,
+            boilerplate_index: BoilerplateIndex | None = None,
+            partition_router: PartitionRouter | None = None,
+            collection_embedders: CollectionEmbedders | None = None,
     ):
         self.db = db
         self.chunker = chunker
         self.embedder = embedder
         self.vector_store = vector_store
+        self.settings = settings or get_settings()
+        self.reindex_manager = reindex_manager
+        self.boilerplate_index = boilerplate_index
+        self.partition_router = partition_router or PartitionRouter(self.settings)
+        # 按集合选择模型（分区集合可能已重建索引到其他模型），未提供时所有集合都使用 embedder
+        self.collection_embedders = collection_embedders
+        # 分阶段资源诊断，仅在 create_document_with_chunks 开启时替换为 IngestProfiler
+        self._profiler = NULL_PROFILER
 
     def create_document_with_chunks(
             self,
@@ -30,60 +195,648 @@ class DocumentService:
             name: str,
             source_type: str,
             source_content: str,
-    ) -> tuple[Document, int]:
-        """创建文档及分块，并写入向量库"""
+            profile: bool = False,
+            partition: DocumentPartition | None = None,
+    ) -> DocumentIngestResult:
+        """创建文档及分块，并写入向量库
 
-        # 1. 根据来源类型加载原始文本（URL / 文件 / 直接文本）
-        text = DocumentLoader.load(source_content, source_type=source_type)
+        相同内容（原始字节或归一化文本的哈希一致）的有效文档只处理一次：
+        命中时直接复用已有文档及其分块，跳过解析、分块与向量化；
+        并发上传同一内容时，后到的请求会等待先到的请求提交后复用其结果。
+
+        profile 为 True（或开启 ingest_profiling）时记录各阶段的耗时、CPU 与内存，
+        以 JSON 写入日志并通过结果的 profile 字段返回。
+
+        partition 指定文档的知识库 / 项目 / 用户归属，开启分区路由时决定写入的向量集合；
+        去重只在同一集合内进行。
+        """
+        if not (profile or self.settings.ingest_profiling):
+            return self._create_document(name, source_type, source_content, partition)
+
+        profiler = IngestProfiler(label=name, count_objects=self.settings.ingest_profiling_count_objects)
+        self._profiler = profiler
+        try:
+            with profiler:
+                result = self._create_document(name, source_type, source_content, partition)
+        finally:
+            self._profiler = NULL_PROFILER
+        result.profile = profiler.report()
+        return result
+
+    def _create_document(
+            self,
+            name: str,
+            source_type: str,
+            source_content: str,
+            partition: DocumentPartition | None = None,
+    ) -> DocumentIngestResult:
+        profiler = self._profiler
+        collection = self.partition_router.collection_for_document(partition)
+        with ExitStack() as stack:
+            # 1. 原始来源哈希（解析前），命中则跳过后续全部处理
+            with profiler.stage("source_hash", source_type=source_type):
+                source_hash = self._compute_source_hash(source_content, source_type)
+            if source_hash:
+                stack.enter_context(_ingest_locks.hold(f"source:{source_hash}"))
+                existing = self._find_active_documents("source_hash", [source_hash]).get((source_hash, collection))
+                if existing:
+                    return self._reuse_documents([existing])[0]
 
-        # 2. 分块与向量化
-        chunks = self.chunker.chunk(text)
-        embeddings = self.embedder.embed_batch(chunks)
+            # 大文件 / 记录型文件按记录流式入库
+            if source_type == "file" and DocumentLoader.is_streaming(
+                    source_content, self.settings.stream_file_threshold_bytes
+            ):
+                with profiler.stage("stream_ingest") as info:
+                    result = self._ingest_streamed_file(name, source_content, source_hash, partition)
+                    info["chunks"] = result.chunks_count
+                return result
 
-        # 3. 文档记录（保留原始来源 content，便于追溯）
-        doc = Document(
-            name=name,
-            source_type=source_type,
-            source=source_content,
-            user_id=None,
+            # 2. 根据来源类型加载原始文本（URL / 文件 / 直接文本）
+            with profiler.stage("extract", source_type=source_type) as info:
+                text = DocumentLoader.load(source_content, source_type=source_type)
+                info["text_chars"] = len(text)
+
+            # 3. 归一化文本哈希（解析后），命中则跳过分块与向量化
+            with profiler.stage("content_hash"):
+                content_hash = sha256_text(TextProcessor.normalize_whitespace(text))
+            stack.enter_context(_ingest_locks.hold(f"content:{content_hash}"))
+            existing = self._find_active_documents("content_hash", [content_hash]).get((content_hash, collection))
+            if existing:
+                return self._reuse_documents([existing])[0]
+
+            # 4. 分块、向量化并写入数据库与向量库
+            with profiler.stage("chunk") as info:
+                chunks = self.chunker.chunk(text)
+                info["chunks"] = len(chunks)
+            pending = PreparedDocument(
+                name=name,
+                source_type=source_type,
+                source_content=source_content,
+                source_hash=source_hash,
+                content_hash=content_hash,
+                chunks=chunks,
+                partition=partition,
+            )
+            # 在持有去重锁期间提交，保证等待中的重复请求能查到本次结果
+            doc = self._write_and_commit([pending])[0]
+
+        return DocumentIngestResult(
+            document=doc,
+            chunks_count=len(pending.chunks),
+            boilerplate_chunks=pending.boilerplate_chunks,
+            skipped_chunks=pending.skipped_chunks,
         )
+
+    def create_documents_batch(self, items: Sequence[DocumentUploadItem]) -> list[BatchIngestItem]:
+        """批量创建文档
+
+        流程：
+        1. 按原始来源哈希批量去重；
+        2. 线程池并行解析与分块；
+        3. 按归一化文本哈希去重、合并向量化并批量写入（见 ingest_prepared）；
+        4. 大文件 / 记录型文件逐个流式入库。
+
+        单个文档解析失败只记录在其结果中；向量化或写入失败则整批回滚。
+        """
+        outcomes = [BatchIngestItem(index=i, name=item.name) for i, item in enumerate(items)]
+        partitions = [item.partition for item in items]
+        collections = [self.partition_router.collection_for_document(partition) for partition in partitions]
+
+        with ExitStack() as stack:
+            # 1. 原始来源哈希去重
+            source_hashes = [self._compute_source_hash(item.content, item.source_type) for item in items]
+            for key in sorted({f"source:{h}" for h in source_hashes if h}):
+                stack.enter_context(_ingest_locks.hold(key))
+            existing_by_source = self._find_active_documents(
+                "source_hash", [h for h in source_hashes if h]
+            )
+
+            reused: dict[int, Document] = {}
+            to_extract: list[int] = []
+            to_stream: list[int] = []
+            threshold = self.settings.stream_file_threshold_bytes
+            for i, source_hash in enumerate(source_hashes):
+                if source_hash and (source_hash, collections[i]) in existing_by_source:
+                    reused[i] = existing_by_source[(source_hash, collections[i])]
+                elif items[i].source_type == "file" and DocumentLoader.is_streaming(items[i].content, threshold):
+                    to_stream.append(i)
+                else:
+                    to_extract.append(i)
+
+            # 2. 并行解析与分块（不访问数据库会话，可安全并发）
+            extracted: dict[int, tuple[str, list[str]]] = {}
+            if to_extract:
+                workers = max(1, min(self.settings.ingest_workers, len(to_extract)))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    futures = {
+                        i: pool.submit(self._extract_and_chunk, items[i].content, items[i].source_type)
+                        for i in to_extract
+                    }
+                    for i, future in futures.items():
+                        try:
+                            extracted[i] = future.result()
+                        except Exception as e:
+                            logger.warning(f"[DocumentService] 批量上传中文档解析失败 | name: {items[i].name} | error: {e}")
+                            outcomes[i].error = str(e)
+
+            # 3~5. 归一化文本哈希去重、合并向量化与批量写入
+            extracted_indices = list(extracted.keys())
+            prepared = [
+                PreparedDocument(
+                    name=items[i].name,
+                    source_type=items[i].source_type,
+                    source_content=items[i].content,
+                    source_hash=source_hashes[i],
+                    content_hash=extracted[i][0],
+                    chunks=extracted[i][1],
+                    partition=partitions[i],
+                )
+                for i in extracted_indices
+            ]
+            for i, result in zip(extracted_indices, self.ingest_prepared(prepared)):
+                outcomes[i].result = result
+
+            # 大文件 / 记录型文件逐个流式入库（各自独立事务）
+            for i in to_stream:
+                try:
+                    outcomes[i].result = self._ingest_streamed_file(
+                        items[i].name, items[i].content, source_hashes[i], partitions[i]
+                    )
+                except Exception as e:
+                    logger.warning(f"[DocumentService] 批量上传中文件流式入库失败 | name: {items[i].name} | error: {e}")
+                    outcomes[i].error = str(e)
+
+        if reused:
+            reused_results = self._reuse_documents(list(reused.values()))
+            for i, result in zip(reused.keys(), reused_results):
+                outcomes[i].result = result
+
+        return outcomes
+
+    def ingest_prepared(self, prepared: Sequence[PreparedDocument]) -> list[DocumentIngestResult]:
+        """写入已完成解析与分块的文档，返回与输入一一对应的入库结果
+
+        按归一化文本哈希去重（含同一批次内的重复，只保留第一个），
+        合并所有待写入文档的分块后按 embedding_batch_size 满批向量化，
+        一次性写入数据库与向量库并在单个事务中提交。
+        """
+        results: list[DocumentIngestResult | None] = [None] * len(prepared)
+
+        with ExitStack() as stack:
+            for key in sorted({f"content:{p.content_hash}" for p in prepared}):
+                stack.enter_context(_ingest_locks.hold(key))
+            existing_by_content = self._find_active_documents(
+                "content_hash", [p.content_hash for p in prepared]
+            )
+
+            reused: dict[int, Document] = {}
+            pending: list[PreparedDocument] = []
+            pending_index: dict[tuple[str, str | None], int] = {}
+            pending_of: dict[int, int] = {}
+            for i, p in enumerate(prepared):
+                # 去重只在同一向量集合（分区）内进行
+                key = (p.content_hash, self.partition_router.collection_for_document(p.partition))
+                if key in existing_by_content:
+                    reused[i] = existing_by_content[key]
+                    continue
+                if key not in pending_index:
+                    pending_index[key] = len(pending)
+                    pending.append(p)
+                pending_of[i] = pending_index[key]
+
+            if pending:
+                created = self._write_and_commit(pending)
+                logger.info(
+                    f"[DocumentService] 批量写入完成 | 新建文档: {len(created)} | "
+                    f"分块: {sum(len(p.chunks) for p in pending)}"
+                )
+            else:
+                created = []
+
+        first_owner: dict[int, int] = {}
+        for i, p_idx in pending_of.items():
+            first = first_owner.setdefault(p_idx, i)
+            owner = pending[p_idx]
+            results[i] = DocumentIngestResult(
+                document=created[p_idx],
+                chunks_count=len(owner.chunks),
+                deduplicated=first != i,
+                boilerplate_chunks=owner.boilerplate_chunks,
+                skipped_chunks=owner.skipped_chunks,
+            )
+
+        if reused:
+            for i, result in zip(reused.keys(), self._reuse_documents(list(reused.values()))):
+                results[i] = result
+
+        return results
+
+    @staticmethod
+    def _compute_source_hash(source_content: str, source_type: str) -> str | None:
+        """计算原始来源字节的哈希；URL 需抓取后才有内容，此处不计算"""
+        if source_type == "text":
+            return sha256_text(source_content)
+        if source_type == "file" and Path(source_content).is_file():
+            return sha256_file(source_content)
+        return None
+
+    def _extract_and_chunk(self, source_content: str, source_type: str) -> tuple[str, list[str]]:
+        """加载原始文本并分块，返回 (归一化文本哈希, 分块列表)"""
+        text = DocumentLoader.load(source_content, source_type=source_type)
+        content_hash = sha256_text(TextProcessor.normalize_whitespace(text))
+        return content_hash, self.chunker.chunk(text)
+
+    def _ingest_streamed_file(
+            self,
+            name: str,
+            file_path: str,
+            source_hash: str | None,
+            partition: DocumentPartition | None = None,
+    ) -> DocumentIngestResult:
+        """流式入库大文件（CSV / JSONL / 日志 / 大文本），内存占用与文件大小无关
+
+        按记录边界分块，每累积 stream_batch_chunks 个分块做一次样板检测、向量化并写入；
+        分块记录用批量 INSERT 写入，不在会话中保留对象。整个文件在同一事务中提交，
+        失败时回滚并清理已写入的向量。
+
+        调用方需持有该文件的 source 去重锁。归一化文本哈希在写入过程中增量计算，
+        因此流式文件只按原始来源哈希去重。
+        """
+        doc = Document(name=name, source_type="file", source=file_path, source_hash=source_hash)
+        self._assign_partition(doc, partition)
         self.db.add(doc)
         self.db.flush()
 
-        # 4. 分块记录
-        chunk_rows: list[DocumentChunk] = []
-        for idx, content in enumerate(chunks):
-            row = DocumentChunk(
-                document_id=doc.id,
-                chunk_index=idx,
-                content=content,
+        # 内容指纹写完才确定，样板索引先以临时键登记
+        provisional_key = f"doc:{doc.id}"
+        digest = hashlib.sha256()
+        batch_size = max(1, self.settings.stream_batch_chunks)
+        chunks_count = boilerplate_chunks = skipped_chunks = 0
+        try:
+            records = self._hash_records(DocumentLoader.iter_records(file_path), digest)
+            for batch in self._batched(self.chunker.chunk_records(records), batch_size):
+                p = PreparedDocument(
+                    name=name,
+                    source_type="file",
+                    source_content=file_path,
+                    source_hash=source_hash,
+                    content_hash=provisional_key,
+                    chunks=[chunk.text for chunk in batch],
+                    chunk_extras=[{"row_start": chunk.start_row, "row_end": chunk.end_row} for chunk in batch],
+                    partition=partition,
+                )
+                self._detect_boilerplate([p])
+                embeddings = self._embed_missing([p])
+                rows, metadatas = self._build_chunk_rows(doc, p, embeddings, start_index=chunks_count)
+                self._insert_chunk_rows(rows, force_bulk=True)
+                self._write_vectors(rows, metadatas, embeddings, doc.vector_collection)
+
+                chunks_count += len(p.chunks)
+                boilerplate_chunks += p.boilerplate_chunks
+                skipped_chunks += p.skipped_chunks
+                logger.debug(f"[DocumentService] 流式入库进度 | name: {name} | chunks: {chunks_count}")
+
+            doc.content_hash = digest.hexdigest()
+            self.db.add(doc)
+            self.db.commit()
+        except Exception:
+            document_uid = doc.document_uid
+            self.db.rollback()
+            self._forget_boilerplate([provisional_key])
+            try:
+                self.vector_store.delete_by_document_uid(document_uid, collection_name=doc.vector_collection)
+                self._delete_from_reindex_target([document_uid], doc.vector_collection)
+            except Exception as e:
+                logger.warning(f"[DocumentService] 流式入库失败后清理向量失败 | document_uid: {document_uid} | error: {e}")
+            raise
+
+        if self.boilerplate_index is not None:
+            self.boilerplate_index.rename(provisional_key, doc.content_hash)
+        logger.info(
+            f"[DocumentService] 流式入库完成 | name: {name} | chunks: {chunks_count} | boilerplate: {boilerplate_chunks}"
+        )
+        return DocumentIngestResult(
+            document=doc,
+            chunks_count=chunks_count,
+            boilerplate_chunks=boilerplate_chunks,
+            skipped_chunks=skipped_chunks,
+        )
+
+    @staticmethod
+    def _hash_records(records: Iterable[LoadedRecord], digest) -> Iterator[LoadedRecord]:
+        """透传记录，同时按归一化文本增量更新内容指纹"""
+        for record in records:
+            digest.update(TextProcessor.normalize_whitespace(record.text).encode("utf-8"))
+            digest.update(b"\n")
+            yield record
+
+    @staticmethod
+    def _batched(chunks: Iterable[RecordChunk], size: int) -> Iterator[list[RecordChunk]]:
+        batch: list[RecordChunk] = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def embedder_for(self, collection_name: str | None) -> TextEmbedder:
+        """写入集合（逻辑名，为空时为默认集合）所用的嵌入器"""
+        if self.collection_embedders is None:
+            return self.embedder
+        return self.collection_embedders.get(collection_name or VectorStore.DEFAULT_COLLECTION_NAME)
+
+    def _embed(self, texts: list[str], embedder: TextEmbedder | None = None) -> list[list[float]]:
+        """按 embedding_batch_size 分批向量化，避免单次前向传播过大"""
+        embedder = embedder or self.embedder
+        batch_size = max(1, self.settings.embedding_batch_size)
+        embeddings: list[list[float]] = []
+        for start in range(0, len(texts), batch_size):
+            embeddings.extend(embedder.embed_batch(texts[start:start + batch_size]))
+        return embeddings
+
+    def _write_and_commit(self, pending: list[PreparedDocument]) -> list[Document]:
+        """样板检测、向量化缺失向量、写入并提交；失败时回滚样板索引中的登记"""
+        with self._profiler.stage("boilerplate"):
+            registered = self._detect_boilerplate(pending)
+        try:
+            with self._profiler.stage("embed") as info:
+                embeddings = self._embed_missing(pending)
+                info["chunks"] = len(embeddings)
+            docs = self._write_documents(pending, embeddings)
+            with self._profiler.stage("commit"):
+                self.db.commit()
+        except Exception:
+            self._forget_boilerplate(registered)
+            raise
+        return docs
+
+    def _detect_boilerplate(self, pending: Sequence[PreparedDocument]) -> list[str]:
+        """计算分块 SimHash，按 boilerplate_policy 标记或剔除样板分块，返回已登记到索引的文档键
+
+        样板分块在向量化之前识别，skip 策略下既不写入也不向量化。
+        """
+        policy = self.settings.boilerplate_policy
+        if self.boilerplate_index is None or policy == "off":
+            return []
+
+        index = self.boilerplate_index
+        index.ensure_loaded()
+        min_documents = max(1, self.settings.boilerplate_min_documents)
+        for p in pending:
+            simhashes = [simhash64(chunk) for chunk in p.chunks]
+            flags = [
+                index.count_documents(simhash, exclude_key=p.content_hash, limit=min_documents) >= min_documents
+                for simhash in simhashes
+            ]
+            # 立即登记，同一批次中后续文档也能匹配到本文档的分块
+            index.add(p.content_hash, simhashes)
+
+            if policy == "skip" and any(flags):
+                keep = [i for i, flag in enumerate(flags) if not flag]
+                p.skipped_chunks = len(flags) - len(keep)
+                p.chunks = [p.chunks[i] for i in keep]
+                if p.embeddings is not None:
+                    p.embeddings = [p.embeddings[i] for i in keep]
+                if p.chunk_extras is not None:
+                    p.chunk_extras = [p.chunk_extras[i] for i in keep]
+                simhashes = [simhashes[i] for i in keep]
+                flags = [False] * len(keep)
+
+            p.simhashes = simhashes
+            p.boilerplate = flags
+            if p.boilerplate_chunks:
+                logger.info(
+                    f"[DocumentService] 识别样板分块 | name: {p.name} | boilerplate: {p.boilerplate_chunks} "
+                    f"| policy: {policy}"
+                )
+        return [p.content_hash for p in pending]
+
+    def _forget_boilerplate(self, keys: list[str]):
+        """从样板索引中移除文档（写入失败或文档删除时）"""
+        if self.boilerplate_index is not None and keys:
+            self.boilerplate_index.remove(keys)
+
+    def _embed_missing(self, pending: Sequence[PreparedDocument]) -> list[list[float]]:
+        """返回所有分块按顺序拼接后的向量，只对缺少向量的分块做向量化（按文档所在集合的模型分组）"""
+        embeddings: list[list[float] | None] = []
+        missing: dict[str | None, list[int]] = {}
+        for p in pending:
+            collection = self.partition_router.collection_for_document(p.partition)
+            start = len(embeddings)
+            embeddings.extend(p.embeddings if p.embeddings is not None else [None] * len(p.chunks))
+            missing.setdefault(collection, []).extend(
+                i for i in range(start, len(embeddings)) if embeddings[i] is None
             )
-            self.db.add(row)
-            chunk_rows.append(row)
+        all_chunks = [chunk for p in pending for chunk in p.chunks]
+        for collection, positions in missing.items():
+            if not positions:
+                continue
+            vectors = self._embed([all_chunks[i] for i in positions], embedder=self.embedder_for(collection))
+            for i, vector in zip(positions, vectors):
+                embeddings[i] = vector
+        return embeddings
 
-        # 5. 向量库写入
-        self.vector_store.create_collection("documents")
+    def _write_documents(
+            self,
+            pending: list[PreparedDocument],
+            embeddings: list[list[float]],
+    ) -> list[Document]:
+        """写入文档与分块记录，并将所有分块一次性写入向量库
 
-        chunk_ids = [row.chunk_uid for row in chunk_rows]
-        metadatas = [
-            {
+        embeddings 与各文档分块按顺序拼接后的列表一一对应。
+        """
+        with self._profiler.stage("db_write", chunks=len(embeddings)):
+            # 1. 文档记录（保留原始来源 content，便于追溯）
+            docs = [
+                Document(
+                    name=p.name,
+                    source_type=p.source_type,
+                    source=p.source_content,
+                    source_hash=p.source_hash,
+                    content_hash=p.content_hash,
+                )
+                for p in pending
+            ]
+            for doc, p in zip(docs, pending):
+                self._assign_partition(doc, p.partition)
+            self.db.add_all(docs)
+            self.db.flush()
+
+            # 2. 分块记录（按文档所在的向量集合分组，便于分区写入）
+            chunk_rows: list[dict] = []
+            by_collection: dict[str | None, tuple[list[dict], list[dict], list[list[float]]]] = {}
+            offset = 0
+            for doc, p in zip(docs, pending):
+                doc_embeddings = embeddings[offset:offset + len(p.chunks)]
+                rows, metas = self._build_chunk_rows(doc, p, doc_embeddings)
+                offset += len(p.chunks)
+                chunk_rows.extend(rows)
+                group = by_collection.setdefault(doc.vector_collection, ([], [], []))
+                group[0].extend(rows)
+                group[1].extend(metas)
+                group[2].extend(doc_embeddings)
+            self._insert_chunk_rows(chunk_rows)
+
+        with self._profiler.stage("vector_write", chunks=len(embeddings)):
+            # 3. 向量库写入
+            for collection, (rows, metas, vectors) in by_collection.items():
+                self._write_vectors(rows, metas, vectors, collection)
+
+        return docs
+
+    def _build_chunk_rows(
+            self,
+            doc: Document,
+            p: PreparedDocument,
+            embeddings: list[list[float]],
+            start_index: int = 0,
+    ) -> tuple[list[dict], list[dict]]:
+        """构造分块记录与向量库元数据，分块序号从 start_index 开始
+
+        chunk_uid 在客户端生成，便于批量插入后直接写向量库；
+        向量同时以紧凑二进制保存在分块记录中，向量库丢失或更换时可直接重建。
+        """
+        now = datetime.now(timezone.utc)
+        dtype = self.settings.embedding_storage_dtype
+        model_name = self.embedder_for(doc.vector_collection).model_name
+        extras = p.chunk_extras or [None] * len(p.chunks)
+        flags = p.boilerplate or [False] * len(p.chunks)
+        rows: list[dict] = []
+        metadatas: list[dict] = []
+        for offset, (content, vector) in enumerate(zip(p.chunks, embeddings)):
+            idx = start_index + offset
+            extra = extras[offset]
+            chunk_uid = uuid4().hex
+            rows.append({
+                "chunk_uid": chunk_uid,
+                "document_id": doc.id,
+                "chunk_index": idx,
+                "content": content,
+                "embedding_id": chunk_uid,
+                "embedding": encode_vector(vector, dtype),
+                "embedding_dtype": dtype,
+                "embedding_model": model_name,
+                "extra": extra,
+                "simhash": p.simhashes[offset] if p.simhashes else None,
+                "is_boilerplate": flags[offset],
+                "is_deleted": False,
+                "created_at": now,
+                "updated_at": now,
+            })
+            metadata = {
                 "document_uid": doc.document_uid,
                 "document_id": doc.id,
-                "chunk_uid": row.chunk_uid,
-                "chunk_index": row.chunk_index,
-                "name": name,
+                "chunk_uid": chunk_uid,
+                "chunk_index": idx,
+                "name": p.name,
+                **partition_metadata(doc.kb_id, doc.project_id),
+                **boilerplate_metadata(flags[offset], self.settings),
             }
-            for row in chunk_rows
-        ]
+            # 流式加载的分块带行号范围，便于检索结果回溯到原始记录
+            if extra and "row_start" in extra:
+                metadata["row_start"] = extra["row_start"]
+                metadata["row_end"] = extra["row_end"]
+            metadatas.append(metadata)
+        return rows, metadatas
 
+    def _assign_partition(self, doc: Document, partition: DocumentPartition | None):
+        """记录文档的分区归属与向量所在集合"""
+        if partition is not None:
+            doc.kb_id = partition.kb_id
+            doc.project_id = partition.project_id
+            doc.user_id = partition.user_id
+        doc.vector_collection = self.partition_router.collection_for_document(partition)
+
+    def _write_vectors(
+            self,
+            chunk_rows: list[dict],
+            metadatas: list[dict],
+            embeddings: list[list[float]],
+            collection_name: str | None = None,
+    ):
+        """将分块写入向量库（collection_name 为空时写入默认集合），重建索引进行中时同步双写目标集合"""
+        if not chunk_rows:
+            return
+        ids = [row["chunk_uid"] for row in chunk_rows]
+        texts = [row["content"] for row in chunk_rows]
         self.vector_store.add_documents(
-            ids=chunk_ids,
+            ids=ids,
             embeddings=embeddings,
-            documents=chunks,
+            documents=texts,
             metadatas=metadatas,
+            collection_name=collection_name,
         )
 
-        return doc, len(chunks)
+        # 重建索引进行中：用新模型同步写入目标集合（双写）
+        job = self._dual_write_job(collection_name)
+        if job is not None:
+            self.vector_store.upsert_documents(
+                ids=ids,
+                embeddings=self._embed(texts, embedder=job.embedder),
+                documents=texts,
+                metadatas=metadatas,
+                collection_name=job.target_collection,
+            )
+
+    def _dual_write_job(self, collection_name: str | None):
+        """集合（逻辑名，为空时为默认集合）正在重建索引时返回需要双写的任务"""
+        if self.reindex_manager is None:
+            return None
+        return self.reindex_manager.dual_write_job(collection_name or VectorStore.DEFAULT_COLLECTION_NAME)
+
+    def _delete_from_reindex_target(self, document_uids: list[str], collection_name: str | None = None):
+        """重建索引进行中时，同步删除目标集合中的向量（失败由重建任务的对账步骤兜底）"""
+        job = self._dual_write_job(collection_name)
+        if job is None or not document_uids:
+            return
+        try:
+            self.vector_store.delete_by_document_uids(document_uids, collection_name=job.target_collection)
+        except Exception as e:
+            logger.warning(f"[DocumentService] 双写删除目标集合失败，等待对账 | error: {e}")
+
+    def _insert_chunk_rows(self, rows: list[dict], force_bulk: bool = False) -> None:
+        """写入分块记录
+
+        分块较少时走 ORM（逐行 add，由 unit-of-work 统一 flush）；
+        达到 chunk_bulk_insert_threshold（或 force_bulk）时改用多行 INSERT ... VALUES，
+        每条语句写入 chunk_insert_batch_size 行，绕开逐对象的 ORM 开销，也不在会话中保留对象。
+        """
+        if not rows:
+            return
+        if not force_bulk and len(rows) < self.settings.chunk_bulk_insert_threshold:
+            self.db.add_all([DocumentChunk(**row) for row in rows])
+            return
+
+        table = DocumentChunk.__table__
+        batch_size = max(1, self.settings.chunk_insert_batch_size)
+        for start in range(0, len(rows), batch_size):
+            self.db.execute(insert(table).values(rows[start:start + batch_size]))
+        logger.debug(f"[DocumentService] 批量插入分块记录 | rows: {len(rows)} | batch_size: {batch_size}")
+
+    def _find_active_documents(self, hash_field: str, hashes: list[str]) -> dict[tuple[str, str | None], Document]:
+        return find_active_documents(self.db, hash_field, hashes)
+
+    def _reuse_documents(self, docs: list[Document]) -> list[DocumentIngestResult]:
+        """复用已存在的文档及其分块"""
+        doc_ids = {doc.id for doc in docs}
+        counts = dict(
+            self.db.exec(
+                select(DocumentChunk.document_id, func.count(DocumentChunk.id))
+                .where(
+                    DocumentChunk.document_id.in_(doc_ids),
+                    DocumentChunk.is_deleted == False,  # noqa: E712
+                )
+                .group_by(DocumentChunk.document_id)
+            ).all()
+        )
+        for doc in docs:
+            logger.info(f"[DocumentService] 命中重复内容，复用已有文档 | document_uid: {doc.document_uid}")
+        return [
+            DocumentIngestResult(document=doc, chunks_count=counts.get(doc.id, 0), deduplicated=True)
+            for doc in docs
+        ]
 
     def delete_document_by_uid(self, document_uid: str) -> bool:
         """根据 document_uid 删除文档、分块及向量"""
@@ -100,7 +853,8 @@ class DocumentService:
             return False
 
         # 2. 删除向量库中该文档的所有 chunks（物理删除，向量库不支持逻辑删除）
-        self.vector_store.delete_by_document_uid(document_uid)
+        self.vector_store.delete_by_document_uid(document_uid, collection_name=doc.vector_collection)
+        self._delete_from_reindex_target([document_uid], doc.vector_collection)
 
         # 3. 逻辑删除数据库中该文档的所有 chunks
         chunks_to_delete = self.db.exec(
@@ -113,40 +867,87 @@ class DocumentService:
             chunk.is_deleted = True
             self.db.add(chunk)
 
-        # 4. 逻辑删除文档记录
+        # 4. 逻辑删除文档记录（updated_at 供重建索引对账使用）
         doc.is_deleted = True
+        doc.updated_at = datetime.now(timezone.utc)
         self.db.add(doc)
         self.db.commit()
+        self._forget_boilerplate([doc.content_hash or f"doc:{doc.id}"])
 
         return True
 
     def batch_delete_documents(self, document_uids: list[str]) -> dict:
-        """批量删除文档、分块及向量
-        
+        """批量删除文档、分块及向量（集合化操作）
+
+        - 一次查询找出所有有效文档，不存在的 UID 记为失败；
+        - 向量库按 document_uid $in 条件分片删除，某一片失败时该片文档记为失败且不做逻辑删除；
+        - 数据库用两条 UPDATE ... WHERE ... IN (...) 逻辑删除分块与文档，在同一事务中提交。
+
         Returns:
             dict: 包含 success_count, failed_count, failed_uids 的字典
         """
-        success_count = 0
-        failed_uids = []
+        unique_uids = list(dict.fromkeys(document_uids))
+
+        # 1. 一次查询找出有效文档
+        rows = self.db.exec(
+            select(Document.id, Document.document_uid, Document.content_hash, Document.vector_collection).where(
+                Document.document_uid.in_(unique_uids),
+                Document.is_deleted == False,  # noqa: E712
+            )
+        ).all()
+        doc_id_by_uid = {uid: doc_id for doc_id, uid, _, _ in rows}
+        boilerplate_key_by_uid = {
+            uid: content_hash or f"doc:{doc_id}" for doc_id, uid, content_hash, _ in rows
+        }
+        uids_by_collection: dict[str | None, list[str]] = {}
+        for _, uid, _, collection in rows:
+            uids_by_collection.setdefault(collection, []).append(uid)
+        failed_uids = [uid for uid in unique_uids if uid not in doc_id_by_uid]
+
+        # 2. 向量库按集合分片删除（物理删除，向量库不支持逻辑删除）
+        deleted_uids: list[str] = []
+        batch_size = max(1, self.settings.vector_delete_batch_size)
+        for collection, found_uids in uids_by_collection.items():
+            for start in range(0, len(found_uids), batch_size):
+                uid_batch = found_uids[start:start + batch_size]
+                try:
+                    self.vector_store.delete_by_document_uids(uid_batch, collection_name=collection)
+                    self._delete_from_reindex_target(uid_batch, collection)
+                    deleted_uids.extend(uid_batch)
+                except Exception as e:
+                    logger.error(f"[DocumentService] 批量删除向量失败 | documents: {len(uid_batch)} | error: {e}")
+                    failed_uids.extend(uid_batch)
 
-        for document_uid in document_uids:
+        # 3. 数据库逻辑删除：分块与文档各一条 UPDATE，单个事务提交
+        if deleted_uids:
+            doc_ids = [doc_id_by_uid[uid] for uid in deleted_uids]
+            now = datetime.now(timezone.utc)
             try:
-                # 每个文档的删除操作是独立的，如果失败不影响其他文档
-                deleted = self.delete_document_by_uid(document_uid)
-                if deleted:
-                    success_count += 1
-                else:
-                    failed_uids.append(document_uid)
+                self.db.execute(
+                    update(DocumentChunk)
+                    .where(
+                        DocumentChunk.document_id.in_(doc_ids),
+                        DocumentChunk.is_deleted == False,  # noqa: E712
+                    )
+                    .values(is_deleted=True, updated_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+                self.db.execute(
+                    update(Document)
+                    .where(Document.id.in_(doc_ids))
+                    .values(is_deleted=True, updated_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+                self.db.commit()
+                self._forget_boilerplate([boilerplate_key_by_uid[uid] for uid in deleted_uids])
             except Exception as e:
-                # 如果删除过程中出现异常，回滚当前事务并记录失败的文档
-                failed_uids.append(document_uid)
-                try:
-                    self.db.rollback()
-                except Exception:
-                    # 如果回滚也失败，忽略（可能事务已经提交或不存在）
-                    pass
+                logger.error(f"[DocumentService] 批量逻辑删除失败 | documents: {len(doc_ids)} | error: {e}")
+                self.db.rollback()
+                failed_uids.extend(deleted_uids)
+                deleted_uids = []
+
         return {
-            "success_count": success_count,
+            "success_count": len(deleted_uids),
             "failed_count": len(failed_uids),
             "failed_uids": failed_uids,
         }
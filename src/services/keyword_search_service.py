@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import ProgrammingError
+from sqlmodel import Session, select
+
+from ..common.exceptions import DatabaseQueryFailedException
+from ..config import Settings
+from ..db.models import Document, DocumentChunk
+from ..db.session import get_engine
+from ..services.boilerplate_index import boilerplate_metadata
+from ..services.partition_service import partition_metadata
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 与 DocumentChunk.content_tsv 生成列使用的词典保持一致
+TS_CONFIG = "simple"
+
+
+class KeywordSearchService:
+    """基于 Postgres 全文检索的分块关键词检索
+
+    查询文本按 websearch_to_tsquery 解析（支持引号短语、OR、-排除），命中 content_tsv 的 GIN 索引，
+    按 ts_rank_cd 排序。返回结构与向量检索一致（ids 为 chunk_uid，元数据字段与向量库中的一致），
+    便于与向量检索结果融合。
+
+    每次检索使用独立会话，可在工作线程中与向量检索并发执行。
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+
+    def search(
+            self,
+            query: str,
+            top_k: int = 5,
+            document_ids: list[str] | None = None,
+            kb_ids: list[str] | None = None,
+            project_ids: list[str] | None = None,
+    ) -> dict:
+        """关键词检索，可选限定文档，或限定属于任一知识库 / 项目的文档（与向量检索的范围一致）"""
+        tsquery = func.websearch_to_tsquery(TS_CONFIG, query)
+        content_tsv = DocumentChunk.__table__.c.content_tsv
+        rank = func.ts_rank_cd(content_tsv, tsquery).label("rank")
+        statement = (
+            select(
+                DocumentChunk.chunk_uid,
+                DocumentChunk.chunk_index,
+                DocumentChunk.content,
+                DocumentChunk.extra,
+                DocumentChunk.is_boilerplate,
+                Document.id,
+                Document.document_uid,
+                Document.name,
+                Document.kb_id,
+                Document.project_id,
+                rank,
+            )
+            .join(Document, Document.id == DocumentChunk.document_id)
+            .where(
+                content_tsv.op("@@")(tsquery),
+                DocumentChunk.is_deleted == False,  # noqa: E712
+                Document.is_deleted == False,  # noqa: E712
+                Document.status == "active",
+            )
+            .order_by(rank.desc(), DocumentChunk.id)
+            .limit(top_k)
+        )
+        if document_ids:
+            statement = statement.where(Document.document_uid.in_(document_ids))
+        scope = []
+        if kb_ids:
+            scope.append(Document.kb_id.in_([str(key) for key in kb_ids]))
+        if project_ids:
+            scope.append(Document.project_id.in_([str(key) for key in project_ids]))
+        if scope:
+            statement = statement.where(or_(*scope))
+
+        with Session(get_engine()) as session:
+            try:
+                rows = session.exec(statement).all()
+            except ProgrammingError as e:
+                if "content_tsv" not in str(e):
+                    raise
+                # 缺少全文检索列是部署问题（未执行 init_db 的列迁移），直接报错，不静默退化为纯向量检索
+                logger.error(f"[KeywordSearch] 分块表缺少 content_tsv 列，请执行 init_db 补齐列迁移 | error: {e}")
+                raise DatabaseQueryFailedException(
+                    detail="notes_document_chunk.content_tsv 不存在，请执行 init_db 补齐列迁移"
+                ) from e
+
+        ids, documents, metadatas, scores = [], [], [], []
+        for (
+                chunk_uid, chunk_index, content, extra, is_boilerplate,
+                doc_id, document_uid, name, kb_id, project_id, score,
+        ) in rows:
+            metadata = {
+                "document_uid": document_uid,
+                "document_id": doc_id,
+                "chunk_uid": chunk_uid,
+                "chunk_index": chunk_index,
+                "name": name,
+                **partition_metadata(kb_id, project_id),
+                **boilerplate_metadata(is_boilerplate, self.settings),
+            }
+            if extra and "row_start" in extra:
+                metadata["row_start"] = extra["row_start"]
+                metadata["row_end"] = extra["row_end"]
+            ids.append(chunk_uid)
+            documents.append(content)
+            metadatas.append(metadata)
+            scores.append(float(score))
+
+        logger.info(f"[KeywordSearch] 关键词检索完成 | query: {query[:100]} | 返回 {len(ids)} 个结果")
+        return {
+            "ids": [ids],
+            "documents": [documents],
+            "metadatas": [metadatas],
+            "scores": [scores],
+        }
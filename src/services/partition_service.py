@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import dataclass
+
+from sqlalchemy import func, or_
+from sqlmodel import Session, select
+
+from ..config import Settings
+from ..db.models import Document
+from ..db.session import get_engine
+from ..embedding.vector_store import VectorStore
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 可路由的分区维度：知识库 / 项目（检索范围只能按这两个维度指定，用户归属只记录在文档上，不参与路由）
+PARTITION_KINDS = ("kb", "project")
+# 集合名中可直接使用的分区 ID，其余 ID 取哈希（兼容 Chroma 集合名与本地后端目录名的限制）
+_SAFE_KEY = re.compile(r"^[A-Za-z0-9_-]{1,36}$")
+
+
+@dataclass(frozen=True)
+class DocumentPartition:
+    """文档的分区归属（入库时由请求指定）"""
+
+    kb_id: str | None = None
+    project_id: str | None = None
+    user_id: int | None = None
+
+    def key_of(self, kind: str) -> str | None:
+        value = {"kb": self.kb_id, "project": self.project_id}[kind]
+        return None if value is None or value == "" else str(value)
+
+
+def partition_metadata(kb_id: str | None, project_id: str | None) -> dict:
+    """分块元数据中的知识库 / 项目归属（检索范围过滤使用），只包含有值的维度"""
+    metadata = {}
+    if kb_id:
+        metadata["kb_id"] = str(kb_id)
+    if project_id:
+        metadata["project_id"] = str(project_id)
+    return metadata
+
+
+def scope_where(kb_ids: list[str], project_ids: list[str]) -> dict | None:
+    """检索范围对应的元数据过滤：属于任一知识库或任一项目的分块"""
+    clauses = []
+    if kb_ids:
+        clauses.append({"kb_id": {"$in": kb_ids}})
+    if project_ids:
+        clauses.append({"project_id": {"$in": project_ids}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def partition_column():
+    """文档所在的逻辑集合（未分区的文档为默认集合），用于按集合过滤文档"""
+    return func.coalesce(Document.vector_collection, VectorStore.DEFAULT_COLLECTION_NAME)
+
+
+class PartitionRouter:
+    """按知识库 / 项目将文档路由到独立的向量集合
+
+    vector_partition_by 按优先级列出参与路由的维度（如 ["kb", "project"]），为空时关闭分区，
+    所有文档写入默认集合。入库时取文档第一个有值的维度，放入该分区的集合
+    （如 documents_kb_<kb_id>）；各维度都没有值的文档仍写入默认集合。
+
+    检索时只查询范围内文档所在的集合，过滤检索的开销与分区大小相关，而不是与全部语料相关；
+    不限范围的检索查询所有含有效文档的集合（默认集合与全部分区集合）。
+    分区集合名是逻辑名，可以像默认集合一样通过别名重建索引。
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.kinds = [kind for kind in settings.vector_partition_by if kind in PARTITION_KINDS]
+        unknown = set(settings.vector_partition_by) - set(PARTITION_KINDS)
+        if unknown:
+            logger.warning(f"[PartitionRouter] 忽略未知的分区维度 | kinds: {sorted(unknown)}")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.kinds)
+
+    @staticmethod
+    def collection_name(kind: str, key: str) -> str:
+        """分区集合名：documents_<维度>_<分区 ID>，ID 含特殊字符或过长时使用其哈希"""
+        if not _SAFE_KEY.match(key):
+            key = hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+        return f"{VectorStore.DEFAULT_COLLECTION_NAME}_{kind}_{key}"
+
+    def collection_for_document(self, partition: DocumentPartition | None) -> str | None:
+        """文档应写入的分区集合；不分区（写入默认集合）时为 None"""
+        if partition is None:
+            return None
+        for kind in self.kinds:
+            key = partition.key_of(kind)
+            if key is not None:
+                return self.collection_name(kind, key)
+        return None
+
+    def collections_for_scope(
+            self,
+            kb_ids: list[str] | None = None,
+            project_ids: list[str] | None = None,
+    ) -> dict[str, dict | None]:
+        """检索范围对应的集合，以及各集合内需要附加的元数据过滤（None 表示不过滤）
+
+        文档只写入第一个有值维度的分区集合，范围内的文档也可能位于其他维度的分区或默认集合中
+        （如同时属于知识库与项目的文档只在知识库分区中），因此按 Postgres 中的文档归属查出所有相关集合，
+        并在集合内按分块元数据中的 kb_id / project_id 过滤；恰好是所请求分区的集合内全部文档都在范围内，无需过滤。
+        范围为空时检索所有集合（见 all_collections），不过滤。
+        """
+        kb_ids = [str(key) for key in kb_ids or []]
+        project_ids = [str(key) for key in project_ids or []]
+        where = scope_where(kb_ids, project_ids)
+        if where is None:
+            return dict.fromkeys(self.all_collections())
+        if not self.enabled:
+            return {VectorStore.DEFAULT_COLLECTION_NAME: where}
+
+        exact: set[str] = set()
+        for kind, ids in (("kb", kb_ids), ("project", project_ids)):
+            if kind in self.kinds:
+                exact.update(self.collection_name(kind, key) for key in ids)
+        conditions = []
+        if kb_ids:
+            conditions.append(Document.kb_id.in_(kb_ids))
+        if project_ids:
+            conditions.append(Document.project_id.in_(project_ids))
+        with Session(get_engine()) as session:
+            collections = session.exec(
+                select(partition_column())
+                .where(
+                    or_(*conditions),
+                    Document.is_deleted == False,  # noqa: E712
+                )
+                .distinct()
+            ).all()
+        if not collections:
+            return {VectorStore.DEFAULT_COLLECTION_NAME: where}
+        return {collection: None if collection in exact else where for collection in sorted(collections)}
+
+    def all_collections(self) -> list[str]:
+        """含有效文档的全部集合（默认集合与各分区集合），未开启分区时只有默认集合"""
+        if not self.enabled:
+            return [VectorStore.DEFAULT_COLLECTION_NAME]
+        with Session(get_engine()) as session:
+            collections = session.exec(
+                select(partition_column())
+                .where(Document.is_deleted == False)  # noqa: E712
+                .distinct()
+            ).all()
+        return sorted(collections) or [VectorStore.DEFAULT_COLLECTION_NAME]
+
+    def collections_for_documents(self, document_uids: list[str]) -> list[str]:
+        """指定文档所在的集合列表（未开启分区时只有默认集合）"""
+        if not self.enabled or not document_uids:
+            return [VectorStore.DEFAULT_COLLECTION_NAME]
+        with Session(get_engine()) as session:
+            collections = session.exec(
+                select(partition_column())
+                .where(
+                    Document.document_uid.in_(document_uids),
+                    Document.is_deleted == False,  # noqa: E712
+                )
+                .distinct()
+            ).all()
+        return sorted(collections) or [VectorStore.DEFAULT_COLLECTION_NAME]
@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from sqlalchemy import func, update
+from sqlmodel import Session, select
+
+from ..common.exceptions import ReindexAlreadyRunningException
+from ..config import Settings
+from ..db.models import Document, DocumentChunk
+from ..db.session import get_engine
+from ..embedding.embedder import TextEmbedder
+from ..embedding.vector_codec import encode_vector
+from ..embedding.vector_store import VectorStore
+from ..services.boilerplate_index import boilerplate_metadata
+from ..services.collection_alias_service import CollectionAliasRegistry, DualWriteTarget
+from ..services.partition_service import partition_column, partition_metadata
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class ReindexJob:
+    """重建向量索引任务"""
+
+    job_id: str
+    alias: str
+    source_collection: str
+    target_collection: str
+    embedding_model: str
+    embedding_model_dir: str | None = None
+    status: str = "pending"  # pending / running / completed / failed
+    total_chunks: int = 0
+    processed_chunks: int = 0
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    error: str | None = None
+    # 已复制到目标集合的最大分块主键（切换别名后从此处补齐迁移期间的新写入）
+    last_chunk_id: int = 0
+    embedder: TextEmbedder | None = field(default=None, repr=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "alias": self.alias,
+            "source_collection": self.source_collection,
+            "target_collection": self.target_collection,
+            "embedding_model": self.embedding_model,
+            "status": self.status,
+            "total_chunks": self.total_chunks,
+            "processed_chunks": self.processed_chunks,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+class ReindexManager:
+    """后台重建向量索引（影子集合 + 别名切换）
+
+    流程：
+    1. 以新模型创建版本化的目标集合（如 documents__v20260101120000），在别名行上登记双写目标；
+       所有 worker 按别名缓存 TTL 读到后，新写入同时以新模型写入目标集合；
+    2. 按主键分页读取 Postgres 中的 DocumentChunk.content，分批向量化并 upsert 到目标集合，
+       批次之间按 reindex_throttle_seconds 限速，避免挤占在线请求的 CPU；
+    3. 对账：删除迁移期间被删除的文档在目标集合中的向量；
+    4. 原子切换别名（同时清除双写目标），旧集合保留以便回滚。各 worker 的查询嵌入器按别名记录的模型
+       自动切换（见 get_embedder）；
+    5. 等待一个别名缓存 TTL 后补齐：尚未读到双写目标或新别名的 worker 在此期间只写入了旧集合，
+       从 last_chunk_id 继续复制并再次对账。
+    """
+
+    def __init__(
+            self,
+            vector_store: VectorStore,
+            alias_registry: CollectionAliasRegistry,
+            settings: Settings,
+    ):
+        self.vector_store = vector_store
+        self.alias_registry = alias_registry
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._job: ReindexJob | None = None
+
+    def start(
+            self,
+            embedding_model: str,
+            embedding_model_dir: str | None = None,
+            alias: str = VectorStore.DEFAULT_COLLECTION_NAME,
+    ) -> ReindexJob:
+        """启动后台重建任务，同一时间只允许一个任务运行"""
+        with self._lock:
+            if self._job is not None and self._job.status in ("pending", "running"):
+                raise ReindexAlreadyRunningException(detail=f"job_id: {self._job.job_id}")
+
+            version = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+            job = ReindexJob(
+                job_id=uuid4().hex,
+                alias=alias,
+                source_collection=self.alias_registry.resolve(alias),
+                target_collection=f"{alias}__v{version}",
+                embedding_model=embedding_model,
+                embedding_model_dir=embedding_model_dir,
+            )
+            # 其他 worker 上进行中的任务也会在这里被拒绝
+            self.alias_registry.begin_dual_write(
+                alias,
+                job.target_collection,
+                embedding_model,
+                embedding_model_dir,
+                stale_after=self.settings.reindex_heartbeat_timeout,
+            )
+            self._job = job
+
+        thread = threading.Thread(target=self._run, args=(job,), name=f"reindex-{job.job_id}", daemon=True)
+        thread.start()
+        logger.info(
+            f"[Reindex] 启动重建任务 | job_id: {job.job_id} | {job.source_collection} -> {job.target_collection} "
+            f"| model: {embedding_model}"
+        )
+        return job
+
+    def current_job(self) -> ReindexJob | None:
+        """当前（或最近一次）任务"""
+        return self._job
+
+    def dual_write_job(self, alias: str = VectorStore.DEFAULT_COLLECTION_NAME) -> DualWriteTarget | None:
+        """别名正在重建索引时返回双写目标（含新模型的嵌入器），否则为 None
+
+        双写状态读自别名表（带 TTL 缓存），任务由其他 worker 执行时同样生效。
+        """
+        target = self.alias_registry.get_dual_write(alias)
+        if target is None:
+            return None
+        # 模型按 (名称, 目录) 在进程内只加载一次
+        target.embedder = TextEmbedder(model_name=target.embedding_model, model_dir=target.embedding_model_dir)
+        return target
+
+    def _run(self, job: ReindexJob):
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        switched = False
+        try:
+            job.embedder = TextEmbedder(
+                model_name=job.embedding_model,
+                model_dir=job.embedding_model_dir,
+            )
+
+            with Session(get_engine()) as session:
+                self._copy_chunks(session, job)
+                self._reconcile_deletes(session, job)
+
+            self.alias_registry.switch(
+                job.alias, job.target_collection, job.embedding_model, job.embedding_model_dir
+            )
+            switched = True
+
+            # 其他 worker 最多在一个缓存 TTL 后读到新别名，补齐它们在此之前只写入旧集合的数据
+            time.sleep(self.alias_registry.cache_ttl)
+            with Session(get_engine()) as session:
+                self._copy_chunks(session, job)
+                self._reconcile_deletes(session, job)
+
+            job.status = "completed"
+            logger.info(
+                f"[Reindex] 重建完成并已切换别名 | job_id: {job.job_id} | chunks: {job.processed_chunks} "
+                f"| 旧集合 {job.source_collection} 保留以便回滚"
+            )
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"[Reindex] 重建失败 | job_id: {job.job_id} | error: {e}", exc_info=True)
+            if not switched:
+                try:
+                    self.alias_registry.end_dual_write(job.alias)
+                except Exception as cleanup_error:
+                    logger.error(f"[Reindex] 清除双写目标失败 | alias: {job.alias} | error: {cleanup_error}")
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+
+    def _copy_chunks(self, session: Session, job: ReindexJob):
+        """从 job.last_chunk_id 起按主键分页读取别名所在集合（分区）中的有效分块，重新向量化后写入目标集合"""
+        active_chunks = (
+            select(DocumentChunk, Document.document_uid, Document.name, Document.kb_id, Document.project_id)
+            .join(Document, Document.id == DocumentChunk.document_id)
+            .where(
+                DocumentChunk.is_deleted == False,  # noqa: E712
+                Document.is_deleted == False,  # noqa: E712
+                partition_column() == job.alias,
+            )
+        )
+        job.total_chunks = job.processed_chunks + session.exec(
+            select(func.count()).select_from(
+                active_chunks.where(DocumentChunk.id > job.last_chunk_id).subquery()
+            )
+        ).one()
+
+        batch_size = max(1, self.settings.reindex_batch_size)
+        while True:
+            rows = session.exec(
+                active_chunks.where(DocumentChunk.id > job.last_chunk_id)
+                .order_by(DocumentChunk.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            contents = [row[0].content for row in rows]
+            embeddings = job.embedder.embed_batch(contents)
+            self.vector_store.upsert_documents(
+                ids=[row[0].chunk_uid for row in rows],
+                embeddings=embeddings,
+                documents=contents,
+                metadatas=[
+                    {
+                        "document_uid": document_uid,
+                        "document_id": chunk.document_id,
+                        "chunk_uid": chunk.chunk_uid,
+                        "chunk_index": chunk.chunk_index,
+                        "name": name,
+                        **partition_metadata(kb_id, project_id),
+                        **boilerplate_metadata(chunk.is_boilerplate, self.settings),
+                    }
+                    for chunk, document_uid, name, kb_id, project_id in rows
+                ],
+                collection_name=job.target_collection,
+            )
+
+            job.last_chunk_id = rows[-1][0].id
+
+            # 回写新模型的向量，之后可直接据此重建索引（按 embedding_model 区分新旧向量）
+            dtype = self.settings.embedding_storage_dtype
+            session.execute(
+                update(DocumentChunk),
+                [
+                    {
+                        "id": chunk.id,
+                        "embedding": encode_vector(vector, dtype),
+                        "embedding_dtype": dtype,
+                        "embedding_model": job.embedding_model,
+                    }
+                    for (chunk, *_), vector in zip(rows, embeddings)
+                ],
+            )
+            session.commit()
+
+            job.processed_chunks += len(rows)
+            # 释放已处理的 ORM 对象，保持内存恒定
+            session.expunge_all()
+            self.alias_registry.heartbeat(job.alias)
+
+            if self.settings.reindex_throttle_seconds > 0:
+                time.sleep(self.settings.reindex_throttle_seconds)
+
+    def _reconcile_deletes(self, session: Session, job: ReindexJob):
+        """清理迁移期间被删除的文档（其分块可能在删除之后才被复制到目标集合）"""
+        deleted_uids = list(session.exec(
+            select(Document.document_uid).where(
+                Document.is_deleted == True,  # noqa: E712
+                Document.updated_at >= job.started_at,
+                partition_column() == job.alias,
+            )
+        ).all())
+
+        batch_size = max(1, self.settings.vector_delete_batch_size)
+        for start in range(0, len(deleted_uids), batch_size):
+            self.vector_store.delete_by_document_uids(
+                deleted_uids[start:start + batch_size],
+                collection_name=job.target_collection,
+            )
+        if deleted_uids:
+            logger.info(f"[Reindex] 对账删除迁移期间删除的文档 | documents: {len(deleted_uids)}")
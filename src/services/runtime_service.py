@@ -15,7 +15,7 @@ class AgentRuntimeService:
     def __init__(self, agent_factory: AgentFactory):
         self._agent_factory = agent_factory
 
-    def run(self, state: AgentState) -> AgentState:
+    async def run(self, state: AgentState) -> AgentState:
         """ 执行一个通用的 Agent 流程。"""
         logger.info(
             f"[AgentRuntime] 开始执行 Agent | conversation_uid: {state.get('conversation_uid')}"
@@ -25,7 +25,7 @@ class AgentRuntimeService:
         config = {"configurable": {"thread_id": state.get("conversation_uid")}}
 
         # 执行并返回最终状态
-        final_state = graph.invoke(state, config=config)
+        final_state = await graph.ainvoke(state, config=config)
 
         answer_length = len(final_state["messages"][-1].content)
         logger.info(
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Any
 
@@ -14,6 +15,10 @@ class Tool(ABC):
         """执行工具"""
         pass
 
+    async def aexecute(self, **kwargs) -> Any:
+        """异步执行工具：默认在线程中调用 execute，有原生异步实现的工具可覆盖"""
+        return await asyncio.to_thread(self.execute, **kwargs)
+
     def to_schema(self) -> dict:
         """生成符合 OpenAI Function Calling 格式的工具定义"""
         return {
@@ -54,6 +59,11 @@ class ToolRegistry:
         tool = self.get(name)
         return tool.execute(**kwargs)
 
+    async def ainvoke_tool(self, name: str, **kwargs) -> Any:
+        """获取并异步执行指定的工具"""
+        tool = self.get(name)
+        return await tool.aexecute(**kwargs)
+
     def get_tool_schemas(self) -> list[dict]:
         """获取所有工具的标准定义 Schema（用于 LLM 工具调用）"""
         return [tool.to_schema() for tool in self.tools.values()]
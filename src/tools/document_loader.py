@@ -1,11 +1,99 @@
+import csv
+import json
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterator
 
 from ..lib.web_fetcher import BrowserLikeFetcher
 
 
+@dataclass
+class LoadedRecord:
+    """流式加载产出的一条记录（CSV 行 / JSONL 行 / 文本行），行号从 1 开始，含首尾"""
+
+    text: str
+    start_row: int
+    end_row: int
+
+
 class DocumentLoader:
     """文档加载器：支持多种来源"""
 
+    # load_from_file 支持的文件后缀
+    SUPPORTED_SUFFIXES = (".txt", ".md", ".pdf", ".docx", ".csv", ".jsonl", ".log")
+    # 始终按记录流式加载的后缀；.txt 超过阈值时也按行流式加载
+    STREAMING_SUFFIXES = (".csv", ".jsonl", ".log")
+
+    @staticmethod
+    def is_streaming(file_path: str, size_threshold: int) -> bool:
+        """文件是否应按记录流式加载（不整体读入内存）"""
+        path = Path(file_path)
+        suffix = path.suffix.lower()
+        if suffix in DocumentLoader.STREAMING_SUFFIXES:
+            return True
+        return suffix == ".txt" and path.is_file() and path.stat().st_size >= size_threshold
+
+    @staticmethod
+    def iter_records(file_path: str) -> Iterator[LoadedRecord]:
+        """按记录流式读取文件，内存占用与文件大小无关
+
+        - .csv：每行数据一条记录，渲染为 "列名: 值"，行号不含表头；
+        - .jsonl：每行一条记录，对象渲染为 "键: 值"，无法解析的行保留原文；
+        - .txt / .log：每个非空行一条记录。
+        """
+        path = Path(file_path)
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+
+        suffix = path.suffix.lower()
+        if suffix == ".csv":
+            yield from DocumentLoader._iter_csv(path)
+        elif suffix == ".jsonl":
+            yield from DocumentLoader._iter_jsonl(path)
+        elif suffix in (".txt", ".log"):
+            yield from DocumentLoader._iter_lines(path)
+        else:
+            raise ValueError(f"Unsupported streaming file type: {suffix}")
+
+    @staticmethod
+    def _iter_csv(path: Path) -> Iterator[LoadedRecord]:
+        with path.open(encoding="utf-8", errors="replace", newline="") as f:
+            for row_no, row in enumerate(csv.DictReader(f), 1):
+                text = "\n".join(f"{key}: {value}" for key, value in row.items() if key and value)
+                if text:
+                    yield LoadedRecord(text=text, start_row=row_no, end_row=row_no)
+
+    @staticmethod
+    def _iter_jsonl(path: Path) -> Iterator[LoadedRecord]:
+        with path.open(encoding="utf-8", errors="replace") as f:
+            for row_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except json.JSONDecodeError:
+                    text = line
+                else:
+                    if isinstance(obj, dict):
+                        text = "\n".join(
+                            f"{key}: {value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)}"
+                            for key, value in obj.items()
+                            if value not in (None, "")
+                        )
+                    else:
+                        text = obj if isinstance(obj, str) else json.dumps(obj, ensure_ascii=False)
+                if text:
+                    yield LoadedRecord(text=text, start_row=row_no, end_row=row_no)
+
+    @staticmethod
+    def _iter_lines(path: Path) -> Iterator[LoadedRecord]:
+        with path.open(encoding="utf-8", errors="replace") as f:
+            for row_no, line in enumerate(f, 1):
+                line = line.rstrip("\r\n")
+                if line.strip():
+                    yield LoadedRecord(text=line, start_row=row_no, end_row=row_no)
+
     @staticmethod
     def load_from_url(url: str) -> str:
         """从 URL 加载网页内容"""
@@ -32,6 +120,9 @@ class DocumentLoader:
 
         if suffix == ".txt":
             return path.read_text(encoding="utf-8")
+        elif suffix in DocumentLoader.STREAMING_SUFFIXES:
+            # 小文件也可整体加载（如批量上传中的 CSV），大文件应使用 iter_records
+            return "\n\n".join(record.text for record in DocumentLoader.iter_records(file_path))
         elif suffix == ".md":
             return path.read_text(encoding="utf-8")
         elif suffix == ".pdf":
@@ -1,6 +1,14 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from .base import Tool
-from ..embedding.embedder import TextEmbedder
+from ..common.exceptions import DatabaseQueryFailedException
+from ..config import get_settings
+from ..embedding.async_vector_store import AsyncVectorStore
+from ..embedding.embedder import CollectionEmbedders, TextEmbedder
 from ..embedding.vector_store import VectorStore
+from ..services.keyword_search_service import KeywordSearchService
+from ..services.partition_service import PartitionRouter, scope_where
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -27,22 +35,50 @@ class VectorSearchTool(Tool):
                 "type": "array",
                 "items": {"type": "string"},
                 "description": "Optional list of document identifiers to filter results. If not provided, searches across all documents."
+            },
+            "kb_ids": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Optional list of knowledge base ids from the request scope. Only these knowledge bases are searched."
+            },
+            "project_ids": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Optional list of project ids from the request scope. Only these projects are searched."
             }
         },
         "required": ["query"]
     }
 
-    def __init__(self, vector_store: VectorStore, embedder: TextEmbedder):
+    def __init__(
+            self,
+            vector_store: VectorStore,
+            embedder: TextEmbedder,
+            keyword_search: KeywordSearchService | None = None,
+            async_vector_store: AsyncVectorStore | None = None,
+            partition_router: PartitionRouter | None = None,
+            collection_embedders: CollectionEmbedders | None = None,
+    ):
         self.vector_store = vector_store
         self.embedder = embedder
+        # 混合检索（search_mode=hybrid）时使用的关键词检索，未提供时只做向量检索
+        self.keyword_search = keyword_search
+        # aexecute 使用的异步向量库，未提供时 aexecute 在线程中调用 execute
+        self.async_vector_store = async_vector_store
+        # 分区路由：只检索范围内的分区集合，未提供时只检索默认集合
+        self.partition_router = partition_router
+        # 按集合选择查询向量的模型（分区集合可能已重建索引到其他模型），未提供时所有集合都使用 embedder
+        self.collection_embedders = collection_embedders
 
     def execute(
             self,
             query: str | None = None,
             top_k: int = 5,
             document_ids: list[str] | None = None,
+            kb_ids: list[str] | None = None,
+            project_ids: list[str] | None = None,
     ) -> dict:
-        """执行检索，可选按文档过滤"""
+        """执行检索，可选按文档、知识库或项目过滤"""
         # 处理 query 缺失或空的情况
         query = query.strip() if query else ""
         has_query = bool(query)
@@ -52,11 +88,12 @@ class VectorSearchTool(Tool):
             # 假设向量数据库支持 $in 操作
             where = {"document_uid": {"$in": document_ids}}
 
-        logger.info(f"[VectorSearchTool] 开始检索 | query: {query[:100] if has_query else '(empty)'}... | top_k: {top_k} | document_ids: {document_ids}")
+        collections = self._collections(document_ids, kb_ids, project_ids)
+        logger.info(f"[VectorSearchTool] 开始检索 | query: {query[:100] if has_query else '(empty)'}... | top_k: {top_k} | document_ids: {document_ids} | collections: {collections}")
 
         # 如果 query 为空，使用元数据查询而不是向量检索
         if not has_query:
-            if not where:
+            if not where and not (kb_ids or project_ids):
                 logger.warning("[VectorSearchTool] query 为空且未指定 document_ids，无法进行查询")
                 return {
                     "documents": [[]],
@@ -65,37 +102,379 @@ class VectorSearchTool(Tool):
                 }
 
             logger.info(f"[VectorSearchTool] query 为空，使用元数据查询 | where: {where}")
-            results = self.vector_store.search_by_metadata(
-                top_k=top_k,
-                where=where,
-            )
+            results = self._merge_in_order([
+                self.vector_store.search_by_metadata(
+                    top_k=top_k, where=self._scoped_where(where, scope), collection_name=collection
+                )
+                for collection, scope in collections.items()
+            ], top_k)
+        elif get_settings().search_mode == "hybrid" and self.keyword_search is not None:
+            results = self._hybrid_search(query, top_k, where, document_ids, kb_ids, project_ids, collections)
         else:
             # 正常的向量检索
-            query_embedding = self.embedder.embed_text(query)
-            logger.debug(f"[VectorSearchTool] 向量化完成 | 维度: {len(query_embedding)}")
+            query_embeddings, same_model = self._embed_query(query, collections)
+            logger.debug(f"[VectorSearchTool] 向量化完成 | collections: {len(query_embeddings)} | same_model: {same_model}")
 
             if where:
                 logger.info(f"[VectorSearchTool] 使用文档过滤: {where}")
 
-            results = self.vector_store.search(
-                query_embedding, top_k=top_k, where=where
+            # 样板分块降权：多取一些候选，按权重调整距离后重新排序（按排名融合时权重已计入融合得分）
+            downweight = same_model and get_settings().boilerplate_policy == "downweight"
+            results = self._search_partitions(
+                collections, query_embeddings, same_model, top_k * 2 if downweight else top_k, where
+            )
+            if downweight:
+                results = self._apply_weights(results, top_k)
+
+        return self._format_results(results, has_query)
+
+    async def aexecute(
+            self,
+            query: str | None = None,
+            top_k: int = 5,
+            document_ids: list[str] | None = None,
+            kb_ids: list[str] | None = None,
+            project_ids: list[str] | None = None,
+    ) -> dict:
+        """execute 的异步版本：向量库请求走 AsyncVectorStore，向量化与关键词检索在线程中执行"""
+        if self.async_vector_store is None:
+            return await super().aexecute(
+                query=query, top_k=top_k, document_ids=document_ids, kb_ids=kb_ids, project_ids=project_ids
+            )
+        store = self.async_vector_store
+        query = query.strip() if query else ""
+        has_query = bool(query)
+        where = {"document_uid": {"$in": document_ids}} if document_ids else {}
+        # 按文档查找所在集合需要查询 Postgres，放到线程中执行
+        collections = await asyncio.to_thread(self._collections, document_ids, kb_ids, project_ids)
+
+        logger.info(f"[VectorSearchTool] 开始异步检索 | query: {query[:100] if has_query else '(empty)'}... | top_k: {top_k} | document_ids: {document_ids} | collections: {collections}")
+
+        if not has_query:
+            if not where and not (kb_ids or project_ids):
+                logger.warning("[VectorSearchTool] query 为空且未指定 document_ids，无法进行查询")
+                return {
+                    "documents": [[]],
+                    "distances": [[]],
+                    "metadatas": [[]],
+                }
+            results = self._merge_in_order(await asyncio.gather(*(
+                store.asearch_by_metadata(
+                    top_k=top_k, where=self._scoped_where(where, scope), collection_name=collection
+                )
+                for collection, scope in collections.items()
+            )), top_k)
+        elif get_settings().search_mode == "hybrid" and self.keyword_search is not None:
+            results = await self._ahybrid_search(
+                query, top_k, where, document_ids, kb_ids, project_ids, collections
+            )
+        else:
+            query_embeddings, same_model = await asyncio.to_thread(self._embed_query, query, collections)
+            downweight = same_model and get_settings().boilerplate_policy == "downweight"
+            results = await self._asearch_partitions(
+                collections, query_embeddings, same_model, top_k * 2 if downweight else top_k, where
+            )
+            if downweight:
+                results = self._apply_weights(results, top_k)
+
+        return self._format_results(results, has_query)
+
+    def _collections(
+            self,
+            document_ids: list[str] | None,
+            kb_ids: list[str] | None,
+            project_ids: list[str] | None,
+    ) -> dict[str, dict | None]:
+        """检索范围对应的向量集合及各集合内的范围过滤
+
+        指定文档时为文档所在的集合（按 document_uid 过滤即可）；否则为知识库 / 项目范围内文档所在的集合，
+        集合内可能还有范围外的文档时附加 kb_id / project_id 元数据过滤。
+        """
+        if self.partition_router is None:
+            return {VectorStore.DEFAULT_COLLECTION_NAME: scope_where(kb_ids or [], project_ids or [])}
+        if document_ids:
+            return dict.fromkeys(self.partition_router.collections_for_documents(document_ids))
+        return self.partition_router.collections_for_scope(kb_ids=kb_ids, project_ids=project_ids)
+
+    @staticmethod
+    def _scoped_where(where: dict, scope: dict | None) -> dict:
+        """合并文档过滤与集合的范围过滤"""
+        if not scope:
+            return where
+        if not where:
+            return scope
+        return {"$and": [where, scope]}
+
+    def _embed_query(self, query: str, collections: dict[str, dict | None]) -> tuple[dict[str, list[float]], bool]:
+        """按各集合当前所用的模型向量化查询，同一模型只向量化一次
+
+        返回 (集合 -> 查询向量, 是否所有集合使用同一模型)。
+        """
+        if self.collection_embedders is None:
+            return dict.fromkeys(collections, self.embedder.embed_text(query)), True
+        models = {collection: self.collection_embedders.model_of(collection) for collection in collections}
+        vectors = {
+            model: self.collection_embedders.for_model(*model).embed_text(query)
+            for model in set(models.values())
+        }
+        return {collection: vectors[model] for collection, model in models.items()}, len(vectors) == 1
+
+    def _search_partitions(
+            self,
+            collections: dict[str, dict | None],
+            query_embeddings: dict[str, list[float]],
+            same_model: bool,
+            top_k: int,
+            where: dict,
+    ) -> dict:
+        """检索多个集合并合并结果（见 _merge_partitions）"""
+        if len(collections) == 1:
+            (collection, scope), = collections.items()
+            return self.vector_store.search(
+                query_embeddings[collection], top_k=top_k, where=self._scoped_where(where, scope),
+                collection_name=collection,
+            )
+        workers = max(1, min(get_settings().partition_search_concurrency, len(collections)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(
+                lambda item: self.vector_store.search(
+                    query_embeddings[item[0]], top_k=top_k, where=self._scoped_where(where, item[1]),
+                    collection_name=item[0],
+                ),
+                collections.items(),
+            ))
+        return self._merge_partitions(results, same_model, top_k)
+
+    async def _asearch_partitions(
+            self,
+            collections: dict[str, dict | None],
+            query_embeddings: dict[str, list[float]],
+            same_model: bool,
+            top_k: int,
+            where: dict,
+    ) -> dict:
+        """_search_partitions 的异步版本，并发度由 AsyncVectorStore 的请求上限控制"""
+        results = await asyncio.gather(*(
+            self.async_vector_store.asearch(
+                query_embeddings[collection], top_k=top_k, where=self._scoped_where(where, scope),
+                collection_name=collection,
             )
+            for collection, scope in collections.items()
+        ))
+        return results[0] if len(results) == 1 else self._merge_partitions(results, same_model, top_k)
 
+    def _merge_partitions(self, result_lists: list[dict], same_model: bool, top_k: int) -> dict:
+        """合并多个集合的检索结果
+
+        各集合使用同一模型时距离可直接比较，按距离合并；模型不同时距离不可比较，按倒数排名融合。
+        """
+        if same_model:
+            return self._merge_by_distance(result_lists, top_k)
+        return self._reciprocal_rank_fusion(result_lists, top_k=top_k, k=get_settings().hybrid_rrf_k)
+
+    @staticmethod
+    def _merge_by_distance(result_lists: list[dict], top_k: int) -> dict:
+        """合并多个集合的检索结果，按距离升序截取 top_k"""
+        merged = []
+        for results in result_lists:
+            ids = (results.get("ids") or [[]])[0] or []
+            documents = (results.get("documents") or [[]])[0] or []
+            metadatas = (results.get("metadatas") or [[]])[0] or [None] * len(ids)
+            distances = (results.get("distances") or [[]])[0] or [None] * len(ids)
+            merged.extend(zip(distances, ids, documents, metadatas))
+        ranked = sorted(merged, key=lambda item: float("inf") if item[0] is None else item[0])[:top_k]
+        return {
+            "ids": [[item[1] for item in ranked]],
+            "documents": [[item[2] for item in ranked]],
+            "distances": [[item[0] for item in ranked]],
+            "metadatas": [[item[3] for item in ranked]],
+            **VectorSearchTool._partial_info(result_lists),
+        }
+
+    @staticmethod
+    def _merge_in_order(result_lists: list[dict], top_k: int) -> dict:
+        """依次拼接多个集合的元数据查询结果（没有距离），截取 top_k"""
+        if len(result_lists) == 1:
+            return result_lists[0]
+        merged = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        for results in result_lists:
+            for key in ("ids", "documents", "metadatas"):
+                merged[key][0].extend((results.get(key) or [[]])[0] or [])
+        for key in ("ids", "documents", "metadatas"):
+            merged[key][0] = merged[key][0][:top_k]
+        merged.update(VectorSearchTool._partial_info(result_lists))
+        return merged
+
+    @staticmethod
+    def _partial_info(result_lists: list[dict]) -> dict:
+        """汇总各路结果的不完整标记：分片部署下任一路有分片超时或失败时，合并结果同样不完整"""
+        failed_shards = []
+        partial = False
+        for results in result_lists:
+            if results.get("partial"):
+                partial = True
+                failed_shards.extend(s for s in results.get("failed_shards", []) if s not in failed_shards)
+        return {"partial": True, "failed_shards": failed_shards} if partial else {}
+
+    @staticmethod
+    def _format_results(results: dict, has_query: bool) -> dict:
+        """记录检索结果概况，返回工具输出"""
         doc_list = results.get("documents", [[]])
         doc_count = len(doc_list[0]) if doc_list and doc_list[0] else 0
         distances = results.get("distances", [[]])
 
         logger.info(f"[VectorSearchTool] 检索结果 | 返回 {doc_count} 个文档片段")
-        if doc_count > 0 and distances and distances[0]:
-            logger.debug(f"[VectorSearchTool] 相似度范围: {min(distances[0]):.4f} ~ {max(distances[0]):.4f}")
+        known_distances = [d for d in distances[0] if d is not None] if distances else []
+        if doc_count > 0 and known_distances:
+            logger.debug(f"[VectorSearchTool] 相似度范围: {min(known_distances):.4f} ~ {max(known_distances):.4f}")
         elif doc_count == 0:
             if has_query:
                 logger.warning(f"[VectorSearchTool] ⚠️ 检索结果为空！可能原因：1) Chroma 集合为空 2) where 过滤后无匹配 3) 查询向量与现有向量差异过大")
             else:
                 logger.warning(f"[VectorSearchTool] ⚠️ 元数据查询结果为空！可能原因：1) Chroma 集合为空 2) where 条件无匹配")
 
-        return {
+        formatted = {
             "documents": doc_list,
             "distances": distances,
             "metadatas": results.get("metadatas", [[]]),
+            "partial": bool(results.get("partial")),
+        }
+        if results.get("partial"):
+            failed_shards = results.get("failed_shards", [])
+            logger.warning(f"[VectorSearchTool] 检索结果不完整 | failed_shards: {failed_shards}")
+            formatted["failed_shards"] = failed_shards
+            formatted["note"] = f"部分向量库分片超时或失败（{', '.join(failed_shards) or '未知'}），结果可能不完整"
+        return formatted
+
+    def _hybrid_search(
+            self,
+            query: str,
+            top_k: int,
+            where: dict,
+            document_ids: list[str] | None,
+            kb_ids: list[str] | None,
+            project_ids: list[str] | None,
+            collections: dict[str, dict | None],
+    ) -> dict:
+        """混合检索：关键词检索与向量检索并发执行，按倒数排名融合（RRF）
+
+        两路使用相同的 document_ids 与知识库 / 项目范围，各取 max(top_k, hybrid_candidate_k) 个候选；
+        关键词检索失败时退化为纯向量检索；缺少全文检索列等部署问题直接抛出，不静默退化。
+        """
+        settings = get_settings()
+        candidates = max(top_k, settings.hybrid_candidate_k)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            keyword_future = pool.submit(
+                self.keyword_search.search, query, candidates, document_ids, kb_ids, project_ids
+            )
+            query_embeddings, same_model = self._embed_query(query, collections)
+            vector_results = self._search_partitions(collections, query_embeddings, same_model, candidates, where)
+            try:
+                keyword_results = keyword_future.result()
+            except DatabaseQueryFailedException:
+                raise
+            except Exception as e:
+                logger.warning(f"[VectorSearchTool] 关键词检索失败，仅使用向量检索结果 | error: {e}")
+                keyword_results = None
+
+        fused = self._reciprocal_rank_fusion(
+            [vector_results] + ([keyword_results] if keyword_results else []),
+            top_k=top_k,
+            k=settings.hybrid_rrf_k,
+        )
+        logger.info(
+            f"[VectorSearchTool] 混合检索 | vector: {len((vector_results.get('ids') or [[]])[0])} | "
+            f"keyword: {len((keyword_results or {}).get('ids', [[]])[0])} | fused: {len(fused['ids'][0])}"
+        )
+        return fused
+
+    async def _ahybrid_search(
+            self,
+            query: str,
+            top_k: int,
+            where: dict,
+            document_ids: list[str] | None,
+            kb_ids: list[str] | None,
+            project_ids: list[str] | None,
+            collections: dict[str, dict | None],
+    ) -> dict:
+        """_hybrid_search 的异步版本：关键词检索在线程中执行，与向量化、异步向量检索并发"""
+        settings = get_settings()
+        candidates = max(top_k, settings.hybrid_candidate_k)
+        keyword_task = asyncio.create_task(
+            asyncio.to_thread(self.keyword_search.search, query, candidates, document_ids, kb_ids, project_ids)
+        )
+        try:
+            query_embeddings, same_model = await asyncio.to_thread(self._embed_query, query, collections)
+            vector_results = await self._asearch_partitions(
+                collections, query_embeddings, same_model, candidates, where
+            )
+        except BaseException:
+            keyword_task.cancel()
+            raise
+        try:
+            keyword_results = await keyword_task
+        except DatabaseQueryFailedException:
+            raise
+        except Exception as e:
+            logger.warning(f"[VectorSearchTool] 关键词检索失败，仅使用向量检索结果 | error: {e}")
+            keyword_results = None
+
+        return self._reciprocal_rank_fusion(
+            [vector_results] + ([keyword_results] if keyword_results else []),
+            top_k=top_k,
+            k=settings.hybrid_rrf_k,
+        )
+
+    @staticmethod
+    def _reciprocal_rank_fusion(result_lists: list[dict], top_k: int, k: int = 60) -> dict:
+        """倒数排名融合：score = Σ weight / (k + rank)，rank 从 1 开始
+
+        同一分块（按 id）在多路中出现时得分累加；weight 取分块元数据中的检索权重（样板分块降权）。
+        距离保留向量检索中的值，仅被关键词命中的分块距离为 None。
+        """
+        scores: dict[str, float] = {}
+        entries: dict[str, dict] = {}
+        for results in result_lists:
+            ids = (results.get("ids") or [[]])[0] or []
+            documents = (results.get("documents") or [[]])[0] or []
+            metadatas = (results.get("metadatas") or [[]])[0] or [None] * len(ids)
+            distances = (results.get("distances") or [[]])[0] or [None] * len(ids)
+            for rank, (id_, doc, metadata, distance) in enumerate(zip(ids, documents, metadatas, distances), 1):
+                weight = max((metadata or {}).get("weight", 1.0), 1e-6)
+                scores[id_] = scores.get(id_, 0.0) + weight / (k + rank)
+                entry = entries.setdefault(id_, {"document": doc, "metadata": metadata, "distance": None})
+                if distance is not None:
+                    entry["distance"] = distance
+
+        ranked = sorted(scores, key=lambda id_: scores[id_], reverse=True)[:top_k]
+        return {
+            "ids": [ranked],
+            "documents": [[entries[id_]["document"] for id_ in ranked]],
+            "distances": [[entries[id_]["distance"] for id_ in ranked]],
+            "metadatas": [[entries[id_]["metadata"] for id_ in ranked]],
+            **VectorSearchTool._partial_info(result_lists),
+        }
+
+    @staticmethod
+    def _apply_weights(results: dict, top_k: int) -> dict:
+        """按分块元数据中的 weight 放大距离（权重越低越靠后），重新排序并截取 top_k"""
+        documents = (results.get("documents") or [[]])[0] or []
+        distances = (results.get("distances") or [[]])[0] or []
+        metadatas = (results.get("metadatas") or [[]])[0] or [None] * len(documents)
+        ids = (results.get("ids") or [[]])[0] or [None] * len(documents)
+
+        ranked = sorted(
+            (
+                (distance / max((metadata or {}).get("weight", 1.0), 1e-6), doc, metadata, id_)
+                for distance, doc, metadata, id_ in zip(distances, documents, metadatas, ids)
+            ),
+            key=lambda item: item[0],
+        )[:top_k]
+        return {
+            "ids": [[item[3] for item in ranked]],
+            "documents": [[item[1] for item in ranked]],
+            "distances": [[item[0] for item in ranked]],
+            "metadatas": [[item[2] for item in ranked]],
+            **VectorSearchTool._partial_info([results]),
         }
@@ -0,0 +1,36 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class KeyedLock:
+    """按 key 加锁：相同 key 的调用串行执行，不同 key 互不影响
+
+    用于合并并发的重复工作（例如同一内容被同时上传多次）：
+    后到的调用会等待先到的调用完成，再基于其结果做判断。
+    """
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        # key -> [lock, 引用计数]，引用归零时回收，避免字典无限增长
+        self._locks: dict[str, list] = {}
+
+    @contextmanager
+    def hold(self, key: str) -> Iterator[None]:
+        with self._guard:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = [threading.Lock(), 0]
+                self._locks[key] = entry
+            entry[1] += 1
+
+        lock: threading.Lock = entry[0]
+        lock.acquire()
+        try:
+            yield
+        finally:
+            lock.release()
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._locks.pop(key, None)
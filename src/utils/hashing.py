@@ -0,0 +1,64 @@
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+# 流式读取文件时的块大小
+_READ_BLOCK_SIZE = 1024 * 1024
+
+
+def sha256_bytes(data: bytes) -> str:
+    """计算字节串的 SHA-256（十六进制）"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_text(text: str) -> str:
+    """计算文本（UTF-8 编码）的 SHA-256（十六进制）"""
+    return sha256_bytes(text.encode("utf-8"))
+
+
+def sha256_file(file_path: str) -> str:
+    """分块读取文件并计算 SHA-256，避免大文件整体读入内存"""
+    digest = hashlib.sha256()
+    with Path(file_path).open("rb") as f:
+        for block in iter(lambda: f.read(_READ_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# SimHash 以字符 n-gram 为特征，对中英文混排文本都适用
+_SIMHASH_SHINGLE_SIZE = 4
+_SIMHASH_BITS = 64
+
+
+def simhash64(text: str) -> int:
+    """计算文本的 64 位 SimHash（有符号整数，便于存入 BIGINT）
+
+    先做空白归一化与小写化，近似重复的文本（如页眉页脚仅页码不同）汉明距离很小。
+    """
+    normalized = " ".join(text.lower().split())
+    if len(normalized) <= _SIMHASH_SHINGLE_SIZE:
+        shingles = [normalized]
+    else:
+        shingles = [
+            normalized[i:i + _SIMHASH_SHINGLE_SIZE]
+            for i in range(len(normalized) - _SIMHASH_SHINGLE_SIZE + 1)
+        ]
+
+    digests = b"".join(
+        hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles
+    )
+    # 每个特征哈希展开为 64 个比特，按位统计 +1/-1 的票数
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+
+    value = 0
+    for bit, vote in enumerate(votes):
+        if vote > 0:
+            value |= 1 << (_SIMHASH_BITS - 1 - bit)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个 64 位 SimHash 的汉明距离"""
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count("1")
@@ -0,0 +1,126 @@
+import gc
+import json
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Iterator
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# tracemalloc 为进程级状态（start / stop / reset_peak 影响所有调用方），同一时间只允许一个诊断运行
+_profiling_lock = threading.Lock()
+
+
+class IngestProfiler:
+    """按阶段记录资源占用的诊断工具（可选开启）
+
+    每个阶段记录：墙钟时间、进程 CPU 时间、tracemalloc 峰值内存、阶段结束时的净分配、
+    GC 跟踪对象数的变化，以及进程最大常驻内存（RSS）。
+
+    注意：
+    - tracemalloc 的启停与峰值重置是进程级的，同一时间只运行一个诊断：
+      其他开启诊断的入库在 __enter__ 处排队等待（等待时间不计入统计）；
+    - 未开启诊断的并发请求的分配与 CPU 时间仍会计入，用于压测单个大文档或定位 OOM 时应避免并发入库；
+    - 开启 tracemalloc 本身会明显拖慢分配密集的代码，默认关闭。
+
+    每个阶段结束时立即以一行 JSON 写日志，进程在某个阶段被 OOM 杀掉时，
+    日志中最后一条记录之后的阶段即为嫌疑阶段。
+    """
+
+    def __init__(self, label: str, count_objects: bool = True):
+        self.label = label
+        self.count_objects = count_objects
+        self.stages: list[dict] = []
+        self._total: dict = {}
+        self._started_tracing = False
+        self._wall_start = 0.0
+        self._cpu_start = 0.0
+
+    def __enter__(self) -> "IngestProfiler":
+        _profiling_lock.acquire()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._total = {
+            "wall_seconds": round(time.perf_counter() - self._wall_start, 4),
+            "cpu_seconds": round(time.process_time() - self._cpu_start, 4),
+            "peak_traced_bytes": max((s["peak_traced_bytes"] for s in self.stages), default=0),
+            "max_rss_bytes": _max_rss_bytes(),
+            "failed": exc_type is not None,
+        }
+        logger.info(f"[IngestProfile] {json.dumps({'label': self.label, 'total': self._total}, ensure_ascii=False)}")
+        try:
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        finally:
+            _profiling_lock.release()
+        return False
+
+    @contextmanager
+    def stage(self, name: str, **attrs) -> Iterator[dict]:
+        """记录一个阶段，attrs 为附加信息（如分块数、文本长度）；阶段不可嵌套
+
+        返回的字典可在阶段内补充附加信息，阶段结束时一并记录。
+        """
+        objects_before = len(gc.get_objects()) if self.count_objects else None
+        traced_before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        extra = dict(attrs)
+        try:
+            yield extra
+        finally:
+            traced_after, peak = tracemalloc.get_traced_memory()
+            entry = {
+                "stage": name,
+                "wall_seconds": round(time.perf_counter() - wall_start, 4),
+                "cpu_seconds": round(time.process_time() - cpu_start, 4),
+                "peak_traced_bytes": max(0, peak - traced_before),
+                "net_traced_bytes": traced_after - traced_before,
+                "max_rss_bytes": _max_rss_bytes(),
+            }
+            if objects_before is not None:
+                entry["object_delta"] = len(gc.get_objects()) - objects_before
+            entry.update(extra)
+            self.stages.append(entry)
+            logger.info(f"[IngestProfile] {json.dumps({'label': self.label, **entry}, ensure_ascii=False)}")
+
+    def report(self) -> dict:
+        return {"stages": self.stages, "total": self._total}
+
+
+class NullProfiler:
+    """未开启诊断时使用的空实现"""
+
+    def __enter__(self) -> "NullProfiler":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def stage(self, name: str, **attrs):
+        return nullcontext({})
+
+    def report(self) -> None:
+        return None
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def _max_rss_bytes() -> int:
+    """进程最大常驻内存（Linux 下 ru_maxrss 单位为 KB，macOS 为字节）"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024